@@ -0,0 +1,9 @@
+# encoding: utf-8
+"""
+Benchmarks for the tagger. Each module can be run with ``python -m``.
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
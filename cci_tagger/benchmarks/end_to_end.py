@@ -0,0 +1,253 @@
+# encoding: utf-8
+"""
+End-to-end benchmarks over synthetic CCI archives. For each archive size the
+archive is built, or reused from an earlier run, and each scenario is run in
+a new Python process so the start-up time and peak RSS are those of a real
+run:
+
+    startup           import the tagger and create ProcessDatasets
+    process_datasets  ProcessDatasets.process_datasets over every dataset
+    get_file_tags     ProcessDatasets.get_file_tags for every file
+
+    python -m cci_tagger.benchmarks.end_to_end --sizes 1000 100000 1000000 --output results.json
+
+The results are written as JSON with the commit they were measured at, so
+runs can be compared across commits. No network access is needed, the vocab
+is loaded from the fixture written with the archive.
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+from argparse import ArgumentParser, SUPPRESS
+from cci_tagger.benchmarks import synthetic
+import datetime
+import json
+import os
+import pathlib
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+SCENARIOS = ['startup', 'process_datasets', 'get_file_tags']
+
+DEFAULT_SIZES = [1000]
+
+# Directory containing the cci_tagger package
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def peak_rss():
+    """
+    :return: Peak resident set size of this process (bytes)
+    """
+    import resource
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Linux reports kilobytes, macOS bytes
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def _start_tagger(manifest, suppress_file_output=True):
+    """
+    :return: ProcessDatasets, seconds taken to import and create it
+    """
+    start = time.perf_counter()
+
+    from cci_tagger.tagger import ProcessDatasets
+
+    pds = ProcessDatasets(suppress_file_output=suppress_file_output, json_files=manifest['json_files'],
+                          facet_json=manifest['vocab'])
+
+    return pds, time.perf_counter() - start
+
+
+def run_scenario(name, root):
+    """
+    Run a scenario in this process
+
+    :param name: Scenario name
+    :param root: Archive directory
+    :return: results (dict)
+    """
+    manifest = synthetic.load_manifest(root)
+
+    if name == 'startup':
+        _, startup = _start_tagger(manifest)
+        files = 0
+        seconds = startup
+
+    elif name == 'process_datasets':
+        # The output files are written, as in a real run
+        pds, startup = _start_tagger(manifest, suppress_file_output=False)
+
+        start = time.perf_counter()
+        pds.process_datasets(manifest['datasets'])
+        seconds = time.perf_counter() - start
+        files = manifest['files']
+
+    elif name == 'get_file_tags':
+        from cci_tagger.dataset.dataset import Dataset
+
+        pds, startup = _start_tagger(manifest)
+
+        # Only the time spent tagging is counted, not listing the files
+        files = 0
+        seconds = 0
+        for dataset in manifest['datasets']:
+            for path in Dataset.iter_files(pathlib.Path(dataset)):
+                start = time.perf_counter()
+                pds.get_file_tags(path)
+                seconds += time.perf_counter() - start
+                files += 1
+
+    else:
+        raise ValueError(f'Unknown scenario: {name}')
+
+    return {
+        'scenario': name,
+        'files': files,
+        'seconds': seconds,
+        'files_per_second': files / seconds if files and seconds else None,
+        'startup_seconds': startup,
+        'peak_rss_bytes': peak_rss()
+    }
+
+
+def run_in_subprocess(name, root):
+    """
+    Run a scenario in a new Python process. The output files are written to
+    a temporary directory.
+
+    :param name: Scenario name
+    :param root: Archive directory
+    :return: results (dict)
+    """
+    # Import this copy of the package, whether or not it is installed
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [PACKAGE_DIR, env.get('PYTHONPATH')]))
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        result = subprocess.run(
+            [sys.executable, '-m', 'cci_tagger.benchmarks.end_to_end', '--scenario', name, '--root', root],
+            cwd=tmpdir, env=env, stdout=subprocess.PIPE, check=True, universal_newlines=True
+        )
+
+    # The tagger prints to stdout, the results are on the last line
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def get_archive(workdir, files, seed=0):
+    """
+    Build the archive for the size or reuse one built by an earlier run
+
+    :param workdir: Directory holding the archives
+    :param files: Number of files
+    :param seed: Random seed
+    :return: Archive directory
+    """
+    root = os.path.join(workdir, f'{files}_files_seed{seed}')
+    manifest = synthetic.load_manifest(root)
+
+    if manifest is None or manifest['generator_version'] != synthetic.GENERATOR_VERSION:
+        print(f'Building an archive of {files} files in {root}', file=sys.stderr)
+        synthetic.generate_archive(root, files, seed=seed)
+
+    return root
+
+
+def git_commit():
+    """
+    :return: Commit of the working tree | None
+    """
+    try:
+        result = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(__file__),
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True)
+    except OSError:
+        return
+
+    return result.stdout.strip() or None
+
+
+def run(sizes, scenarios, workdir, seed=0):
+    """
+    Run the scenarios for each size
+
+    :param sizes: Numbers of files (list)
+    :param scenarios: Scenario names (list)
+    :param workdir: Directory holding the archives
+    :param seed: Random seed for the archives
+    :return: results (dict)
+    """
+    results = []
+
+    for files in sizes:
+        root = get_archive(workdir, files, seed)
+        datasets = len(synthetic.load_manifest(root)['datasets'])
+
+        for name in scenarios:
+            print(f'Running {name} with {files} files', file=sys.stderr)
+
+            result = run_in_subprocess(name, root)
+            result.update(size=files, datasets=datasets)
+            results.append(result)
+
+    return {
+        'commit': git_commit(),
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'results': results
+    }
+
+
+def format_table(report):
+    lines = [f'{"size":>9} {"scenario":<18} {"files/s":>10} {"seconds":>9} {"startup":>8} {"peak RSS MB":>12}']
+
+    for result in report['results']:
+        rate = result['files_per_second']
+        lines.append(
+            f'{result["size"]:>9} {result["scenario"]:<18} {rate if rate else 0:>10.1f} {result["seconds"]:>9.2f} '
+            f'{result["startup_seconds"]:>8.2f} {result["peak_rss_bytes"] / 1024 ** 2:>12.1f}'
+        )
+
+    return '\n'.join(lines)
+
+
+def main():
+    parser = ArgumentParser(description='End-to-end benchmarks of the tagger over synthetic archives')
+    parser.add_argument('--sizes', help='Numbers of files. DEFAULT: %(default)s', type=int, nargs='+',
+                        default=DEFAULT_SIZES)
+    parser.add_argument('--scenarios', help='Scenarios to run. DEFAULT: all', nargs='+', choices=SCENARIOS,
+                        default=SCENARIOS)
+    parser.add_argument('--workdir', help='Directory for the archives, kept between runs. DEFAULT: %(default)s',
+                        default=os.path.join(tempfile.gettempdir(), 'cci_tagger_benchmarks'))
+    parser.add_argument('--seed', help='Random seed for the archives. DEFAULT: %(default)s', type=int, default=0)
+    parser.add_argument('--output', help='Write the results to this JSON file')
+
+    # Used to run a scenario in a new process
+    parser.add_argument('--scenario', help=SUPPRESS, choices=SCENARIOS)
+    parser.add_argument('--root', help=SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scenario:
+        print(json.dumps(run_scenario(args.scenario, args.root)))
+        return
+
+    report = run(args.sizes, args.scenarios, args.workdir, args.seed)
+
+    print(format_table(report))
+
+    if args.output:
+        with open(args.output, 'w') as writer:
+            json.dump(report, writer, indent=4)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+# encoding: utf-8
+"""
+Benchmark for the time taken to import the modules behind the command line
+scripts. Each module is imported in a new Python process with
+``python -X importtime`` and the import times of the module and everything
+it imports are added up. Interpreter start-up is not included.
+
+    python -m cci_tagger.benchmarks.importtime [--check]
+
+With --check the run fails if a module takes longer than its target or
+imports one of the slow dependencies, which are only imported when they are
+needed.
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+from argparse import ArgumentParser
+from cci_tagger.benchmarks.end_to_end import PACKAGE_DIR
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Target import time for each module (milliseconds)
+TARGETS = {
+    'cci_tagger.scripts.check_json': 20,
+    'cci_tagger.tagger': 60,
+    'cci_tagger.scripts.command_line_client': 80,
+}
+
+# Modules which should not be imported by importing the targets
+SLOW_MODULES = ('rdflib', 'SPARQLWrapper', 'netCDF4', 'h5py', 'numpy', 'cci_tagger_json', 'asyncio', 'pydoc')
+
+
+def parse_importtime(output):
+    """
+    Parse the output of python -X importtime. The modules imported while
+    the interpreter starts, up to and including site, are left out.
+
+    :param output: stderr of the process
+    :return: total time (microseconds), {module: self time (microseconds)}
+    """
+    entries = []
+
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+
+        self_time, cumulative, name = line[len('import time:'):].split('|')
+
+        # Skip the header
+        if not self_time.strip().isdigit():
+            continue
+
+        entries.append((int(self_time), int(cumulative), name))
+
+    start = 0
+    for i, (_, _, name) in enumerate(entries):
+        if name.strip() == 'site' and not name.startswith('  '):
+            start = i + 1
+
+    entries = entries[start:]
+
+    # Modules imported directly have no indent and their cumulative time
+    # includes everything they import
+    total = sum(cumulative for _, cumulative, name in entries if not name.startswith('  '))
+
+    return total, {name.strip(): self_time for self_time, _, name in entries}
+
+
+def measure(module, repeat=5):
+    """
+    Import the module in a new process, repeat times
+
+    :param module: Module name
+    :param repeat: Number of imports
+    :return: {'module', 'median_ms', 'times_ms', 'slow_modules', 'self_times'}
+    """
+    # Import this copy of the package, whether or not it is installed
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [PACKAGE_DIR, env.get('PYTHONPATH')]))
+
+    times = []
+    self_times = {}
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for _ in range(repeat):
+            result = subprocess.run(
+                [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                cwd=tmpdir, env=env, stderr=subprocess.PIPE, check=True, universal_newlines=True
+            )
+
+            total, modules = parse_importtime(result.stderr)
+            times.append(total / 1000)
+
+            for name, self_time in modules.items():
+                self_times.setdefault(name, []).append(self_time / 1000)
+
+    slow_modules = {name.split('.')[0] for name in self_times} & set(SLOW_MODULES)
+
+    return {
+        'module': module,
+        'median_ms': statistics.median(times),
+        'times_ms': times,
+        'slow_modules': sorted(slow_modules),
+        'self_times': {name: statistics.median(values) for name, values in self_times.items()}
+    }
+
+
+def format_result(result, target=None, top=10):
+    status = ''
+    if target is not None:
+        status = 'ok' if result['median_ms'] <= target else 'over target'
+        status = f' (target {target} ms, {status})'
+
+    lines = [f'{result["module"]}: {result["median_ms"]:.1f} ms{status}']
+
+    if result['slow_modules']:
+        lines.append(f'    imports {", ".join(result["slow_modules"])}')
+
+    slowest = sorted(result['self_times'].items(), key=lambda item: item[1], reverse=True)[:top]
+    for name, self_time in slowest:
+        lines.append(f'    {self_time:7.2f} ms  {name}')
+
+    return '\n'.join(lines)
+
+
+def main():
+    parser = ArgumentParser(description='Measure the time taken to import the command line scripts')
+    parser.add_argument('--modules', help='Modules to import. DEFAULT: the command line scripts', nargs='+',
+                        default=list(TARGETS))
+    parser.add_argument('--repeat', help='Imports of each module. DEFAULT: %(default)s', type=int, default=5)
+    parser.add_argument('--top', help='Slowest modules shown. DEFAULT: %(default)s', type=int, default=10)
+    parser.add_argument('--check', help='Fail if a module is over its target or imports a slow dependency',
+                        action='store_true')
+    args = parser.parse_args()
+
+    failed = []
+
+    for module in args.modules:
+        result = measure(module, args.repeat)
+        target = TARGETS.get(module)
+
+        print(format_result(result, target, args.top))
+
+        if result['slow_modules'] or (target is not None and result['median_ms'] > target):
+            failed.append(module)
+
+    if args.check and failed:
+        print(f'Failed: {", ".join(failed)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
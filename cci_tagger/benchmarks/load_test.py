@@ -0,0 +1,114 @@
+# encoding: utf-8
+"""
+Load test for the tagging service. Sends tagging requests from a number of
+concurrent clients and reports the requests per second and latencies.
+
+    python -m cci_tagger.benchmarks.load_test --url http://localhost:8080 --paths paths.txt
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+from argparse import ArgumentParser
+from cci_tagger.client import TaggerClient
+import itertools
+import threading
+import time
+
+
+def percentile(values, pct):
+    """
+    :param values: Sorted values
+    :param pct: Percentile (0-100)
+    :return: Value at the percentile
+    """
+    if not values:
+        return 0
+
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def run(client, paths, concurrency=8, duration=10, batch_size=1):
+    """
+    Send requests for the duration
+
+    :param client: TaggerClient
+    :param paths: Paths to tag (list)
+    :param concurrency: Number of clients sending requests
+    :param duration: Length of the test (seconds)
+    :param batch_size: Paths in each request. 1 uses single file requests
+    :return: results (dict)
+    """
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    batches = itertools.cycle([paths[i:i + batch_size] for i in range(0, len(paths), batch_size)])
+    end = time.perf_counter() + duration
+
+    def worker():
+        while time.perf_counter() < end:
+            with lock:
+                batch = next(batches)
+
+            start = time.perf_counter()
+            try:
+                if batch_size == 1:
+                    client.get_file_tags(batch[0])
+                else:
+                    client.get_files_tags(batch)
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+                continue
+
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'requests_per_second': len(latencies) / elapsed,
+        'files_per_second': len(latencies) * batch_size / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+    }
+
+
+def main():
+    parser = ArgumentParser(description='Load test the tagging service')
+    parser.add_argument('--url', help='URL of the service')
+    parser.add_argument('--socket', help='Unix socket of the service')
+    parser.add_argument('--paths', help='File with one path to tag on each line', required=True)
+    parser.add_argument('--concurrency', help='Concurrent clients. DEFAULT: %(default)s', type=int, default=8)
+    parser.add_argument('--duration', help='Length of the test in seconds. DEFAULT: %(default)s', type=float, default=10)
+    parser.add_argument('--batch-size', help='Paths in each request. DEFAULT: %(default)s', type=int, default=1)
+    args = parser.parse_args()
+
+    with open(args.paths) as reader:
+        paths = [line.strip() for line in reader if line.strip()]
+
+    client = TaggerClient(url=args.url, socket_path=args.socket)
+    results = run(client, paths, args.concurrency, args.duration, args.batch_size)
+
+    for key, value in results.items():
+        print(f'{key}: {value:.2f}' if isinstance(value, float) else f'{key}: {value}')
+
+
+if __name__ == '__main__':
+    main()
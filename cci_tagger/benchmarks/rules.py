@@ -0,0 +1,136 @@
+# encoding: utf-8
+"""
+Microbenchmark for the per-file cost of applying the user defined defaults,
+mappings, merged attributes and overrides to the attributes from a file.
+
+The compiled rules are compared against a reference implementation which
+searches the mappings for every term, as the dataset did before the rules
+were compiled.
+
+    python -m cci_tagger.benchmarks.rules [--json example.json] [--files 100000]
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+from argparse import ArgumentParser
+from cci_tagger.conf import constants
+from cci_tagger.dataset.rules import DatasetRules
+import json
+import os
+import re
+import time
+
+EXAMPLE_JSON = os.path.join(os.path.dirname(__file__), '..', 'tests', 'test_json_files', 'example.json')
+
+# A spread of attributes like those found in CCI files
+FILE_ATTRIBUTES = [
+    {
+        constants.PLATFORM: 'ERS2, ENV',
+        constants.SENSOR: 'ATSR2;AATSR',
+        constants.INSTITUTION: 'DTU Space - Div. of Geodynamics',
+        constants.PRODUCT_VERSION: '03.02.'
+    },
+    {
+        constants.PLATFORM: 'ERS-<1,2>',
+        constants.INSTITUTION: 'ICARE ; HYGEOS, Euratechnologies',
+        constants.PRODUCT_VERSION: '2.0'
+    },
+    {
+        constants.SENSOR: 'AMSR-E',
+        constants.INSTITUTION: 'University of Leicester',
+    },
+]
+
+
+class ReferenceRules(DatasetRules):
+    """
+    The rules as they were applied before they were compiled. Every
+    mapping key is lowercased for every term and the patterns are
+    compiled on each call.
+    """
+
+    def get_mapping(self, facet, term):
+        term = term.lower().strip()
+        facet_map = self._raw_mappings.get(facet)
+
+        if facet_map:
+            for key in facet_map:
+                if term == key.lower():
+                    return facet_map[key].lower()
+
+        return term
+
+    def merge_attribute(self, attr):
+        return self._merged_attribute(attr)
+
+    @staticmethod
+    def split_multiplatforms(segments):
+        split_segments = []
+        pattern = re.compile(r'(.*-)<(.*)>.*')
+
+        for segment in segments:
+            m = re.match(pattern, segment)
+            if m:
+                split_segments.extend([f'{m.group(1)}{val}' for val in m.group(2).split(',')])
+            else:
+                split_segments.append(segment)
+
+        return split_segments
+
+
+def load_rules(json_file, rules_class):
+    with open(json_file) as reader:
+        data = json.load(reader)
+
+    mappings = data.get('mappings', {})
+    merged = mappings.get('merged', {})
+
+    rules = rules_class(
+        'benchmark',
+        defaults=data.get('defaults'),
+        mappings=mappings,
+        overrides=data.get('overrides'),
+        merged_attribute=lambda attr: merged.get(attr, attr)
+    )
+    rules._raw_mappings = mappings
+
+    return rules
+
+
+def run(rules, files):
+    """
+    Apply the rules to the given number of files
+
+    :param rules: DatasetRules
+    :param files: Number of files (int)
+    :return: CPU time per file in microseconds (float)
+    """
+    start = time.process_time()
+
+    for i in range(files):
+        attributes = dict(FILE_ATTRIBUTES[i % len(FILE_ATTRIBUTES)])
+        attributes = rules.process_file_attributes(attributes)
+        rules.apply_overrides(rules.apply_mapping(attributes))
+
+    return (time.process_time() - start) / files * 1e6
+
+
+def main():
+    parser = ArgumentParser(description='Measure the per-file CPU cost of the dataset rules')
+    parser.add_argument('--json', help='JSON mappings file', default=EXAMPLE_JSON)
+    parser.add_argument('--files', help='Number of files to process', type=int, default=100000)
+    args = parser.parse_args()
+
+    reference = run(load_rules(args.json, ReferenceRules), args.files)
+    compiled = run(load_rules(args.json, DatasetRules), args.files)
+
+    print(f'reference: {reference:.2f} us/file')
+    print(f'compiled:  {compiled:.2f} us/file')
+    print(f'speedup:   {reference / compiled:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,376 @@
+# encoding: utf-8
+"""
+Benchmark runner which checks for performance regressions. Each scenario is
+timed a number of times over a synthetic archive and the samples are
+compared with a stored baseline. The run fails if a scenario is
+significantly slower than the baseline. No network access is needed.
+
+    cci_tagger_bench                       compare with the packaged baseline
+    cci_tagger_bench --write-baseline      record a new baseline
+    cci_tagger_bench --scenarios vocab_load drs_generation
+
+The run fails if there is no baseline to compare with, so a missing
+baseline cannot pass the check. Record one with --write-baseline.
+
+A scenario is a regression when its median time is more than the threshold
+slower than the baseline and a one-sided Mann-Whitney U test on the samples
+gives a p-value below alpha. The baseline times are scaled by a calibration
+loop timed with each run, so a baseline recorded on another machine is
+comparable.
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+from argparse import ArgumentParser
+from cci_tagger.benchmarks import synthetic
+from cci_tagger.benchmarks.end_to_end import get_archive, git_commit
+import datetime
+import json
+import logging
+import math
+import os
+import pathlib
+import platform
+import sys
+import tempfile
+import time
+import numpy as np
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+BASELINE_VERSION = 1
+
+# A scenario is a regression when it is this fraction slower than the baseline
+THRESHOLD = 0.25
+
+# and the slowdown is significant at this level
+ALPHA = 0.01
+
+
+def calibrate(repeat=5):
+    """
+    Time a fixed pure Python workload, used to scale the baseline to the
+    speed of this machine
+
+    :param repeat: Number of times to run the workload
+    :return: Median time (seconds)
+    """
+    times = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+
+        values = {}
+        for i in range(200000):
+            values[f'term-{i % 5000}'] = values.get(f'term-{i % 5000}', 0) + i
+        sorted(values.items(), key=lambda item: item[1])
+
+        times.append(time.perf_counter() - start)
+
+    return float(np.median(times))
+
+
+class Scenarios(object):
+    """
+    The scenarios, run over a synthetic archive. Each scenario returns the
+    number of operations it timed.
+    """
+
+    NAMES = ['vocab_load', 'filename_parsing', 'term_resolution', 'drs_generation', 'dataset']
+
+    def __init__(self, root):
+        """
+        :param root: Synthetic archive directory
+        """
+        from cci_tagger_json import DatasetJSONMappings
+        from cci_tagger.dataset.dataset import Dataset
+        from cci_tagger.facets import Facets
+
+        self._dataset_class = Dataset
+        self._facets_class = Facets
+
+        self.manifest = synthetic.load_manifest(root)
+        self.mappings = DatasetJSONMappings(self.manifest['json_files'])
+        self.vocab_load()
+        self.facets = self._facets
+
+        self.datasets = [self._new_dataset(dataset_id) for dataset_id in self.manifest['datasets']]
+        self.files = [
+            (dataset, path)
+            for dataset in self.datasets
+            for path in Dataset.iter_files(pathlib.Path(dataset.id))
+        ]
+
+        # Tags and URIs for each file, used by the scenarios which start
+        # part way through tagging a file
+        self.file_tags = [(dataset, path, dataset.read_file_tags(filepath=path)) for dataset, path in self.files]
+        self.file_uris = []
+        for dataset, path, (file_tags, metadata) in self.file_tags:
+            uris = dataset.resolve_file_tags(dict(file_tags), dict(metadata))
+            self.file_uris.append((dataset, path, uris, dataset.MULTIPLATFORM))
+
+    def _new_dataset(self, dataset_id):
+        return self._dataset_class(dataset_id, self.mappings, self.facets)
+
+    def vocab_load(self):
+        """
+        Load the vocab from the snapshot written by export_facet_json
+        """
+        with open(self.manifest['vocab']) as reader:
+            self._facets = self._facets_class.from_json(json.load(reader))
+
+        return 1
+
+    def filename_parsing(self):
+        for dataset, path in self.files:
+            dataset._parse_file_name(path)
+
+        return len(self.files)
+
+    def term_resolution(self):
+        # The cache is cleared so every file is mapped and resolved
+        for dataset, path, (file_tags, metadata) in self.file_tags:
+            dataset._uri_cache.clear()
+            dataset.resolve_file_tags(dict(file_tags), dict(metadata))
+
+        return len(self.file_tags)
+
+    def drs_generation(self):
+        # The cache is cleared so every DRS is generated
+        for dataset, path, uris, multiplatform in self.file_uris:
+            dataset._drs_cache.clear()
+            dataset.get_drs(uris, path, multiplatform)
+
+        return len(self.file_uris)
+
+    def dataset(self):
+        """
+        Process every dataset, reading the files
+        """
+        for dataset_id in self.manifest['datasets']:
+            self._new_dataset(dataset_id).process_dataset()
+
+        return len(self.files)
+
+    def run(self, name, samples=10, warmup=1):
+        """
+        Time a scenario
+
+        :param name: Scenario name
+        :param samples: Number of timed runs
+        :param warmup: Number of untimed runs first
+        :return: {'samples': seconds per operation for each run, 'median', 'operations'}
+        """
+        scenario = getattr(self, name)
+
+        for _ in range(warmup):
+            scenario()
+
+        times = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            operations = scenario()
+            times.append((time.perf_counter() - start) / operations)
+
+        return {
+            'samples': times,
+            'median': float(np.median(times)),
+            'operations': operations
+        }
+
+
+def _ranks(values):
+    """
+    Ranks starting at 1, with tied values given their average rank
+    """
+    order = np.argsort(values, kind='mergesort')
+    ranks = np.empty(len(values))
+    sorted_values = values[order]
+
+    start = 0
+    while start < len(values):
+        end = start
+        while end + 1 < len(values) and sorted_values[end + 1] == sorted_values[start]:
+            end += 1
+
+        ranks[order[start:end + 1]] = (start + end) / 2 + 1
+        start = end + 1
+
+    return ranks
+
+
+def mann_whitney_greater(current, baseline):
+    """
+    One-sided Mann-Whitney U test that the current samples are larger than
+    the baseline samples, using the normal approximation with a tie
+    correction
+
+    :param current: Samples (list)
+    :param baseline: Samples (list)
+    :return: p-value
+    """
+    current = np.asarray(current, dtype=float)
+    baseline = np.asarray(baseline, dtype=float)
+    n1, n2 = len(current), len(baseline)
+
+    if not n1 or not n2:
+        return 1.0
+
+    combined = np.concatenate([current, baseline])
+    ranks = _ranks(combined)
+
+    u = ranks[:n1].sum() - n1 * (n1 + 1) / 2
+    mean = n1 * n2 / 2
+
+    _, counts = np.unique(combined, return_counts=True)
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - (counts ** 3 - counts).sum() / (n * (n - 1)))
+
+    if variance <= 0:
+        return 1.0
+
+    # Continuity correction
+    z = (u - mean - 0.5) / math.sqrt(variance)
+
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def compare(report, baseline, threshold=THRESHOLD, alpha=ALPHA):
+    """
+    Compare a run with the baseline
+
+    :param report: Results of this run
+    :param baseline: Results of the baseline run
+    :param threshold: Fraction slower than the baseline which counts as a regression
+    :param alpha: Significance level
+    :return: [{'scenario', 'change', 'p_value', 'status'}]
+    """
+    scale = report['calibration'] / baseline['calibration']
+    comparisons = []
+
+    for name, result in report['scenarios'].items():
+        expected = baseline['scenarios'].get(name)
+
+        if expected is None:
+            comparisons.append({'scenario': name, 'change': None, 'p_value': None, 'status': 'new'})
+            continue
+
+        expected_samples = [sample * scale for sample in expected['samples']]
+        change = result['median'] / (expected['median'] * scale) - 1
+
+        status = 'ok'
+        if change > threshold and mann_whitney_greater(result['samples'], expected_samples) < alpha:
+            status = 'regression'
+
+        elif change < -threshold and mann_whitney_greater(expected_samples, result['samples']) < alpha:
+            status = 'improvement'
+
+        comparisons.append({
+            'scenario': name,
+            'change': change,
+            'p_value': mann_whitney_greater(result['samples'], expected_samples),
+            'status': status
+        })
+
+    return comparisons
+
+
+def run(scenarios, files=2000, samples=10, workdir=None):
+    """
+    Run the scenarios
+
+    :param scenarios: Scenario names (list)
+    :param files: Number of files in the synthetic archive
+    :param samples: Number of timed runs of each scenario
+    :param workdir: Directory for the archive, kept between runs
+    :return: report (dict)
+    """
+    root = get_archive(workdir, files)
+    runner = Scenarios(root)
+
+    report = {
+        'version': BASELINE_VERSION,
+        'commit': git_commit(),
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'files': files,
+        'calibration': calibrate(),
+        'scenarios': {}
+    }
+
+    for name in scenarios:
+        print(f'Running {name}', file=sys.stderr)
+        report['scenarios'][name] = runner.run(name, samples)
+
+    return report
+
+
+def format_comparison(report, comparisons):
+    lines = [f'{"scenario":<18} {"median us/op":>13} {"change":>8} {"p-value":>8}  status']
+
+    for comparison in comparisons:
+        name = comparison['scenario']
+        median = report['scenarios'][name]['median'] * 1e6
+        change = f'{comparison["change"]:+.1%}' if comparison['change'] is not None else '-'
+        p_value = f'{comparison["p_value"]:.3f}' if comparison['p_value'] is not None else '-'
+
+        lines.append(f'{name:<18} {median:>13.2f} {change:>8} {p_value:>8}  {comparison["status"]}')
+
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = ArgumentParser(description='Run the benchmarks and check for regressions against a baseline')
+    parser.add_argument('--scenarios', help='Scenarios to run. DEFAULT: all', nargs='+', choices=Scenarios.NAMES,
+                        default=Scenarios.NAMES)
+    parser.add_argument('--baseline', help='Baseline JSON. DEFAULT: the packaged baseline', default=BASELINE_FILE)
+    parser.add_argument('--write-baseline', help='Write the results as the new baseline', action='store_true')
+    parser.add_argument('--output', help='Also write the results to this JSON file')
+    parser.add_argument('--samples', help='Timed runs of each scenario. DEFAULT: %(default)s', type=int, default=10)
+    parser.add_argument('--files', help='Files in the synthetic archive. DEFAULT: %(default)s', type=int,
+                        default=2000)
+    parser.add_argument('--threshold', help='Fraction slower than the baseline which fails. DEFAULT: %(default)s',
+                        type=float, default=THRESHOLD)
+    parser.add_argument('--alpha', help='Significance level. DEFAULT: %(default)s', type=float, default=ALPHA)
+    parser.add_argument('--workdir', help='Directory for the archive, kept between runs. DEFAULT: %(default)s',
+                        default=os.path.join(tempfile.gettempdir(), 'cci_tagger_benchmarks'))
+    args = parser.parse_args(argv)
+
+    if not args.write_baseline and not os.path.exists(args.baseline):
+        parser.error(f'there is no baseline at {args.baseline}. Record one with --write-baseline')
+
+    # The synthetic archive is valid, so only errors are shown
+    logging.basicConfig(level=logging.ERROR)
+
+    report = run(args.scenarios, args.files, args.samples, args.workdir)
+
+    if args.output:
+        with open(args.output, 'w') as writer:
+            json.dump(report, writer, indent=4)
+
+    if args.write_baseline:
+        with open(args.baseline, 'w') as writer:
+            json.dump(report, writer, indent=4)
+
+        print(f'Baseline written to {args.baseline}')
+        return
+
+    with open(args.baseline) as reader:
+        baseline = json.load(reader)
+
+    comparisons = compare(report, baseline, args.threshold, args.alpha)
+    print(format_comparison(report, comparisons))
+
+    regressions = [comparison['scenario'] for comparison in comparisons if comparison['status'] == 'regression']
+
+    if regressions:
+        print(f'Regressions: {", ".join(regressions)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,554 @@
+# encoding: utf-8
+"""
+Generator for synthetic CCI archives. Builds a tree of datasets with valid
+ESACCI file names, small netCDF files with realistic global attributes, a
+JSON mapping file for each dataset and a local vocab fixture, so the tagger
+can be benchmarked on any machine without the archive or the vocab server.
+
+    python -m cci_tagger.benchmarks.synthetic /tmp/cci_archive --files 100000
+
+The output directory contains:
+
+    data/          the datasets
+    json/          a JSON mapping file for each dataset
+    vocab.json     the vocab in the format written by export_facet_json
+    vocab_fixture.json.gz
+                   the vocab server responses when loading the vocab, for
+                   ReplayTransport
+    datasets.txt   the dataset paths, for moles_esgf_tag -f
+    manifest.json  the options used and the paths above
+
+The files in a dataset are hard links to one netCDF file for each year, so
+large archives are quick to build and take little space. Files are copied
+where hard links are not supported.
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+from argparse import ArgumentParser
+from cci_tagger.conf import constants
+import datetime
+import json
+import os
+import random
+import re
+import shutil
+import uuid
+
+# Changing the generator output should change the version so old archives
+# are rebuilt by the benchmarks
+GENERATOR_VERSION = 2
+
+VOCAB_URL = 'http://vocab.ceda.ac.uk/collection/cci'
+
+# Start date of every dataset. Each file in a dataset is one day later
+START_DATE = datetime.date(1990, 1, 1)
+
+# Processing levels as (alt label, pref label, broader alt label)
+PROCESSING_LEVELS = [
+    ('L3', 'Level 3', None),
+    ('L3C', 'Level 3 Collated', 'L3'),
+    ('L3S', 'Level 3 Super-collated', 'L3'),
+    ('L3U', 'Level 3 Uncollated', 'L3'),
+    ('L4', 'Level 4', None),
+]
+
+# Platforms and the programme they belong to
+PLATFORMS = {
+    'ALOS': 'ALOS',
+    'Aqua': 'EOS',
+    'ENVISAT': 'Envisat',
+    'ERS-1': 'ERS',
+    'ERS-2': 'ERS',
+    'MetOp-A': 'EPS',
+    'NOAA-16': 'NOAA POES',
+    'NOAA-18': 'NOAA POES',
+}
+
+# Programmes and the group they belong to
+PROGRAMMES = {
+    'ALOS': 'JAXA Missions',
+    'EOS': 'NASA Missions',
+    'Envisat': 'ESA Missions',
+    'EPS': 'Meteorological Satellites',
+    'ERS': 'ESA Missions',
+    'NOAA POES': 'Meteorological Satellites',
+}
+
+SENSORS = ['AATSR', 'AMI-SCAT', 'ASCAT', 'ATSR-2', 'AVHRR', 'MERIS', 'MODIS', 'PALSAR']
+
+FREQUENCIES = ['day', 'month', 'year', 'satellite-orbit-frequency']
+
+# The ECVs in the archive. Each dataset takes its terms from one ECV. The
+# platforms and sensors are written to the files as found in the archive,
+# some need the mappings in the JSON files and some are multi-valued.
+ECVS = [
+    {
+        'ecv': ('SST', 'Sea Surface Temperature'),
+        'data_types': [('SSTskin', 'Sea Surface Skin Temperature'), ('SSTdepth', 'Sea Surface Temperature at Depth')],
+        'products': ['AVHRR', 'OSTIA'],
+        'levels': ['L3C', 'L4'],
+        'frequencies': ['day'],
+        'form': 1,
+        'suffix': 'GLOB_CDR2.1',
+        'institution': 'University of Reading',
+        'instruments': [('NOAA-16', 'AVHRR'), ('ERS2', 'ATSR2'), ('ENV', 'AATSR')],
+    },
+    {
+        'ecv': ('OC', 'Ocean Colour'),
+        'data_types': [('CHLOR_A', 'Chlorophyll-a Concentration')],
+        'products': ['MERGED'],
+        'levels': ['L3S'],
+        'frequencies': ['day', 'month'],
+        'form': 2,
+        'suffix': '5D_DAILY_4km_GEO_PML_OCx',
+        'institution': 'Plymouth Marine Laboratory',
+        'instruments': [('ENVISAT, Aqua', 'MERIS, MODIS')],
+    },
+    {
+        'ecv': ('CLOUD', 'Cloud'),
+        'data_types': [('CLD_PRODUCTS', 'Cloud Products')],
+        'products': ['AVHRR_METOPA', 'ATSR2_AATSR'],
+        'levels': ['L3C', 'L3U'],
+        'frequencies': ['month'],
+        'form': 1,
+        'suffix': None,
+        'institution': 'Deutscher Wetterdienst',
+        'instruments': [('MetOp-A', 'AVHRR'), ('ERS-2, ENVISAT', 'ATSR-2, AATSR')],
+    },
+    {
+        'ecv': ('SOILMOISTURE', 'Soil Moisture'),
+        'data_types': [('SSMV', 'Surface Soil Moisture Volumetric')],
+        'products': ['COMBINED', 'ACTIVE', 'PASSIVE'],
+        'levels': ['L3S'],
+        'frequencies': ['day'],
+        'form': 2,
+        'suffix': None,
+        'institution': 'Vienna University of Technology',
+        'instruments': [('ERS-<1,2>, MetOp-A', 'AMI-SCAT, ASCAT')],
+    },
+    {
+        'ecv': ('BIOMASS', 'Biomass'),
+        'data_types': [('AGB', 'Above-ground Biomass')],
+        'products': ['MERGED'],
+        'levels': ['L4'],
+        'frequencies': ['year'],
+        'form': 2,
+        'suffix': '100m',
+        'institution': 'Aberystwyth University',
+        'instruments': [('ALOS', 'PALSAR')],
+    },
+]
+
+# Mappings for the platform and sensor values written to the files which are
+# not in the vocab
+MAPPINGS = {
+    constants.PLATFORM: {'ERS2': 'ERS-2', 'ENV': 'ENVISAT'},
+    constants.SENSOR: {'ATSR2': 'ATSR-2'},
+}
+
+
+def _uri(scheme, label):
+    return f'{VOCAB_URL}/{scheme}/{re.sub("[^a-z0-9]+", "_", label.lower()).strip("_")}'
+
+
+def _concepts(scheme, labels):
+    """
+    :param scheme: Name of the concept scheme
+    :param labels: [(label, pref label)]. The concept URI is made from the pref label
+    :return: {lowercase label: concept}
+    """
+    return {label.lower(): {'uri': _uri(scheme, pref), 'tag': label} for label, pref in labels}
+
+
+def build_vocab():
+    """
+    Build the vocab for the synthetic archive in the format written by
+    Facets.to_json. Load with Facets.from_json.
+
+    :return: dict
+    """
+    facets = {}
+
+    def add_facet(facet, scheme, pref_labels, alt_labels=()):
+        facets[facet] = _concepts(scheme, [(pref, pref) for pref in pref_labels])
+        facets[f'{facet}-alt'] = _concepts(scheme, alt_labels)
+
+    add_facet(constants.ECV, 'ecv', [e['ecv'][1] for e in ECVS], [e['ecv'] for e in ECVS])
+    add_facet(constants.DATA_TYPE, 'dataType',
+              [pref for e in ECVS for _, pref in e['data_types']],
+              [data_type for e in ECVS for data_type in e['data_types']])
+    add_facet(constants.FREQUENCY, 'freq', FREQUENCIES)
+    add_facet(constants.PLATFORM, 'platform', sorted(PLATFORMS))
+    add_facet(constants.PLATFORM_PROGRAMME, 'platformProg', sorted(PROGRAMMES))
+    add_facet(constants.PLATFORM_GROUP, 'platformGrp', sorted(set(PROGRAMMES.values())))
+    add_facet(constants.PROCESSING_LEVEL, 'procLev',
+              [pref for _, pref, _ in PROCESSING_LEVELS],
+              [(alt, pref) for alt, pref, _ in PROCESSING_LEVELS])
+    add_facet(constants.SENSOR, 'sensor', SENSORS)
+    add_facet(constants.INSTITUTION, 'org', sorted({e['institution'] for e in ECVS}))
+    add_facet(constants.PRODUCT_STRING, 'product', sorted({p for e in ECVS for p in e['products']}))
+
+    # Level 2 data uses the satellite orbit frequency
+    facets[constants.FREQUENCY]['satellite-orbit-frequency']['uri'] = constants.LEVEL_2_FREQUENCY
+
+    pref_labels = {alt: pref for alt, pref, _ in PROCESSING_LEVELS}
+    proc_level_mappings = {
+        _uri('procLev', pref): _uri('procLev', pref_labels[broader])
+        for alt, pref, broader in PROCESSING_LEVELS if broader
+    }
+    facets[constants.BROADER_PROCESSING_LEVEL] = {
+        broader: _uri('procLev', pref_labels[broader])
+        for _, _, broader in PROCESSING_LEVELS if broader
+    }
+
+    # Reversed mappings from URI to tag, as built by Facets
+    reversible = {}
+    for facet, concepts in facets.items():
+        reversible[facet] = {
+            concept if isinstance(concept, str) else concept['uri']:
+                label if isinstance(concept, str) else concept['tag']
+            for label, concept in concepts.items()
+        }
+
+    return {
+        '__facets': facets,
+        '__platform_programme_mappings': {
+            _uri('platform', platform): programme for platform, programme in PLATFORMS.items()
+        },
+        '__programme_group_mappings': {
+            _uri('platformProg', programme): group for programme, group in PROGRAMMES.items()
+        },
+        '__proc_level_mappings': proc_level_mappings,
+        '__reversible_facets': reversible
+    }
+
+
+def build_vocab_graph(vocab=None):
+    """
+    Build an RDF graph of the vocab, as served by the vocab server, so the
+    queries made by Facets can be answered without the network.
+
+    :param vocab: Vocab from build_vocab. Default: the synthetic vocab
+    :return: rdflib.Dataset
+    """
+    from rdflib import Dataset, Literal, URIRef
+    from rdflib.namespace import SKOS
+    from cci_tagger.facets import Facets
+
+    vocab = vocab or build_vocab()
+    facets = vocab['__facets']
+
+    dataset = Dataset()
+    graph = dataset.graph(URIRef(f'{VOCAB_URL}/graph'))
+
+    for facet, scheme in Facets.FACET_ENDPOINTS.items():
+        for label_property, concepts in ((SKOS.prefLabel, facets[facet]), (SKOS.altLabel, facets[f'{facet}-alt'])):
+            for concept in concepts.values():
+                uri = URIRef(concept['uri'])
+                graph.add((uri, SKOS.inScheme, URIRef(scheme)))
+                graph.add((uri, label_property, Literal(concept['tag'])))
+
+    def add_narrower(broader_uri, uri):
+        graph.add((URIRef(broader_uri), SKOS.narrower, URIRef(uri)))
+
+    for platform_uri, programme in vocab['__platform_programme_mappings'].items():
+        add_narrower(facets[constants.PLATFORM_PROGRAMME][programme.lower()]['uri'], platform_uri)
+
+    for programme_uri, group in vocab['__programme_group_mappings'].items():
+        add_narrower(facets[constants.PLATFORM_GROUP][group.lower()]['uri'], programme_uri)
+
+    for proc_level_uri, broader_uri in vocab['__proc_level_mappings'].items():
+        add_narrower(broader_uri, proc_level_uri)
+
+    return dataset
+
+
+def write_vocab_fixture(path):
+    """
+    Record the queries made when loading the synthetic vocab with Facets()
+    as a fixture for ReplayTransport
+
+    :param path: Output file
+    :return: Path to the fixture
+    """
+    from cci_tagger.facets import Facets
+    from cci_tagger.triple_store import TripleStore
+    from cci_tagger.vocab_transport import GraphTransport, RecordingTransport
+
+    recorder = RecordingTransport(path, GraphTransport(build_vocab_graph()))
+    previous = TripleStore.set_transport(recorder)
+
+    try:
+        Facets()
+    finally:
+        TripleStore.set_transport(previous)
+
+    return recorder.save()
+
+
+def _file_name(spec, date):
+    """
+    ESACCI file name for a file in the dataset
+
+    :param spec: Dataset description
+    :param date: datetime.date
+    :return: str
+    """
+    suffix = f'-{spec["suffix"]}' if spec['suffix'] else ''
+    version = f'fv{spec["version"]}'
+
+    if spec['form'] == 1:
+        return (f'{date:%Y%m%d}-ESACCI-{spec["level"]}_{spec["ecv"]}-{spec["data_type"]}-'
+                f'{spec["product"]}{suffix}-{version}.nc')
+
+    return (f'ESACCI-{spec["ecv"]}-{spec["level"]}-{spec["data_type"]}-{spec["product"]}{suffix}-'
+            f'{date:%Y%m%d}-{version}.nc')
+
+
+def dataset_specs(datasets, seed=0):
+    """
+    Describe the datasets in the archive. The ECVs are used in turn and the
+    other terms are chosen at random.
+
+    :param datasets: Number of datasets
+    :param seed: Random seed
+    :return: list of dicts
+    """
+    rnd = random.Random(seed)
+    specs = []
+
+    for i in range(datasets):
+        ecv = ECVS[i % len(ECVS)]
+        platform, sensor = rnd.choice(ecv['instruments'])
+        product = rnd.choice(ecv['products'])
+        version = f'{rnd.randint(1, 4)}.{rnd.randint(0, 2)}'
+
+        specs.append({
+            'name': f'{ecv["ecv"][0].lower()}_{product.lower()}_{i:05d}',
+            'ecv': ecv['ecv'][0],
+            'level': rnd.choice(ecv['levels']),
+            'data_type': rnd.choice(ecv['data_types'])[0],
+            'product': product,
+            'frequency': rnd.choice(ecv['frequencies']),
+            'form': ecv['form'],
+            'suffix': ecv['suffix'],
+            'institution': ecv['institution'],
+            'platform': platform,
+            'sensor': sensor,
+            'version': version,
+            'realisation': 'r2' if i % 5 == 4 else 'r1',
+        })
+
+    return specs
+
+
+def write_netcdf(path, spec, year):
+    """
+    Write a small netCDF file with the global attributes of a CCI file
+
+    :param path: Output file
+    :param spec: Dataset description
+    :param year: Year covered by the file
+    """
+    import netCDF4
+
+    attributes = {
+        'title': f'ESA CCI {spec["ecv"]} {spec["level"]} {spec["product"]} product',
+        'institution': spec['institution'],
+        'source': f'{spec["platform"]} {spec["sensor"]}',
+        'history': f'Created {datetime.date(2020, 1, 1):%Y-%m-%d} by the synthetic CCI archive generator',
+        'references': 'http://www.esa-cci.org',
+        'tracking_id': str(uuid.UUID(int=random.Random(f'{spec["name"]}-{year}').getrandbits(128))),
+        'Conventions': 'CF-1.7',
+        'product_version': spec['version'],
+        'summary': f'Synthetic {spec["ecv"]} data for benchmarking the CCI tagger',
+        'keywords': f'{spec["ecv"]}, ESA CCI',
+        'naming_authority': 'uk.ac.ceda',
+        'cdm_data_type': 'Grid',
+        'comment': 'These data were produced for testing and contain no measurements',
+        'date_created': '20200101T000000Z',
+        'creator_name': spec['institution'],
+        'project': 'Climate Change Initiative - European Space Agency',
+        'geospatial_lat_min': -90.0,
+        'geospatial_lat_max': 90.0,
+        'geospatial_lon_min': -180.0,
+        'geospatial_lon_max': 180.0,
+        'time_coverage_start': f'{year}0101T000000Z',
+        'time_coverage_end': f'{year}1231T235959Z',
+        'time_coverage_resolution': spec['frequency'],
+        'standard_name_vocabulary': 'NetCDF Climate and Forecast (CF) Metadata Convention version 67',
+        'license': 'ESA CCI Data Policy: free and open access',
+        'platform': spec['platform'],
+        'sensor': spec['sensor'],
+        'spatial_resolution': '0.05 degree',
+        'key_variables': spec['data_type'],
+    }
+
+    with netCDF4.Dataset(path, 'w', format='NETCDF3_CLASSIC') as writer:
+        writer.setncatts(attributes)
+
+        writer.createDimension('time', 1)
+        writer.createDimension('lat', 4)
+        writer.createDimension('lon', 4)
+
+        variable = writer.createVariable(spec['data_type'].lower(), 'f4', ('time', 'lat', 'lon'))
+        variable.long_name = spec['data_type']
+        variable[:] = 0
+
+
+def _link(source, target):
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+def write_dataset(data_dir, spec, files):
+    """
+    Write the files for a dataset
+
+    :param data_dir: Directory for the datasets
+    :param spec: Dataset description
+    :param files: Number of files
+    :return: Dataset path
+    """
+    dataset_path = os.path.join(data_dir, spec['ecv'].lower(), spec['name'], f'v{spec["version"]}')
+    template_dir = os.path.join(dataset_path, '.templates')
+    os.makedirs(template_dir, exist_ok=True)
+
+    template = None
+    year = None
+
+    for i in range(files):
+        date = START_DATE + datetime.timedelta(days=i)
+
+        # A new file is written for each year. The other files are links to it
+        if date.year != year:
+            year = date.year
+            year_dir = os.path.join(dataset_path, str(year))
+            os.makedirs(year_dir, exist_ok=True)
+
+            template = os.path.join(template_dir, f'{year}.nc')
+            write_netcdf(template, spec, year)
+
+        _link(template, os.path.join(year_dir, _file_name(spec, date)))
+
+    # Only the linked files should be found in the dataset
+    shutil.rmtree(template_dir)
+
+    return dataset_path
+
+
+def write_mapping_file(path, dataset_path, spec):
+    """
+    Write the JSON mapping file for a dataset
+
+    :param path: Output file
+    :param dataset_path: Path to the dataset
+    :param spec: Dataset description
+    """
+    mapping = {
+        'datasets': [dataset_path],
+        'mappings': MAPPINGS,
+    }
+
+    if spec['realisation'] != 'r1':
+        mapping['realisations'] = {dataset_path: spec['realisation']}
+
+    with open(path, 'w') as writer:
+        json.dump(mapping, writer, indent=4)
+
+
+def generate_archive(root, files=1000, datasets=None, seed=0):
+    """
+    Build a synthetic archive
+
+    :param root: Output directory
+    :param files: Total number of files
+    :param datasets: Number of datasets. Default: one for each 200 files, at most 500
+    :param seed: Random seed
+    :return: manifest (dict)
+    """
+    if datasets is None:
+        datasets = default_dataset_count(files)
+
+    root = os.path.abspath(root)
+    data_dir = os.path.join(root, 'data')
+    json_dir = os.path.join(root, 'json')
+    os.makedirs(json_dir, exist_ok=True)
+
+    dataset_paths = []
+    json_files = []
+
+    for i, spec in enumerate(dataset_specs(datasets, seed)):
+        # Share the files out evenly
+        count = files // datasets + (1 if i < files % datasets else 0)
+
+        dataset_path = write_dataset(data_dir, spec, count)
+        json_file = os.path.join(json_dir, f'{spec["name"]}.json')
+        write_mapping_file(json_file, dataset_path, spec)
+
+        dataset_paths.append(dataset_path)
+        json_files.append(json_file)
+
+    vocab = os.path.join(root, 'vocab.json')
+    with open(vocab, 'w') as writer:
+        json.dump(build_vocab(), writer)
+
+    vocab_fixture = write_vocab_fixture(os.path.join(root, 'vocab_fixture.json.gz'))
+
+    with open(os.path.join(root, 'datasets.txt'), 'w') as writer:
+        writer.writelines(f'{path}\n' for path in dataset_paths)
+
+    manifest = {
+        'generator_version': GENERATOR_VERSION,
+        'files': files,
+        'seed': seed,
+        'datasets': dataset_paths,
+        'json_files': json_files,
+        'vocab': vocab,
+        'vocab_fixture': vocab_fixture
+    }
+
+    with open(os.path.join(root, 'manifest.json'), 'w') as writer:
+        json.dump(manifest, writer, indent=4)
+
+    return manifest
+
+
+def default_dataset_count(files):
+    return min(max(files // 200, 1), 500)
+
+
+def load_manifest(root):
+    """
+    :param root: Archive directory
+    :return: manifest (dict) | None if the archive has not been built
+    """
+    try:
+        with open(os.path.join(root, 'manifest.json')) as reader:
+            return json.load(reader)
+    except FileNotFoundError:
+        return
+
+
+def main():
+    parser = ArgumentParser(description='Build a synthetic CCI archive for benchmarking')
+    parser.add_argument('output', help='Output directory')
+    parser.add_argument('--files', help='Number of files. DEFAULT: %(default)s', type=int, default=1000)
+    parser.add_argument('--datasets', help='Number of datasets. DEFAULT: one for each 200 files, at most 500',
+                        type=int)
+    parser.add_argument('--seed', help='Random seed. DEFAULT: %(default)s', type=int, default=0)
+    args = parser.parse_args()
+
+    manifest = generate_archive(args.output, args.files, args.datasets, args.seed)
+
+    print(f'{manifest["files"]} files in {len(manifest["datasets"])} datasets written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+# encoding: utf-8
+"""
+Benchmark for loading the vocab with Facets() and looking up labels. The
+vocab server queries are answered from a fixture recorded with
+export_facet_json --record-vocab, so no network is needed. The recorded
+latency of each query can be added back with --simulate-latency.
+
+    python -m cci_tagger.benchmarks.vocab --fixture vocab_fixture.json.gz [--simulate-latency]
+
+Without --fixture the fixture for the synthetic vocab is used.
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+from argparse import ArgumentParser
+from cci_tagger.benchmarks import synthetic
+from cci_tagger.facets import Facets
+from cci_tagger.triple_store import TripleStore
+from cci_tagger.vocab_transport import ReplayTransport
+import os
+import tempfile
+import time
+
+
+def time_load(transport, repeat=5):
+    """
+    Load the vocab repeatedly
+
+    :param transport: ReplayTransport
+    :param repeat: Number of loads
+    :return: Facets, times for each load in seconds (list)
+    """
+    times = []
+    previous = TripleStore.set_transport(transport)
+
+    try:
+        for _ in range(repeat):
+            # Setting the transport clears the label caches, so each load
+            # makes every query
+            TripleStore.set_transport(transport)
+
+            start = time.perf_counter()
+            facets = Facets()
+            times.append(time.perf_counter() - start)
+    finally:
+        TripleStore.set_transport(previous)
+
+    return facets, times
+
+
+def time_lookups(facets, rounds=100):
+    """
+    Look up the label for every URI in the vocab and the pref label for
+    every alt label
+
+    :param facets: Facets
+    :param rounds: Number of times to look up each term
+    :return: CPU time per lookup in microseconds (float)
+    """
+    vocab = facets.to_json()
+    uris = []
+    alt_labels = []
+
+    for facet in facets.LABEL_SOURCE:
+        uris.extend((facet, uri) for uri in vocab['__reversible_facets'].get(facet, {}))
+
+        if f'{facet}-alt' in vocab['__facets']:
+            alt_labels.extend((facet, label) for label in facets.get_alt_labels(facet))
+
+    start = time.process_time()
+
+    for _ in range(rounds):
+        for facet, uri in uris:
+            facets.get_label_from_uri(facet, uri)
+
+        for facet, label in alt_labels:
+            facets.get_pref_label_from_alt_label(facet, label)
+
+    lookups = rounds * (len(uris) + len(alt_labels))
+
+    return (time.process_time() - start) / lookups * 1e6
+
+
+def main():
+    parser = ArgumentParser(description='Measure loading the vocab and looking up labels, offline')
+    parser.add_argument('--fixture', help='Fixture written by export_facet_json --record-vocab. '
+                                          'DEFAULT: the synthetic vocab')
+    parser.add_argument('--simulate-latency', help='Sleep for the recorded time of each query',
+                        action='store_true')
+    parser.add_argument('--latency-scale', help='Multiplier for the recorded times. DEFAULT: %(default)s',
+                        type=float, default=1.0)
+    parser.add_argument('--repeat', help='Number of times to load the vocab. DEFAULT: %(default)s', type=int,
+                        default=5)
+    parser.add_argument('--rounds', help='Number of times to look up each term. DEFAULT: %(default)s', type=int,
+                        default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fixture = args.fixture or synthetic.write_vocab_fixture(os.path.join(tmpdir, 'vocab_fixture.json'))
+        transport = ReplayTransport(fixture, args.simulate_latency, args.latency_scale)
+
+    facets, times = time_load(transport, args.repeat)
+    lookup = time_lookups(facets, args.rounds)
+
+    print(f'queries:  {len(transport.queries)} queries, {len(transport.documents)} documents, '
+          f'{transport.recorded_seconds:.2f}s when recorded')
+    print(f'load:     {min(times) * 1000:.2f} ms best, {sum(times) / len(times) * 1000:.2f} ms mean')
+    print(f'lookups:  {lookup:.2f} us/lookup')
+
+
+if __name__ == '__main__':
+    main()
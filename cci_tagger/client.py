@@ -0,0 +1,146 @@
+# encoding: utf-8
+"""
+Client for the tagging service in cci_tagger.server
+
+    client = TaggerClient('http://localhost:8080')
+    client = TaggerClient(socket_path='/tmp/cci_tagger.sock')
+
+    client.get_file_tags('/neodc/esacci/.../file.nc')
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+from urllib.parse import urlparse
+import http.client
+import json
+import socket
+import threading
+
+
+class TaggerError(Exception):
+    pass
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """
+    HTTP connection over a local Unix socket
+    """
+
+    def __init__(self, socket_path, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class TaggerClient(object):
+    """
+    Each thread keeps its own connection to the service, so one client can
+    be shared between threads.
+    """
+
+    def __init__(self, url=None, socket_path=None, timeout=None):
+        """
+        :param url: URL of the service e.g. http://localhost:8080
+        :param socket_path: Path to the Unix socket of the service
+        :param timeout: Socket timeout (seconds)
+        """
+        if not url and not socket_path:
+            raise ValueError('Either url or socket_path is required')
+
+        self.url = urlparse(url) if url else None
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _get_connection(self):
+        connection = getattr(self._local, 'connection', None)
+
+        if connection is None:
+            if self.socket_path:
+                connection = UnixHTTPConnection(self.socket_path, timeout=self.timeout)
+            else:
+                connection = http.client.HTTPConnection(self.url.hostname, self.url.port, timeout=self.timeout)
+
+            self._local.connection = connection
+
+        return connection
+
+    def request(self, method, path, data=None):
+        """
+        Make a request to the service
+
+        :param method: GET | POST
+        :param path: Endpoint e.g. /tags
+        :param data: Request body (dict)
+        :return: Response body (dict)
+        """
+        body = json.dumps(data).encode('utf-8') if data is not None else None
+        headers = {'Content-Type': 'application/json'} if body else {}
+
+        connection = self._get_connection()
+
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            result = json.loads(response.read())
+        except (http.client.HTTPException, OSError):
+            # Reconnect on the next request
+            connection.close()
+            self._local.connection = None
+            raise
+
+        if response.status != 200:
+            raise TaggerError(result.get('error', response.reason))
+
+        return result
+
+    def health(self):
+        return self.request('GET', '/health')
+
+    def get_file_tags(self, path):
+        """
+        :param path: Path to the file
+        :return: {'path', 'drs', 'labels', 'uris'}
+        """
+        return self.request('POST', '/tags', {'path': str(path)})
+
+    def get_files_tags(self, paths, workers=0):
+        """
+        :param paths: Paths to the files
+        :param workers: Number of threads used by the service to read the files
+        :return: list of {'path', 'drs', 'labels', 'uris'}
+        """
+        data = {'paths': [str(path) for path in paths], 'workers': workers}
+        return self.request('POST', '/tags', data)['results']
+
+    def reload(self, json_files=None, vocab=False, facet_json=None):
+        """
+        Reload the JSON mappings and, optionally, the vocabulary
+
+        :param json_files: JSON mapping files to load instead of the current ones
+        :param vocab: Reload the vocabulary
+        :param facet_json: Facet JSON dump to load the vocabulary from
+        """
+        data = {'vocab': vocab}
+
+        if json_files is not None:
+            data['json_files'] = json_files
+
+        if facet_json is not None:
+            data['facet_json'] = facet_json
+
+        return self.request('POST', '/reload', data)
+
+    def close(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
@@ -29,6 +29,7 @@ SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 '''
 
+import os
 
 SPARQL_HOST_NAME = 'vocab.ceda.ac.uk'
 
@@ -37,3 +38,38 @@ MOLES_TAGS_FILE = 'moles_tags.csv'
 MOLES_ESGF_MAPPING_FILE = 'moles_esgf_mapping.csv'
 ERROR_FILE = 'error.log'
 LOG_FORMAT = '%(name)s - %(levelname)s - %(message)s'
+
+# Largest HDF5 based netCDF file which will be decompressed into memory to
+# read the attributes from compressed files and archive members (bytes)
+MAX_IN_MEMORY_FILE_SIZE = 512 * 1024 ** 2
+
+# Number of archives whose member attributes are kept in memory. Threaded
+# readers can be working through the members of more than one archive
+MAX_CACHED_ARCHIVES = 4
+
+# S3 compatible object store. The endpoint can be set to point at a local
+# object store, otherwise the default AWS endpoint is used
+OBJECT_STORE_ENDPOINT = os.environ.get('CCI_TAGGER_S3_ENDPOINT')
+
+# Size of the byte ranges requested from the object store. Most classic
+# netCDF headers fit in the first range so only need one request (bytes)
+OBJECT_STORE_BLOCK_SIZE = 64 * 1024
+
+# Number of connections in the pool shared by all object store requests
+OBJECT_STORE_MAX_CONNECTIONS = 32
+
+# Number of ready built Dataset objects kept by ProcessDatasets for tagging
+# individual files
+DATASET_CACHE_SIZE = 128
+
+# Number of files tagged at once by the asyncio API. Also the number of
+# threads used to read the files
+ASYNC_CONCURRENCY = 32
+
+# Largest number of threads a request to the tagging service can use to tag
+# its files. Larger requests are given this many
+SERVER_MAX_WORKERS = 16
+
+# Number of items waiting between each stage when a dataset is processed as
+# a pipeline
+PIPELINE_QUEUE_SIZE = 256
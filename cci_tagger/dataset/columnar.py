@@ -0,0 +1,165 @@
+# encoding: utf-8
+"""
+Columnar store for the tags of each file in a dataset. Each distinct value
+is given an integer code, so a file is a row of integers with one column
+for each DRS facet and one for the realisation. The URI bag for each file
+is also stored as a code, so the dataset URIs are the union of the distinct
+bags rather than of every file.
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+from array import array
+from cci_tagger.conf import constants
+import numpy as np
+
+# Code used where there is no value for the column
+MISSING = -1
+
+
+class TagTable(object):
+
+    REALISATION = 'realisation'
+
+    def __init__(self, facets=constants.DRS_FACETS):
+        """
+        :param facets: Facets to hold a column for (list)
+        """
+        self.facets = list(facets)
+        self.columns = self.facets + [self.REALISATION]
+
+        self.files = []
+
+        # Distinct URI bags and the DRS label codes for each
+        self.bags = []
+        self._bag_codes = {}
+        self._bag_rows = []
+
+        # Distinct values for each column
+        self.values = {column: [] for column in self.columns}
+        self._value_codes = {column: {} for column in self.columns}
+
+        # Codes for each file
+        self._bag_column = array('i')
+        self._codes = {column: array('i') for column in self.columns}
+
+    def __len__(self):
+        return len(self.files)
+
+    def _encode(self, column, value):
+        """
+        Get the code for the value in the column, adding it if it has not
+        been seen before. None is given the MISSING code.
+        """
+        if value is None:
+            return MISSING
+
+        codes = self._value_codes[column]
+        code = codes.get(value)
+
+        if code is None:
+            code = codes[value] = len(self.values[column])
+            self.values[column].append(value)
+
+        return code
+
+    def get_bag(self, key):
+        """
+        :param key: Hashable key for the URI bag
+        :return: bag code (int) | None
+        """
+        return self._bag_codes.get(key)
+
+    def add_bag(self, key, uris, drs_labels):
+        """
+        Add a distinct URI bag
+
+        :param key: Hashable key for the URI bag
+        :param uris: URI bag (dict)
+        :param drs_labels: DRS labels for the bag (dict)
+        :return: bag code (int)
+        """
+        code = self._bag_codes[key] = len(self.bags)
+
+        self.bags.append(uris)
+        self._bag_rows.append([self._encode(facet, drs_labels.get(facet) or None) for facet in self.facets])
+
+        return code
+
+    def missing_facets(self, bag_code):
+        """
+        :param bag_code: int
+        :return: DRS facets without a value for the bag (list)
+        """
+        return [facet for facet, code in zip(self.facets, self._bag_rows[bag_code]) if code == MISSING]
+
+    def add(self, filepath, bag_code, realisation=None):
+        """
+        Add a file to the table
+
+        :param filepath: str
+        :param bag_code: Code returned by add_bag (int)
+        :param realisation: str | None
+        """
+        self.files.append(filepath)
+        self._bag_column.append(bag_code)
+
+        for facet, code in zip(self.facets, self._bag_rows[bag_code]):
+            self._codes[facet].append(code)
+
+        self._codes[self.REALISATION].append(self._encode(self.REALISATION, realisation))
+
+    def as_array(self):
+        """
+        :return: Codes with a row for each file and a column for each of
+        self.columns (numpy.ndarray)
+        """
+        return np.column_stack([np.frombuffer(self._codes[column], dtype=np.intc) for column in self.columns])
+
+    def iter_bags(self):
+        """
+        Iterate the URI bags which are used by at least one file
+        """
+        for code in np.unique(np.frombuffer(self._bag_column, dtype=np.intc)):
+            yield self.bags[code]
+
+    def group_files(self, get_key):
+        """
+        Group the files by a key worked out from each distinct row of codes.
+
+        :param get_key: Callable which takes a dict of {column: value} where
+        the value is None for missing values and returns the group key
+        :return: {key: [filepath, ...]} with the keys and the files in
+        the order they were added
+        """
+        if not self.files:
+            return {}
+
+        rows, first, inverse = np.unique(self.as_array(), axis=0, return_index=True, return_inverse=True)
+        inverse = inverse.reshape(-1)
+
+        # Give each key a code in the order it is first seen
+        key_codes = {}
+        row_keys = np.empty(len(rows), dtype=np.intc)
+
+        for row in np.argsort(first, kind='stable'):
+            decoded = {
+                column: self.values[column][code] if code != MISSING else None
+                for column, code in zip(self.columns, rows[row])
+            }
+            key = get_key(decoded)
+            row_keys[row] = key_codes.setdefault(key, len(key_codes))
+
+        file_keys = row_keys[inverse]
+        order = np.argsort(file_keys, kind='stable')
+        boundaries = np.flatnonzero(np.diff(file_keys[order])) + 1
+
+        keys = list(key_codes)
+        groups = {}
+        for indices in np.split(order, boundaries):
+            groups[keys[file_keys[indices[0]]]] = [self.files[index] for index in indices]
+
+        return groups
@@ -8,18 +8,32 @@ __copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
 __license__ = 'BSD - see LICENSE file in top-level package directory'
 __contact__ = 'richard.d.smith@stfc.ac.uk'
 
+import itertools
 import pathlib
+import threading
+import time
 from cci_tagger.conf import constants
 from cci_tagger.file_handlers.handler_factory import HandlerFactory
-import re
+from cci_tagger.file_handlers.attribute_index import IndexHandler
+from cci_tagger.dataset.rules import DatasetRules
+from cci_tagger.dataset.pipeline import Pipeline
+from cci_tagger.conf.settings import PIPELINE_QUEUE_SIZE
+from cci_tagger.object_store import ObjectStore, ObjectStorePath
+from functools import partial
 from cci_tagger.utils import fpath_as_pathlib
-from cci_tagger.utils.snippets import get_file_subset
+from cci_tagger.utils.snippets import get_file_subset, freeze_bag, copy_bag, CacheInfo
+from cci_tagger.utils.perf import NullRecorder
+from cci_tagger.utils.trace import NullTracer
+from cci_tagger.utils.metrics import NullMetrics
 import logging
 import verboselogs
 
 verboselogs.install()
 logger = logging.getLogger(__name__)
 
+# Characters which are replaced in DRS facet values
+DRS_TRANSLATION = str.maketrans({'.': '-', ' ': '-', '/': '-'})
+
 
 class Dataset(object):
 
@@ -27,11 +41,32 @@ class Dataset(object):
     DRS_ESACCI = 'esacci'
     MULTIPLATFORM = False
 
-    def __init__(self, dataset, dataset_json_mappings, facets):
+    # Key in the JSON mappings which maps file attribute names to facets
+    ATTRIBUTE_MAPPING_KEY = 'attributes'
+
+    def __init__(self, dataset, dataset_json_mappings, facets, header_cache=None, attribute_index=None,
+                 columnar=False, pipeline_workers=None, pipeline_queue_size=PIPELINE_QUEUE_SIZE, perf=None,
+                 tracer=None, metrics=None):
         """
 
         :param dataset:
         :param dataset_json_mappings:
+        :param facets:
+        :param header_cache: Optional HeaderCache shared between datasets
+        :param attribute_index: Optional AttributeIndex. Files found in the
+        index are not opened
+        :param columnar: Hold the tags for each file as integer codes in a
+        TagTable while processing the dataset. Uses less memory for
+        datasets with a large number of files
+        :param pipeline_workers: Process the files in a pipeline of stages
+        running in their own threads. Either the number of threads reading
+        file metadata (int) or the number of threads for each stage
+        ({stage: int}). Only the parse and read stages can have more than
+        one thread. Default: None, process the files one at a time
+        :param pipeline_queue_size: Size of the queues between the stages
+        :param perf: PerfRecorder used to time each stage of tagging the files
+        :param tracer: Tracer used to record spans for each file
+        :param metrics: Metrics counting the files discovered and tagged
         """
 
         self.id = dataset
@@ -40,8 +75,9 @@ class Dataset(object):
         # File listing for the DRS datasets
         self.file_map = {}
 
-        # Store all the tags which come from the dataset
-        self.dataset_uris = {}
+        # Store all the tags which come from the dataset as a bitset of
+        # URI ids for each facet
+        self.dataset_bitsets = {}
 
         self.not_found_messages = set()
 
@@ -51,6 +87,47 @@ class Dataset(object):
         self.dataset_mappings = dataset_json_mappings.get_user_defined_mapping(dataset)
         self.dataset_overrides = dataset_json_mappings.get_user_defined_overrides(dataset)
 
+        # Compile the user defined rules once for the dataset
+        self.rules = DatasetRules(
+            dataset,
+            defaults=self.dataset_defaults,
+            mappings=self.dataset_mappings,
+            overrides=self.dataset_overrides,
+            merged_attribute=partial(dataset_json_mappings.get_merged_attribute, dataset)
+        )
+
+        # Map non-standard file attribute names to facets
+        self.attribute_map = (self.dataset_mappings or {}).get(self.ATTRIBUTE_MAPPING_KEY, {})
+
+        self.header_cache = header_cache
+        self.attribute_index = attribute_index
+        self.columnar = columnar
+
+        if isinstance(pipeline_workers, int):
+            pipeline_workers = {'read': pipeline_workers}
+
+        self.pipeline_workers = pipeline_workers
+        self.pipeline_queue_size = pipeline_queue_size
+
+        # Statistics for each stage from the last pipeline run
+        self.pipeline_stats = {}
+
+        self.perf = perf or NullRecorder()
+        self.tracer = tracer or NullTracer()
+        self.metrics = metrics or NullMetrics()
+
+        # Held while resolving the tags for a file as MULTIPLATFORM and the
+        # caches are shared by every file in the dataset
+        self.lock = threading.RLock()
+
+        # URIs resolved for each combination of filename and metadata tags
+        self._uri_cache = {}
+        self._uri_cache_stats = {'hits': 0, 'misses': 0}
+
+        # Labels and DRS prefix for each combination of URIs
+        self._drs_cache = {}
+        self._drs_cache_stats = {'hits': 0, 'misses': 0}
+
     def process_dataset(self, max_file_count=0):
         """
         Main entry point to process a dataset.
@@ -62,8 +139,12 @@ class Dataset(object):
         :return: URIs for each facet (dict), Files mapped to DRS ID (dict)
         """
 
+        if self.pipeline_workers is not None:
+            return self._process_dataset_pipeline(max_file_count)
+
         # Get a list of files in the dataset
-        file_list = self._get_dataset_files(max_file_count)
+        with self.perf.timer('walk', self.id):
+            file_list = self._get_dataset_files(max_file_count)
 
         logger.info(f'Dataset: {self.id}\n Processing {len(file_list)} files')
 
@@ -72,14 +153,214 @@ class Dataset(object):
             logger.error(f'No files found for {self.id}')
             return
 
-        for file in file_list:
-            file_tags = self.get_file_tags(filepath=file)
-            self._update_dataset_uris(file_tags)
+        # Counted after the archives are expanded, as in the pipeline
+        files = self._count_discovered(self._iter_logical_files(file_list))
+
+        if self.columnar:
+            self._process_files_columnar(self._iter_tagged_files(files))
+            return self.dataset_uris, self.file_map
 
-            self._update_drs_filelist(file_tags, file)
+        for file in files:
+            start = time.perf_counter()
+
+            with self.tracer.span('file', self.id, file):
+                file_tags = self.get_file_tags(filepath=file)
+                self._update_dataset_uris(file_tags)
+
+                self._update_drs_filelist(file_tags, file)
+
+            self.metrics.observe_file(time.perf_counter() - start)
 
         return self.dataset_uris, self.file_map # URIs for MOLES, {} of files organised into datasets
 
+    def _iter_tagged_files(self, files):
+        """
+        Tag the files one at a time. The file span is closed when the next
+        file is asked for, so it covers the DRS worked out by the caller.
+
+        :param files: Iterable of pathlib.Path
+        :return: generator of (file, URIs, multiplatform)
+        """
+        for file in files:
+            start = time.perf_counter()
+
+            with self.tracer.span('file', self.id, file):
+                uris = self.get_file_tags(filepath=file)
+
+                self.metrics.observe_file(time.perf_counter() - start)
+
+                yield file, uris, self.MULTIPLATFORM
+
+    def _process_dataset_pipeline(self, max_file_count=0):
+        """
+        Process the dataset as a pipeline of stages joined by bounded queues
+        so that listing the files, reading the metadata and resolving the
+        terms overlap. The files are grouped in the order they were found,
+        so the results are the same as processing the files one at a time.
+
+            discover -> parse -> read -> resolve -> group -> emit
+
+        The file span runs from parse until the file has been grouped. The
+        stages run in different threads, so it is recorded with explicit
+        timestamps.
+
+        :param max_file_count: default: 0. How many netCDF files to try and scan (int)
+        :return: URIs for each facet (dict), Files mapped to DRS ID (dict)
+        """
+        # The full listing is only needed to pick a subset of files
+        if max_file_count > 0:
+            files = self._iter_logical_files(self._get_dataset_files(max_file_count))
+        else:
+            files = self._iter_dataset_files()
+
+        files = self.perf.iter_timed('walk', self._count_discovered(files), self.id)
+
+        workers = self.pipeline_workers
+
+        def parse(file):
+            start = time.perf_counter()
+            file_tags = self.dataset_defaults.copy()
+
+            with self.perf.timer('parse', self.id):
+                file_tags.update(self._parse_file_name(file))
+
+            return file, file_tags, start
+
+        def read(item):
+            file, file_tags, start = item
+
+            with self.perf.timer('open', self.id):
+                return file, file_tags, self._scan_file(file, file_tags), start
+
+        def resolve(item):
+            file, file_tags, tags_from_metadata, start = item
+
+            with self.lock, self.tracer.span('resolve', self.id, file):
+                uris = self.resolve_file_tags(file_tags, tags_from_metadata)
+                multiplatform = self.MULTIPLATFORM
+
+            # Includes the time waiting between the stages
+            self.metrics.observe_file(time.perf_counter() - start)
+
+            return file, uris, multiplatform, start
+
+        def group(item):
+            file, uris, multiplatform, start = item
+            _, ds_id = self.get_drs(uris, file, multiplatform=multiplatform)
+            return file, uris, ds_id, start
+
+        def iter_resolved(items):
+            for file, uris, multiplatform, start in items:
+                yield file, uris, multiplatform
+
+                # The caller has grouped the file
+                self.tracer.record('file', start, self.id, file)
+
+        pipeline = Pipeline(files, queue_size=self.pipeline_queue_size)
+        pipeline.add_stage('parse', parse, workers=workers.get('parse', 1))
+        pipeline.add_stage('read', read, workers=workers.get('read', 1))
+
+        # Resolving and grouping change the state of the dataset so run in
+        # one thread, in file order
+        pipeline.add_stage('resolve', resolve, ordered=True)
+
+        count = 0
+
+        try:
+            # Columnar mode groups the files itself
+            if self.columnar:
+                count = self._process_files_columnar(iter_resolved(pipeline.run()))
+            else:
+                pipeline.add_stage('group', group, ordered=True)
+
+                for count, (file, uris, ds_id, start) in enumerate(pipeline.run(), 1):
+                    self._update_dataset_uris(uris)
+                    self._add_to_file_map(ds_id, file.as_posix())
+
+                    self.tracer.record('file', start, self.id, file)
+
+        finally:
+            self.pipeline_stats = pipeline.stats()
+            pipeline.log_stats()
+
+        if not count:
+            logger.error(f'No files found for {self.id}')
+            return
+
+        logger.info(f'Dataset: {self.id}\n Processed {count} files')
+
+        return self.dataset_uris, self.file_map
+
+    def _count_discovered(self, files):
+        for file in files:
+            self.metrics.inc('files_discovered_total')
+            yield file
+
+    def _iter_dataset_files(self):
+        """
+        Lazily iterate all the files in the dataset, expanding archives
+
+        :return: generator of pathlib.Path | ObjectStorePath
+        """
+        if ObjectStorePath.is_uri(self.id):
+            return self.iter_files(ObjectStorePath.from_uri(self.id))
+
+        return self.iter_files(pathlib.Path(self.id))
+
+    def _process_files_columnar(self, tagged_files):
+        """
+        Tag the files, holding the DRS labels for each file as integer codes.
+        The DRS identifiers are worked out once for each distinct combination
+        of codes and the dataset URIs are built from the distinct URI bags.
+        Gives the same dataset_uris and file_map as tagging file by file.
+
+        :param tagged_files: Iterable of (file, URIs, multiplatform)
+        :return: Number of files
+        """
+        # Imported here as numpy is only needed in columnar mode
+        from cci_tagger.dataset.columnar import TagTable
+
+        table = TagTable()
+
+        for file, uris, multiplatform in tagged_files:
+            with self.perf.timer('drs', self.id), self.tracer.span('drs', self.id, file):
+                key = (freeze_bag(uris), multiplatform)
+                bag_code = table.get_bag(key)
+
+                if bag_code is None:
+                    drs_labels = self.get_drs_labels(self._facets.process_bag(uris), multiplatform)
+                    bag_code = table.add_bag(key, uris, drs_labels)
+
+                filepath = file.as_posix()
+                missing_facets = table.missing_facets(bag_code)
+
+                # The realisation is only needed when the DRS is complete
+                if missing_facets:
+                    self._log_missing_drs_facets(missing_facets, filepath)
+                    realisation = None
+                else:
+                    realisation = self._get_realisation(filepath)
+
+                table.add(filepath, bag_code, realisation)
+
+        for uris in table.iter_bags():
+            self._update_dataset_uris(uris)
+
+        def get_ds_id(row):
+            realisation = row.pop(TagTable.REALISATION)
+
+            if realisation is None:
+                return f'UNKNOWN_DRS - {self.id}'
+
+            ds_id, _ = self._get_drs_prefix(row)
+            return f'{ds_id}.{realisation}'
+
+        with self.perf.timer('drs_group', self.id):
+            for ds_id, ds_files in table.group_files(get_ds_id).items():
+                self.file_map.setdefault(ds_id, []).extend(ds_files)
+
+        return len(table)
+
     def generate_ds_id(self, drs_facets, filepath):
         """
         Turn the drs labels into an identifier
@@ -90,7 +371,18 @@ class Dataset(object):
 
         :return: ID
         """
-        MISSING_VALUES = False
+        ds_id, missing_facets = self._get_drs_prefix(drs_facets)
+
+        return self._complete_ds_id(ds_id, missing_facets, filepath)
+
+    def _get_drs_prefix(self, drs_facets):
+        """
+        Build the part of the identifier which comes from the labels
+
+        :param drs_facets: Bag of labels
+        :return: ID without the realisation (str), DRS facets without a value (list)
+        """
+        missing_facets = []
 
         ds_id = self.DRS_ESACCI
 
@@ -99,18 +391,11 @@ class Dataset(object):
             facet_value = drs_facets.get(facet)
 
             if not facet_value:
-                MISSING_VALUES = True
-                if filepath.endswith(('.nc','.prj','.shp','.shx')):
-                    logger.error(f'Missing DRS facet: {facet} in {self.id} for file: {filepath}')
-                else:
-                    logger.warning(f'Missing DRS facet: {facet} in {self.id} for file: {filepath}')
-
+                missing_facets.append(facet)
 
             else:
 
-                facet_value = str(drs_facets[facet]).replace('.', '-')
-                facet_value = facet_value.replace(' ', '-')
-                facet_value = facet_value.replace('/', '-')
+                facet_value = str(facet_value).translate(DRS_TRANSLATION)
 
                 if facet is constants.FREQUENCY:
                     facet_value = facet_value.replace('month', 'mon')
@@ -118,24 +403,111 @@ class Dataset(object):
 
                 ds_id = f'{ds_id}.{facet_value}'
 
-        # Get realisation
+        return ds_id, missing_facets
+
+    def _complete_ds_id(self, ds_id, missing_facets, filepath):
+        """
+        Add the realisation for the file to the identifier
+
+        :param ds_id: ID without the realisation (str)
+        :param missing_facets: DRS facets without a value (list)
+        :param filepath: Filepath of the file. Used to match against filters.
+        :return: ID
+        """
+        # Don't generate a DRS ID if there are missing values
+        if missing_facets:
+            self._log_missing_drs_facets(missing_facets, filepath)
+            return
+
+        realisation = self._get_realisation(filepath)
+
+        if realisation is None:
+            return
+
+        return f'{ds_id}.{realisation}'
+
+    def _get_realisation(self, filepath):
+        """
+        Get the realisation for the file from the filters for the dataset
+
+        :param filepath: Filepath of the file. Used to match against filters.
+        :return: realisation | None if the file is excluded from the DRS
+        """
         realisation = self.dataset_json_mappings.get_dataset_realisation(self.id, filepath)
-        dsid = f'{ds_id}.{realisation}'
 
-        # Don't generate a DRS ID if there are missing values or
-        # the files have been marked for exclusion from DRS
-        if MISSING_VALUES or realisation == constants.EXCLUDE_REALISATION:
+        # Don't generate a DRS ID if the files have been marked for
+        # exclusion from DRS
+        if realisation == constants.EXCLUDE_REALISATION:
             return
 
-        return dsid
+        return realisation
+
+    def _log_missing_drs_facets(self, missing_facets, filepath):
+        for facet in missing_facets:
+            if filepath.endswith(('.nc','.prj','.shp','.shx')):
+                logger.error(f'Missing DRS facet: {facet} in {self.id} for file: {filepath}')
+            else:
+                logger.warning(f'Missing DRS facet: {facet} in {self.id} for file: {filepath}')
 
-    def get_drs_labels(self, drs_labels):
+    def get_drs(self, uris, filepath, multiplatform=None):
+        """
+        Get the labels and DRS identifier for a file.
+
+        Everything except the realisation depends only on the URIs so is
+        worked out once for each combination of URIs. The realisation comes
+        from the filters for the dataset, which match against the file path.
+
+        :param uris: URIs for the file from get_file_tags (dict)
+        :param filepath: Filepath (str | pathlib.Path)
+        :param multiplatform: Whether the platform came from a programme with
+        multiple platforms. Default: the value for the last file resolved
+        :return: labels (dict), ID | None
+        """
+        if isinstance(filepath, pathlib.PurePath):
+            filepath = filepath.as_posix()
+
+        if multiplatform is None:
+            multiplatform = self.MULTIPLATFORM
+
+        with self.perf.timer('drs', self.id), self.tracer.span('drs', self.id, filepath):
+            cache_key = (freeze_bag(uris), multiplatform)
+            cached = self._drs_cache.get(cache_key)
+
+            if cached:
+                self._drs_cache_stats['hits'] += 1
+            else:
+                self._drs_cache_stats['misses'] += 1
+
+                labels = self._facets.process_bag(uris)
+                drs_labels = self.get_drs_labels(labels, multiplatform)
+                cached = self._drs_cache[cache_key] = (labels, *self._get_drs_prefix(drs_labels))
+
+            labels, ds_id, missing_facets = cached
+
+            return copy_bag(labels), self._complete_ds_id(ds_id, missing_facets, filepath)
+
+    def cache_info(self):
+        """
+        Statistics for the caches used while tagging the dataset
+
+        :return: {cache name: CacheInfo}
+        """
+        return {
+            'uris': CacheInfo(size=len(self._uri_cache), **self._uri_cache_stats),
+            'drs': CacheInfo(size=len(self._drs_cache), **self._drs_cache_stats)
+        }
+
+    def get_drs_labels(self, drs_labels, multiplatform=None):
         """
         Convert the URIs into human readable labels for the DRS.
 
         :param uris: Labels generated from each URI (dict)
+        :param multiplatform: Default: the value for the last file resolved
         :return: Label string for each facet (dict)
         """
+        if multiplatform is None:
+            multiplatform = self.MULTIPLATFORM
+
         drs_labels = drs_labels.copy()
 
         for facet in drs_labels:
@@ -151,7 +523,7 @@ class Dataset(object):
                     # Platform is a little different because there can be 1 URI
                     # but that could be from a programme which contains multiple
                     # platforms
-                    elif facet is constants.PLATFORM and self.MULTIPLATFORM:
+                    elif facet is constants.PLATFORM and multiplatform:
                         drs_labels[facet] = constants.MULTILABELS.get(facet)
 
                     # Convert single item lists into a string
@@ -175,33 +547,76 @@ class Dataset(object):
         :param file: Filepath (str | pathlib.Path)
         :return: URIs (dict)
         """
-        # Set the multi platform flag
-        self.MULTIPLATFORM = False
+        file_tags, tags_from_metadata = self.read_file_tags(filepath=filepath)
+
+        with self.tracer.span('resolve', self.id, filepath):
+            return self.resolve_file_tags(file_tags, tags_from_metadata)
+
+    @fpath_as_pathlib('filepath')
+    def read_file_tags(self, filepath):
+        """
+        Extract the terms from the file path and the file metadata. This is
+        the part of get_file_tags which reads the file and does not change
+        the state of the dataset, so can be run in a worker thread.
 
+        :param filepath: Filepath (str | pathlib.Path)
+        :return: tags from the filename and defaults (dict), tags from the file metadata (dict)
+        """
         # Get default tags
         file_tags = self.dataset_defaults.copy()
 
         # Get tags from filepath
-        tags_from_filename = self._parse_file_name(filepath)
+        with self.perf.timer('parse', self.id):
+            tags_from_filename = self._parse_file_name(filepath)
         file_tags.update(tags_from_filename)
 
         # Get tags from file metadata
-        tags_from_metadata = self._scan_file(filepath, file_tags)
+        with self.perf.timer('open', self.id):
+            tags_from_metadata = self._scan_file(filepath, file_tags)
+
+        return file_tags, tags_from_metadata
+
+    def resolve_file_tags(self, file_tags, tags_from_metadata):
+        """
+        Map the terms from read_file_tags and resolve them to URIs
+
+        :param file_tags: Tags from the filename and defaults (dict)
+        :param tags_from_metadata: Tags from the file metadata (dict)
+        :return: URIs (dict)
+        """
+        # Set the multi platform flag
+        self.MULTIPLATFORM = False
+
+        # Files with the same filename and metadata tags resolve to the
+        # same URIs so only need to be mapped and resolved once
+        cache_key = (freeze_bag(file_tags), freeze_bag(tags_from_metadata))
+        cached = self._uri_cache.get(cache_key)
+
+        if cached:
+            self._uri_cache_stats['hits'] += 1
+            uris, self.MULTIPLATFORM = cached
+            return copy_bag(uris)
 
-        # Process file tags from the metadata for multivalues
-        processed_labels = self._process_file_attributes(tags_from_metadata)
-        file_tags.update(processed_labels)
+        self._uri_cache_stats['misses'] += 1
 
-        # Apply mappings
-        mapped_values = self._apply_mapping(file_tags)
+        with self.perf.timer('map', self.id):
+            # Process file tags from the metadata for multivalues
+            processed_labels = self._process_file_attributes(tags_from_metadata)
+            file_tags.update(processed_labels)
 
-        # Apply any overrides
-        mapped_values = self._apply_overrides(mapped_values)
+            # Apply mappings
+            mapped_values = self._apply_mapping(file_tags)
+
+            # Apply any overrides
+            mapped_values = self._apply_overrides(mapped_values)
 
         # convert tags to URIs
-        uris = self._convert_terms_to_uris(mapped_values)
+        with self.perf.timer('resolve', self.id):
+            uris = self._convert_terms_to_uris(mapped_values)
+
+        self._uri_cache[cache_key] = (uris, self.MULTIPLATFORM)
 
-        return uris
+        return copy_bag(uris)
 
     def _apply_mapping(self, file_tags):
         """
@@ -210,17 +625,7 @@ class Dataset(object):
         :param file_tags: Tags extracted from the files
         :return: Bag of mapped tags
         """
-        mapped_values = {}
-
-        for facet, values in file_tags.items():
-
-            if type(values) is list:
-                mapped_values[facet] = [self._get_mapping(facet, val) for val in values]
-
-            elif type(values) is str:
-                mapped_values[facet] = [self._get_mapping(facet, values)]
-
-        return mapped_values
+        return self.rules.apply_mapping(file_tags)
 
     def _apply_overrides(self, mapped_tags):
         """
@@ -231,12 +636,7 @@ class Dataset(object):
         :param mapped_tags: Fields to apply overrides to
         :return: mapped_tags with overrides applies (dict)
         """
-
-        if self.dataset_overrides:
-            for facet, value in self.dataset_overrides.items():
-                mapped_tags[facet] = value
-
-        return mapped_tags
+        return self.rules.apply_overrides(mapped_tags)
 
     def _convert_terms_to_uris(self, mapped_labels):
         """
@@ -402,6 +802,9 @@ class Dataset(object):
         :param max_file_count: Used for testing. Max number of netCDF files. Default: 0
         :return: list of files
         """
+        if ObjectStorePath.is_uri(self.id):
+            return self._get_object_store_files(max_file_count)
+
         path = pathlib.Path(self.id)
 
         # Can ask for all files because this returns a generator and has not done
@@ -422,6 +825,63 @@ class Dataset(object):
         # Return all files from the dataset recursively
         return [item for item in all_files if item.is_file()]
 
+    def _get_object_store_files(self, max_file_count):
+        """
+        Get files from a dataset held in object storage. Uses the same rules
+        as _get_dataset_files.
+
+        :param max_file_count: Used for testing. Max number of netCDF files. Default: 0
+        :return: list of ObjectStorePath
+        """
+        path = ObjectStorePath.from_uri(self.id)
+
+        if max_file_count > 0:
+            all_netcdf = (item for item in ObjectStore.iter_objects(path) if item.suffix == '.nc')
+
+            filelist = list(itertools.islice(all_netcdf, max_file_count))
+
+            if not filelist:
+                filelist = list(itertools.islice(ObjectStore.iter_objects(path), max_file_count))
+
+            return filelist
+
+        return list(ObjectStore.iter_objects(path))
+
+    @classmethod
+    def iter_files(cls, path):
+        """
+        Lazily iterate the files under a path. Directories and object store
+        prefixes are walked and archives are expanded into their members.
+
+        :param path: pathlib.Path | ObjectStorePath
+        :return: generator of pathlib.Path | ObjectStorePath
+        """
+        if isinstance(path, ObjectStorePath):
+            files = (path,) if path.suffix else ObjectStore.iter_objects(path)
+
+        elif path.is_dir():
+            files = (item for item in path.glob('**/*') if item.is_file())
+
+        else:
+            files = (path,)
+
+        yield from cls._iter_logical_files(files)
+
+    @staticmethod
+    def _iter_logical_files(file_list):
+        """
+        Expand any archives in the file list so that each member is
+        tagged as a separate file.
+
+        :param file_list: list of pathlib.Path
+        :return: generator of pathlib.Path
+        """
+        for file in file_list:
+            if HandlerFactory.is_archive(file):
+                yield from HandlerFactory.get_archive_members(file)
+            else:
+                yield file
+
     def _get_mapping(self, facet, term):
         """
         Convert the term to lower case and get the mapped value from the
@@ -432,23 +892,7 @@ class Dataset(object):
         :param term: The term to be mapped (string)
         :return: Mapped term or lowercase term (string)
         """
-
-        # Make sure term is lowercase and remove any whitespace
-        term = term.lower().strip()
-
-        # Check to see if there are any mappings for this facet in this dataset
-        facet_map = self.dataset_mappings.get(facet)
-
-        if facet_map:
-
-            # Loop through the possible mappings and match the lowercase
-            # term against he lowercase key in the mapping to remove
-            # ambiguity.
-            for key in facet_map:
-                if term == key.lower():
-                    return facet_map[key].lower()
-
-        return term
+        return self.rules.get_mapping(facet, term)
 
     def _get_platform_as_programme(self, platform):
         tags = []
@@ -518,7 +962,11 @@ class Dataset(object):
         :param facet: (str) Facet being processed
         :param term: (str) term being processed
         """
-        self.not_found_messages.add(f'{facet}: {term}')
+        message = f'{facet}: {term}'
+
+        if message not in self.not_found_messages:
+            self.not_found_messages.add(message)
+            self.metrics.inc('terms_not_found_total')
         logger.warning(f'Invalid value: {term} in dataset: {self.id} for attribute: {facet}')
 
     def _parse_file_name(self, fpath):
@@ -566,47 +1014,7 @@ class Dataset(object):
         return {}
 
     def _process_file_attributes(self, file_attributes):
-
-        for global_attr in constants.ALLOWED_GLOBAL_ATTRS:
-            # Get the file attribute for the given global attr
-            attr = file_attributes.get(global_attr)
-
-            # If the global attribute does not exist for this file,
-            # Check defaults
-            # continue
-            if not attr:
-
-                # Check user defaults for a value in this field
-                if self.dataset_defaults.get(global_attr):
-                    attr = self.dataset_defaults.get(global_attr)
-                else:
-                    continue
-
-            # Get merged mapping fields
-            attr = self.dataset_json_mappings.get_merged_attribute(self.id, attr)
-
-            # Split based on separator
-            if global_attr is constants.PLATFORM and '<' in attr:
-                bits = attr.split(', ')
-
-            elif isinstance(attr, list):
-                bits = attr
-
-            else:
-                # Can separate based on ; or ,
-                if isinstance(attr, str):
-                    bits = re.split(r'[;,]{1}', attr)
-                else:
-                    logger.error(f'Could not process attribute from {global_attr} in {self.id}. Got {attr}, expected string or list')
-
-            # Deal with multiplatforms
-            if global_attr is constants.PLATFORM:
-                bits = self._split_multiplatforms(bits)
-
-            # Replace input attributes with output from scanning process
-            file_attributes[global_attr] = bits
-
-        return file_attributes
+        return self.rules.process_file_attributes(file_attributes)
 
     def _scan_file(self, filename, file_tags):
         """
@@ -617,11 +1025,30 @@ class Dataset(object):
         labels = {}
         proc_level = file_tags.get(constants.PROCESSING_LEVEL)
 
+        # Use the attributes recorded by the crawler where possible
+        if self.attribute_index is not None:
+            attributes = self.attribute_index.get(filename)
+
+            if attributes is not None:
+                return IndexHandler(
+                    filename,
+                    attributes=attributes,
+                    attribute_map=self.attribute_map
+                ).extract_facet_labels(proc_level)
+
         # File specific parser
-        handler = HandlerFactory.get_handler(filename.suffix)
+        handler = HandlerFactory.get_handler_for_path(filename)
 
         if handler:
-            labels = handler(filename).extract_facet_labels(proc_level)
+            with self.tracer.span('open', self.id, filename):
+                handler = handler(
+                    filename,
+                    attribute_map=self.attribute_map,
+                    header_cache=self.header_cache
+                )
+
+            with self.tracer.span('read', self.id, filename):
+                labels = handler.extract_facet_labels(proc_level)
 
         return labels
 
@@ -634,36 +1061,60 @@ class Dataset(object):
         :param segment: String
         :return: list of components
         """
-        split_segments = []
-        pattern = re.compile(r'(.*-)<(.*)>.*')
+        return DatasetRules.split_multiplatforms(segments)
 
-        for segment in segments:
+    def _update_dataset_uris(self, tags):
+        """
+        Update the bitsets containing all the URIs extracted from the dataset
 
-            m = re.match(pattern, segment)
-            if m:
-                term = m.group(1)
-                values = m.group(2).split(',')
+        :param tags: (dict) URI tags
+        """
+
+        for facet, values in tags.items():
 
-                split_segments.extend([f'{term}{val}' for val in values])
+            bits = self._facets.encode_uris(values)
 
+            if facet in self.dataset_bitsets:
+                self.dataset_bitsets[facet] |= bits
             else:
-                split_segments.append(segment)
+                self.dataset_bitsets[facet] = bits
 
-        return split_segments
+    def export_dataset_bitsets(self):
+        """
+        Get the dataset bitsets along with the URI for each id used, so that
+        they can be merged by a Dataset in another process
 
-    def _update_dataset_uris(self, tags):
+        :return: {facet: bitset}, {id: URI}
         """
-        Update the set containing all the URIs extracted from the dataset
+        uri_table = {}
 
-        :param tags: (dict) URI tags
+        for bits in self.dataset_bitsets.values():
+            uri_table.update(self._facets.get_uri_table(bits))
+
+        return dict(self.dataset_bitsets), uri_table
+
+    def merge_dataset_bitsets(self, bitsets, uri_table):
         """
+        Add the URIs from another set of dataset bitsets, such as the
+        results from a worker process. URIs which are not in the vocabulary
+        can have different ids in each process, so the bitsets are remapped
+        to the ids used here.
 
-        for facet, values in tags.items():
+        :param bitsets: {facet: bitset}
+        :param uri_table: {id: URI} for the ids in the bitsets, from export_dataset_bitsets
+        """
+        for facet, bits in bitsets.items():
+            bits = self._facets.remap_uris(bits, uri_table)
+            self.dataset_bitsets[facet] = self.dataset_bitsets.get(facet, 0) | bits
 
-            if facet in self.dataset_uris:
-                self.dataset_uris[facet].update(values)
-            else:
-                self.dataset_uris[facet] = set(values)
+    @property
+    def dataset_uris(self):
+        """
+        All the URIs extracted from the dataset
+
+        :return: {facet: set of URIs}
+        """
+        return {facet: self._facets.decode_uris(bits) for facet, bits in self.dataset_bitsets.items()}
 
     def _update_drs_filelist(self, tags, file):
         """
@@ -675,10 +1126,15 @@ class Dataset(object):
         # Convert file from pathlib to posix string
         file = file.as_posix()
 
-        labels = self._facets.process_bag(tags)
-        drs_labels = self.get_drs_labels(labels)
-        ds_id = self.generate_ds_id(drs_labels, file)
+        _, ds_id = self.get_drs(tags, file)
 
+        self._add_to_file_map(ds_id, file)
+
+    def _add_to_file_map(self, ds_id, file):
+        """
+        :param ds_id: DRS ID | None
+        :param file: Filepath (str)
+        """
         # Create a value where the DRS cannot be created
         if not ds_id:
             ds_id = f'UNKNOWN_DRS - {self.id}'
@@ -0,0 +1,323 @@
+# encoding: utf-8
+"""
+Pipeline of stages joined by bounded queues. Each stage runs in its own
+threads so that listing files, reading metadata and resolving terms can
+overlap. A full queue blocks the stage feeding it, so the number of items
+in flight is bounded.
+
+Items keep the order of the source. Stages with more than one worker can
+finish items out of order, so stages marked as ordered, and the output of
+the pipeline, put them back in order. The source only starts a new item
+once there is room in a window of items between the source and the output,
+so a slow item cannot leave the rest of the source waiting to be put back
+in order.
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+from collections import namedtuple
+import heapq
+import queue
+import threading
+import time
+import logging
+import verboselogs
+
+verboselogs.install()
+logger = logging.getLogger(__name__)
+
+StageStats = namedtuple('StageStats', ['items', 'workers', 'busy_seconds', 'items_per_second', 'max_queue_depth', 'queue_depth'])
+
+# Marks the end of the items from a stage
+_END = object()
+
+
+class _Failure(object):
+    """
+    Carries an exception from a worker to the consumer
+    """
+
+    def __init__(self, exception):
+        self.exception = exception
+
+
+class Stage(object):
+
+    def __init__(self, name, func, workers=1, ordered=False):
+        """
+        :param name: Name used in the statistics
+        :param func: Callable applied to each item. Returning None drops the item
+        :param workers: Number of threads
+        :param ordered: Apply func to the items in source order. Only
+        possible with one worker
+        """
+        if ordered and workers != 1:
+            raise ValueError(f'Stage {name} is ordered so can only have one worker')
+
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.ordered = ordered
+
+        self.input = None
+        self.items = 0
+        self.busy_seconds = 0
+        self.max_queue_depth = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self.items += 1
+            self.busy_seconds += seconds
+
+            depth = self.input.qsize()
+            if depth > self.max_queue_depth:
+                self.max_queue_depth = depth
+
+
+class Pipeline(object):
+
+    def __init__(self, source, queue_size=100, source_name='discover'):
+        """
+        :param source: Iterable of items. Iterated in its own thread
+        :param queue_size: Size of the queue in front of each stage
+        :param source_name: Name for the source in the statistics
+        """
+        self.source = source
+        self.queue_size = queue_size
+        self.source_name = source_name
+        self.stages = []
+
+        self._source_stats = Stage(source_name, None)
+        self._window = None
+        self._stop = threading.Event()
+        self._threads = []
+        self._started = None
+        self._finished = None
+
+        # Largest number of items waiting to be put back in order
+        self.max_reorder_depth = 0
+
+    def add_stage(self, name, func, workers=1, ordered=False):
+        """
+        Add a stage to the end of the pipeline
+
+        :return: self
+        """
+        self.stages.append(Stage(name, func, workers, ordered))
+        return self
+
+    def _put(self, target, item):
+        """
+        Put an item on a queue, giving up if the pipeline is stopped
+        """
+        while not self._stop.is_set():
+            try:
+                target.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+
+        return False
+
+    def _acquire(self):
+        """
+        Wait for room in the window, giving up if the pipeline is stopped
+        """
+        while not self._stop.is_set():
+            if self._window.acquire(timeout=0.1):
+                return True
+
+        return False
+
+    def _get(self, source):
+        while not self._stop.is_set():
+            try:
+                return source.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+        return _END
+
+    def _run_source(self, output, workers):
+        stats = self._source_stats
+
+        try:
+            start = time.perf_counter()
+            for seq, item in enumerate(self.source):
+                stats.record(time.perf_counter() - start)
+
+                if not self._acquire() or not self._put(output, (seq, item)):
+                    return
+
+                start = time.perf_counter()
+
+        except Exception as e:
+            self._put(output, (-1, _Failure(e)))
+
+        finally:
+            for _ in range(workers):
+                self._put(output, _END)
+
+    def _iter_ordered(self, items):
+        """
+        Put (seq, item) pairs back into order. Failures from the source
+        have a negative sequence number and are passed straight on.
+        """
+        heap = []
+        expected = 0
+
+        for seq, item in items:
+            if seq < 0:
+                yield seq, item
+                continue
+
+            heapq.heappush(heap, (seq, item))
+
+            if len(heap) > self.max_reorder_depth:
+                self.max_reorder_depth = len(heap)
+
+            while heap and heap[0][0] == expected:
+                yield heapq.heappop(heap)
+                expected += 1
+
+        while heap:
+            yield heapq.heappop(heap)
+
+    def _iter_queue(self, source, producers):
+        """
+        Iterate the items from a queue until every producer has finished
+        """
+        finished = 0
+
+        while finished < producers:
+            entry = self._get(source)
+
+            if entry is _END:
+                if self._stop.is_set():
+                    return
+                finished += 1
+                continue
+
+            yield entry
+
+    def _run_worker(self, stage, output, producers, next_workers):
+        items = self._iter_queue(stage.input, producers)
+
+        if stage.ordered:
+            items = self._iter_ordered(items)
+
+        try:
+            for seq, item in items:
+                # Failures and dropped items are passed on with their
+                # sequence number so later stages do not wait for them
+                if item is None or isinstance(item, _Failure):
+                    if not self._put(output, (seq, item)):
+                        return
+                    continue
+
+                start = time.perf_counter()
+                try:
+                    result = stage.func(item)
+                except Exception as e:
+                    logger.exception(f'Error in pipeline stage {stage.name}')
+                    result = _Failure(e)
+
+                stage.record(time.perf_counter() - start)
+
+                if not self._put(output, (seq, result)):
+                    return
+
+        finally:
+            for _ in range(next_workers):
+                self._put(output, _END)
+
+    def run(self):
+        """
+        Start the stages and iterate the output of the last stage, in the
+        order of the source. Stopping the iteration stops the pipeline.
+
+        :return: generator of items
+        """
+        self._started = time.perf_counter()
+
+        # Every item from the source holds a place in the window until it
+        # leaves the pipeline. There is room for a full queue and an item
+        # for each worker
+        self._window = threading.Semaphore(self.queue_size + sum(stage.workers for stage in self.stages))
+
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        self._source_stats.input = queues[0]
+
+        first_workers = self.stages[0].workers if self.stages else 1
+        self._threads.append(threading.Thread(target=self._run_source, args=(queues[0], first_workers), name=f'pipeline-{self.source_name}', daemon=True))
+
+        for index, stage in enumerate(self.stages):
+            stage.input = queues[index]
+            producers = self.stages[index - 1].workers if index else 1
+            next_workers = self.stages[index + 1].workers if index + 1 < len(self.stages) else 1
+
+            for _ in range(stage.workers):
+                self._threads.append(threading.Thread(
+                    target=self._run_worker,
+                    args=(stage, queues[index + 1], producers, next_workers),
+                    name=f'pipeline-{stage.name}',
+                    daemon=True
+                ))
+
+        for thread in self._threads:
+            thread.start()
+
+        producers = self.stages[-1].workers if self.stages else 1
+
+        try:
+            for seq, item in self._iter_ordered(self._iter_queue(queues[-1], producers)):
+                if seq >= 0:
+                    self._window.release()
+
+                if isinstance(item, _Failure):
+                    raise item.exception
+
+                if item is not None:
+                    yield item
+
+        finally:
+            self._finished = time.perf_counter()
+            self._stop.set()
+
+            for thread in self._threads:
+                thread.join()
+
+    def stats(self):
+        """
+        Statistics for the source and each stage. The queue depth is the
+        number of items waiting in front of the stage.
+
+        :return: {stage name: StageStats}
+        """
+        end = self._finished or time.perf_counter()
+        elapsed = (end - self._started) if self._started else 0
+
+        stats = {}
+        for stage in [self._source_stats] + self.stages:
+            stats[stage.name] = StageStats(
+                items=stage.items,
+                workers=stage.workers,
+                busy_seconds=stage.busy_seconds,
+                items_per_second=stage.items / elapsed if elapsed else 0,
+                max_queue_depth=stage.max_queue_depth,
+                queue_depth=stage.input.qsize() if stage.input is not None else 0
+            )
+
+        return stats
+
+    def log_stats(self):
+        for name, stats in self.stats().items():
+            logger.info(
+                f'{name}: {stats.items} items, {stats.items_per_second:.1f}/s, '
+                f'{stats.workers} workers busy {stats.busy_seconds:.2f}s, '
+                f'max queue {stats.max_queue_depth}'
+            )
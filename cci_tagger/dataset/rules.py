@@ -0,0 +1,213 @@
+# encoding: utf-8
+"""
+The user defined defaults, mappings, merged attributes and overrides for a
+dataset, compiled once so that processing each file is a handful of
+dictionary lookups.
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+from cci_tagger.conf import constants
+import re
+import logging
+import verboselogs
+
+verboselogs.install()
+logger = logging.getLogger(__name__)
+
+# Take a string like ERS-<1,2>
+MULTIPLATFORM_PATTERN = re.compile(r'(.*-)<(.*)>.*')
+
+# Attributes can be separated by ; or ,
+ATTRIBUTE_SEPARATOR = re.compile(r'[;,]{1}')
+
+
+class DatasetRules(object):
+
+    def __init__(self, dataset_id, defaults=None, mappings=None, overrides=None, merged_attribute=None):
+        """
+        :param dataset_id: Dataset the rules belong to. Used in log messages
+        :param defaults: User defined defaults (dict)
+        :param mappings: User defined mappings (dict)
+        :param overrides: User defined overrides (dict)
+        :param merged_attribute: Callable which takes an attribute value and
+        returns the merged value
+        """
+        self.dataset_id = dataset_id
+        self.defaults = defaults or {}
+        self.overrides = overrides or {}
+        self._merged_attribute = merged_attribute
+
+        # Mapping tables keyed on the lowercase term
+        self.mappings = self.compile_mappings(mappings or {})
+
+        # Merged values for each attribute value seen
+        self._merged_cache = {}
+
+    @staticmethod
+    def compile_mappings(mappings):
+        """
+        Build a lookup table for each facet with lowercase keys and values.
+        Where two keys only differ by case, the first one wins.
+
+        :param mappings: {facet: {term: mapped term}}
+        :return: {facet: {lowercase term: lowercase mapped term}}
+        """
+        compiled = {}
+
+        for facet, facet_map in mappings.items():
+            if not isinstance(facet_map, dict):
+                continue
+
+            table = {}
+            for key, value in facet_map.items():
+                if isinstance(key, str) and isinstance(value, str):
+                    table.setdefault(key.lower(), value.lower())
+
+            compiled[facet] = table
+
+        return compiled
+
+    def get_mapping(self, facet, term):
+        """
+        Get the mapped value for the term. Will return the original term in
+        lowercase if no mapping is found.
+
+        :param facet: The facet to match against (string)
+        :param term: The term to be mapped (string)
+        :return: Mapped term or lowercase term (string)
+        """
+        term = term.lower().strip()
+
+        facet_map = self.mappings.get(facet)
+        if facet_map:
+            return facet_map.get(term, term)
+
+        return term
+
+    def apply_mapping(self, file_tags):
+        """
+        Take set of file tags and map them
+
+        :param file_tags: Tags extracted from the files
+        :return: Bag of mapped tags
+        """
+        mapped_values = {}
+
+        for facet, values in file_tags.items():
+
+            if type(values) is list:
+                mapped_values[facet] = [self.get_mapping(facet, val) for val in values]
+
+            elif type(values) is str:
+                mapped_values[facet] = [self.get_mapping(facet, values)]
+
+        return mapped_values
+
+    def apply_overrides(self, mapped_tags):
+        """
+        Apply the overrides. These are taken as is.
+
+        :param mapped_tags: Fields to apply overrides to
+        :return: mapped_tags with overrides applied (dict)
+        """
+        mapped_tags.update(self.overrides)
+        return mapped_tags
+
+    def merge_attribute(self, attr):
+        """
+        Get the merged value for the attribute, remembering the result for
+        each value seen
+
+        :param attr: Attribute value
+        :return: Merged attribute value
+        """
+        if self._merged_attribute is None:
+            return attr
+
+        try:
+            merged = self._merged_cache[attr]
+        except KeyError:
+            merged = self._merged_cache[attr] = self._merged_attribute(attr)
+        except TypeError:
+            # Unhashable values are not cached
+            return self._merged_attribute(attr)
+
+        # Lists are returned to the caller so must not be shared
+        if isinstance(merged, list):
+            return list(merged)
+
+        return merged
+
+    @staticmethod
+    def split_multiplatforms(segments):
+        """
+        Take a string like ERS-<1,2> and return
+        ['ERS-1','ERS-2']
+
+        :param segments: list of strings
+        :return: list of components
+        """
+        split_segments = []
+
+        for segment in segments:
+
+            m = MULTIPLATFORM_PATTERN.match(segment)
+            if m:
+                term = m.group(1)
+                values = m.group(2).split(',')
+
+                split_segments.extend([f'{term}{val}' for val in values])
+
+            else:
+                split_segments.append(segment)
+
+        return split_segments
+
+    def process_file_attributes(self, file_attributes):
+        """
+        Fill in defaults for missing attributes, merge attributes and split
+        multi-value attributes into lists.
+
+        :param file_attributes: Attributes extracted from the file (dict)
+        :return: file_attributes (dict)
+        """
+        for global_attr in constants.ALLOWED_GLOBAL_ATTRS:
+            # Get the file attribute for the given global attr
+            attr = file_attributes.get(global_attr)
+
+            # If the global attribute does not exist for this file,
+            # Check defaults
+            if not attr:
+                attr = self.defaults.get(global_attr)
+                if not attr:
+                    continue
+
+            # Get merged mapping fields
+            attr = self.merge_attribute(attr)
+
+            # Split based on separator
+            if global_attr is constants.PLATFORM and '<' in attr:
+                bits = attr.split(', ')
+
+            elif isinstance(attr, list):
+                bits = attr
+
+            elif isinstance(attr, str):
+                bits = ATTRIBUTE_SEPARATOR.split(attr)
+
+            else:
+                logger.error(f'Could not process attribute from {global_attr} in {self.dataset_id}. Got {attr}, expected string or list')
+                continue
+
+            # Deal with multiplatforms
+            if global_attr is constants.PLATFORM:
+                bits = self.split_multiplatforms(bits)
+
+            # Replace input attributes with output from scanning process
+            file_attributes[global_attr] = bits
+
+        return file_attributes
@@ -34,7 +34,9 @@ from cci_tagger.conf.constants import DATA_TYPE, FREQUENCY, INSTITUTION, PLATFOR
     PRODUCT_STRING, BROADER_PROCESSING_LEVEL, PRODUCT_VERSION
 from cci_tagger.conf.settings import SPARQL_HOST_NAME
 from cci_tagger.triple_store import TripleStore, Concept
+from cci_tagger.utils.perf import NullRecorder
 import re
+import threading
 
 
 class Facets(object):
@@ -78,7 +80,12 @@ class Facets(object):
 
 
 
-    def __init__(self, from_json=False):
+    def __init__(self, from_json=False, perf=None):
+        """
+        :param from_json: Don't query the vocab server. Used by from_json
+        :param perf: PerfRecorder used to time the vocab queries and label lookups
+        """
+        self.perf = perf or NullRecorder()
 
         # a dict of concept schemes
         self.__facets = {}
@@ -95,13 +102,32 @@ class Facets(object):
         # Reversed mapping to allow lookup from uri to tag.
         self.__reversible_facets = {}
 
+        # Integer ids for URIs. Used to hold sets of URIs as bitsets
+        self.__uri_ids = {}
+        self.__uris = []
+        self.__intern_lock = threading.Lock()
+
         if not from_json:
             for facet, uri in self.FACET_ENDPOINTS.items():
-                self._init_concepts(facet, uri)
+                with self.perf.timer('vocab_concepts'):
+                    self._init_concepts(facet, uri)
+
+            with self.perf.timer('vocab_broader'):
+                self._init_proc_level_mappings()
+                self._init_platform_mappings()
 
-            self._init_proc_level_mappings()
-            self._init_platform_mappings()
             self._reverse_facet_mappings()
+            self._intern_vocab_uris()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_Facets__intern_lock']
+        state['perf'] = NullRecorder()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__intern_lock = threading.Lock()
 
     def _init_concepts(self, facet, uri):
 
@@ -169,6 +195,112 @@ class Facets(object):
 
             self.__reversible_facets[facet] = reversed
 
+    def _intern_vocab_uris(self):
+        """
+        Give each URI in the vocabulary an integer id. The URIs are sorted so
+        that the same vocabulary always gives the same ids.
+        """
+        for facet in sorted(self.__reversible_facets):
+            for uri in sorted(self.__reversible_facets[facet]):
+                self.intern_uri(uri)
+
+    def intern_uri(self, uri):
+        """
+        Get the integer id for the URI, giving it a new id if it has not been
+        seen before. URIs which are not in the vocabulary, such as the
+        product version, are given ids in the order they are seen, so the
+        same id can stand for different URIs in different processes. Use
+        get_uri_table and remap_uris to move bitsets between processes.
+
+        @param uri (str): the URI
+
+        @return an int
+
+        """
+        uri_id = self.__uri_ids.get(uri)
+
+        if uri_id is None:
+            with self.__intern_lock:
+                uri_id = self.__uri_ids.get(uri)
+
+                if uri_id is None:
+                    uri_id = self.__uri_ids[uri] = len(self.__uris)
+                    self.__uris.append(uri)
+
+        return uri_id
+
+    def get_uri_id(self, uri):
+        """
+        Get the integer id for the URI without adding it.
+
+        @param uri (str): the URI
+
+        @return an int or None if the URI has not been seen
+
+        """
+        return self.__uri_ids.get(uri)
+
+    def encode_uris(self, uris):
+        """
+        Turn URIs into a bitset with a bit set for the id of each URI.
+
+        @param uris (iterable): the URIs
+
+        @return an int
+
+        """
+        bits = 0
+        for uri in uris:
+            bits |= 1 << self.intern_uri(uri)
+
+        return bits
+
+    def decode_uris(self, bits):
+        """
+        Turn a bitset from encode_uris back into URIs.
+
+        @param bits (int): the bitset
+
+        @return a set of str
+
+        """
+        return {self.__uris[uri_id] for uri_id in self._iter_ids(bits)}
+
+    @staticmethod
+    def _iter_ids(bits):
+        """
+        Iterate the ids set in a bitset, lowest first
+        """
+        while bits:
+            lowest = bits & -bits
+            yield lowest.bit_length() - 1
+            bits ^= lowest
+
+    def get_uri_table(self, bits):
+        """
+        Get the URI for each id set in the bitset. Sent along with the bitset
+        to another process, which can pass both to remap_uris.
+
+        @param bits (int): the bitset
+
+        @return a dict of id: URI
+
+        """
+        return {uri_id: self.__uris[uri_id] for uri_id in self._iter_ids(bits)}
+
+    def remap_uris(self, bits, uri_table):
+        """
+        Turn a bitset made by another Facets, such as one in a worker
+        process, into a bitset using the ids of this Facets.
+
+        @param bits (int): the bitset
+        @param uri_table (dict): id: URI from get_uri_table of the other Facets
+
+        @return an int
+
+        """
+        return self.encode_uris(uri_table[uri_id] for uri_id in self._iter_ids(bits))
+
     def get_facet_names(self):
         """
         Get the list of facet names.
@@ -366,6 +498,10 @@ class Facets(object):
         :param bag: dictionary of facets with lists of uris to convert
         :return: dictionary of facets with the extracted tags
         """
+        with self.perf.timer('labels'):
+            return self._process_bag(bag)
+
+    def _process_bag(self, bag):
         output = {}
 
         for facet in bag:
@@ -409,8 +545,8 @@ class Facets(object):
         return response
 
     @classmethod
-    def from_json(cls, data):
-        
+    def from_json(cls, data, perf=None):
+
         # Extract the __facet values
         __facet_dict = {}
         for facet, values in data['__facets'].items():
@@ -422,7 +558,7 @@ class Facets(object):
                 else:
                     __facet_dict[facet][label] = Concept(**concept)
 
-        obj = cls(from_json=True)
+        obj = cls(from_json=True, perf=perf)
 
         obj.__facets = __facet_dict
 
@@ -432,4 +568,6 @@ class Facets(object):
         obj.__proc_level_mappings = data['__proc_level_mappings']
         obj.__reversible_facets = data['__reversible_facets']
 
+        obj._intern_vocab_uris()
+
         return obj
@@ -0,0 +1,157 @@
+# encoding: utf-8
+"""
+Read the netCDF attributes from the members of tar and zip archives without
+extracting them to disk. Each member is treated as a logical file with a path
+made from the archive path and the member name e.g. /data/bundle.tar/file.nc
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+from .base import AttributeHandler
+from .compressed import read_netcdf_stream, open_decompressed, DECOMPRESSORS
+from .handler_factory import HandlerFactory
+from cci_tagger.conf.settings import MAX_CACHED_ARCHIVES
+from collections import OrderedDict
+import tarfile
+import threading
+import zipfile
+import logging
+import verboselogs
+
+verboselogs.install()
+logger = logging.getLogger(__name__)
+
+
+def iter_archive_members(archive):
+    """
+    Iterate through the file members of the archive in a single pass
+
+    :param archive: Path to the archive (pathlib.Path)
+    :return: generator of (member name, binary stream)
+    """
+    if archive.suffix == '.zip':
+        with zipfile.ZipFile(archive) as zip_file:
+            for info in zip_file.infolist():
+                if info.is_dir():
+                    continue
+
+                with zip_file.open(info) as stream:
+                    yield info.filename, stream
+
+    else:
+        # Handles compressed tar files transparently
+        with tarfile.open(archive, 'r:*') as tar_file:
+            for member in tar_file:
+                if not member.isfile():
+                    continue
+
+                with tar_file.extractfile(member) as stream:
+                    yield member.name, stream
+
+
+def read_member_attributes(name, stream):
+    """
+    Read the netCDF attributes from a member stream. Compressed netCDF
+    members are decompressed as they are read.
+
+    :param name: Member name
+    :param stream: Member stream
+    :return: attributes (dict) | None, bytes read (int)
+    """
+    suffixes = name.rsplit('/', 1)[-1].split('.')[1:]
+
+    if suffixes and suffixes[-1] == 'nc':
+        return read_netcdf_stream(stream)
+
+    if len(suffixes) > 1 and suffixes[-2] == 'nc' and f'.{suffixes[-1]}' in DECOMPRESSORS:
+        with open_decompressed(stream, f'.{suffixes[-1]}') as decompressed:
+            return read_netcdf_stream(decompressed)
+
+    return None, 0
+
+
+class ArchiveReader(object):
+    """
+    Scan archives and keep the attributes for the members of the most
+    recently used archives. Files are usually tagged in order so each
+    archive is only read once, but threaded readers can interleave the
+    members of several archives, so a few archives are kept.
+    """
+
+    _lock = threading.Lock()
+
+    # {archive: {member: (attributes, bytes read)}}, least recently used first
+    _archives = OrderedDict()
+
+    @classmethod
+    def scan(cls, archive):
+        """
+        Read the attributes from every member of the archive
+
+        :param archive: Path to the archive (pathlib.Path)
+        :return: Member names (list)
+        """
+        members = {}
+
+        try:
+            for name, stream in iter_archive_members(archive):
+                try:
+                    attributes, bytes_read = read_member_attributes(name, stream)
+                except Exception as e:
+                    logger.error(f'Read error. Could not read member: {name} in {archive} with error: {e}')
+                    attributes, bytes_read = None, 0
+
+                logger.verbose(f'Read {bytes_read} bytes from {archive}/{name}')
+                members[name] = (attributes, bytes_read)
+
+        except Exception as e:
+            logger.error(f'Read error. Could not open archive: {archive} with error: {e}')
+
+        with cls._lock:
+            cls._archives[archive] = members
+            cls._archives.move_to_end(archive)
+
+            while len(cls._archives) > MAX_CACHED_ARCHIVES:
+                cls._archives.popitem(last=False)
+
+        return list(members)
+
+    @classmethod
+    def get_member(cls, archive, member):
+        """
+        Get the attributes for a member, scanning the archive if it is not
+        one of those currently held.
+
+        :param archive: Path to the archive (pathlib.Path)
+        :param member: Member name
+        :return: attributes (dict) | None, bytes read (int)
+        """
+        with cls._lock:
+            members = cls._archives.get(archive)
+
+            if members is not None:
+                cls._archives.move_to_end(archive)
+                return members.get(member, (None, 0))
+
+        cls.scan(archive)
+
+        with cls._lock:
+            return cls._archives.get(archive, {}).get(member, (None, 0))
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._archives.clear()
+
+
+class ArchiveMemberHandler(AttributeHandler):
+
+    def __init__(self, filepath, **kwargs):
+
+        super().__init__(filepath, **kwargs)
+
+        archive, member = HandlerFactory.split_archive_path(filepath)
+        self.attributes, self.bytes_read = ArchiveReader.get_member(archive, member)
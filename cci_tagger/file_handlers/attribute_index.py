@@ -0,0 +1,160 @@
+# encoding: utf-8
+"""
+Global attributes recorded for each file by an external crawler. When an
+index is given, the attributes are looked up by path and the data file is
+only opened if the path is not in the index.
+
+Two formats are supported:
+
+NDJSON
+    One JSON object per line, in the style of ``ncdump -j``, with the path
+    to the file and its global attributes::
+
+        {"path": "/neodc/esacci/.../file.nc", "attributes": {"platform": "ENVISAT", ...}}
+
+    The file is memory mapped and the offset of each record is indexed so
+    that only the matching line is decoded.
+
+SQLite
+    Files ending ``.sqlite`` or ``.db`` with a table
+    ``attributes (path TEXT PRIMARY KEY, attributes TEXT)`` where the
+    attributes column holds the JSON object.
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+from .base import AttributeHandler
+import json
+import mmap
+import pathlib
+import sqlite3
+import threading
+import logging
+import verboselogs
+
+verboselogs.install()
+logger = logging.getLogger(__name__)
+
+
+class AttributeIndex(object):
+
+    SQLITE_EXTENSIONS = ('.sqlite', '.db')
+
+    # Keys accepted for the path and attributes in NDJSON records
+    PATH_KEYS = ('path', 'filename')
+    ATTRIBUTE_KEYS = ('attributes', 'global_attributes')
+
+    def __init__(self, path):
+        """
+        :param path: Path to the NDJSON or SQLite index
+        """
+        self.path = pathlib.Path(path)
+
+        self._lock = threading.Lock()
+        self._db = None
+        self._mmap = None
+        self._offsets = {}
+
+        self.hits = 0
+        self.misses = 0
+
+        if self.path.suffix in self.SQLITE_EXTENSIONS:
+            self._db = sqlite3.connect(f'file:{self.path}?mode=ro', uri=True, check_same_thread=False)
+        else:
+            self._load_ndjson()
+
+    @classmethod
+    def _get_first(cls, record, keys):
+        for key in keys:
+            if key in record:
+                return record[key]
+
+    def _load_ndjson(self):
+        """
+        Memory map the NDJSON file and record the offset of each line
+        """
+        with open(self.path, 'rb') as reader:
+            # mmap does not accept empty files
+            if not reader.seek(0, 2):
+                return
+
+            self._mmap = mmap.mmap(reader.fileno(), 0, access=mmap.ACCESS_READ)
+
+        offset = 0
+        for line in iter(self._mmap.readline, b''):
+            if line.strip():
+                try:
+                    path = self._get_first(json.loads(line), self.PATH_KEYS)
+                except ValueError as e:
+                    logger.warning(f'Invalid record at byte {offset} in {self.path}: {e}')
+                    path = None
+
+                if path:
+                    # Later records replace earlier ones
+                    self._offsets[path] = offset
+
+            offset += len(line)
+
+        logger.info(f'Loaded {len(self._offsets)} paths from attribute index {self.path}')
+
+    def __len__(self):
+        if self._db is not None:
+            return self._db.execute('SELECT COUNT(*) FROM attributes').fetchone()[0]
+
+        return len(self._offsets)
+
+    def _read(self, key):
+        if self._db is not None:
+            row = self._db.execute('SELECT attributes FROM attributes WHERE path = ?', (key,)).fetchone()
+            if row:
+                return json.loads(row[0])
+            return
+
+        offset = self._offsets.get(key)
+        if offset is not None:
+            end = self._mmap.find(b'\n', offset)
+            line = self._mmap[offset:end if end != -1 else None]
+            return self._get_first(json.loads(line), self.ATTRIBUTE_KEYS) or {}
+
+    def get(self, filepath):
+        """
+        Get the attributes recorded for the file
+
+        :param filepath: pathlib.Path | ObjectStorePath
+        :return: attributes (dict) | None if the file is not in the index
+        """
+        with self._lock:
+            attributes = self._read(filepath.as_posix())
+
+            if attributes is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        return attributes
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+
+            self._offsets = {}
+
+
+class IndexHandler(AttributeHandler):
+    """
+    Handler for files found in the attribute index. The file itself is
+    not opened.
+    """
+
+    def __init__(self, filepath, attributes=None, **kwargs):
+        super().__init__(filepath, **kwargs)
+        self.attributes = attributes
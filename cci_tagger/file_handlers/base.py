@@ -9,10 +9,108 @@ __license__ = 'BSD - see LICENSE file in top-level package directory'
 __contact__ = 'richard.d.smith@stfc.ac.uk'
 
 from abc import ABC, abstractmethod
+from cci_tagger.conf.constants import ALLOWED_GLOBAL_ATTRS, PRODUCT_VERSION
+import logging
+import verboselogs
+
+verboselogs.install()
+logger = logging.getLogger(__name__)
 
 
 class FileHandler(ABC):
 
+    def __init__(self, filepath, attribute_map=None, header_cache=None):
+        """
+        :param filepath: Path to the file (pathlib.Path)
+        :param attribute_map: Optional mapping of file attribute name to
+        facet name. Used where a dataset does not use the standard
+        attribute names (dict)
+        :param header_cache: Optional HeaderCache. Used by handlers which
+        can fingerprint the file header to skip decoding the attributes
+        """
+        self.tags = {}
+        self.filepath = filepath.as_posix()
+        self.attribute_map = attribute_map or {}
+        self.header_cache = header_cache
+
+    def get_attribute_names(self, facet):
+        """
+        Get the attribute names which can provide a value for the given
+        facet. The facet name is always checked first followed by any
+        names mapped to the facet for this dataset.
+
+        :param facet: Facet name (string)
+        :return: Attribute names (list)
+        """
+        names = [facet]
+        names.extend([attr for attr, mapped_facet in self.attribute_map.items() if mapped_facet == facet])
+
+        return names
+
+    def get_facet_attribute(self, facet, attributes):
+        """
+        Get the value for the facet from a dictionary of attributes
+
+        :param facet: Facet name (string)
+        :param attributes: Attributes read from the file (dict)
+        :return: Attribute value | None
+        """
+        for name in self.get_attribute_names(facet):
+            if name in attributes:
+                return attributes[name]
+
+    def tags_from_attributes(self, attributes):
+        """
+        Extract the facet tags from a dictionary of attributes which have
+        already been read from the file
+
+        :param attributes: Attributes read from the file (dict)
+        :return: tags (dict)
+        """
+        for global_attr in ALLOWED_GLOBAL_ATTRS:
+            attr = self.get_facet_attribute(global_attr, attributes)
+
+            if attr is not None:
+                self.tags[global_attr] = attr
+
+                # Verbose logging
+                logger.verbose(f'{global_attr}={attr}')
+            else:
+                logger.warning(f'Required attr {global_attr} not found in {self.filepath}')
+
+        # Add product version
+        product_version = self.get_facet_attribute(PRODUCT_VERSION, attributes)
+
+        if product_version is not None:
+            self.tags[PRODUCT_VERSION] = str(product_version)
+
+        return self.tags
+
     @abstractmethod
     def extract_facet_labels(self, proc_level):
         return
+
+
+class AttributeHandler(FileHandler):
+    """
+    Base class for handlers which read all of the file attributes up front,
+    rather than keeping the file open until the labels are extracted.
+    Subclasses set ``attributes`` and ``bytes_read`` when they are created.
+    """
+
+    def __init__(self, filepath, **kwargs):
+        super().__init__(filepath, **kwargs)
+
+        # Attributes read from the file. None if the file could not be read
+        self.attributes = None
+
+        # Number of bytes read to get the attributes
+        self.bytes_read = 0
+
+    def extract_facet_labels(self, proc_level):
+
+        if self.attributes is not None:
+            logger.verbose(f'GLOBAL ATTRS for {self.filepath}. Read {self.bytes_read} bytes')
+            self.tags_from_attributes(self.attributes)
+
+        return self.tags
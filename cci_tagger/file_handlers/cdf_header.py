@@ -0,0 +1,206 @@
+# encoding: utf-8
+"""
+Minimal reader for the header of classic format netCDF files (CDF-1, CDF-2
+and CDF-5). The global attributes sit near the start of the file, before the
+variable definitions, so they can be read from a stream without needing to
+seek or read any of the data. This allows attributes to be read from
+compressed files and archive members without decompressing the whole file.
+
+Format reference: https://docs.unidata.ucar.edu/netcdf-c/current/file_format_specifications.html
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+import struct
+import numpy as np
+
+CDF_MAGIC = b'CDF'
+HDF5_MAGIC = b'\x89HDF\r\n\x1a\n'
+
+NC_DIMENSION = 10
+NC_ATTRIBUTE = 12
+
+NC_CHAR = 2
+
+# Map nc_type to big-endian numpy dtype
+NC_TYPES = {
+    1: '>i1',
+    2: 'S1',
+    3: '>i2',
+    4: '>i4',
+    5: '>f4',
+    6: '>f8',
+    7: '>u1',
+    8: '>u2',
+    9: '>u4',
+    10: '>i8',
+    11: '>u8',
+}
+
+
+class HeaderError(Exception):
+    """
+    Raised when the stream does not contain a valid classic netCDF header
+    """
+
+
+class ClassicHeaderReader(object):
+    """
+    Read the global attributes from a classic netCDF header.
+
+    Only the bytes up to the end of the global attribute list are read from
+    the stream. The number of bytes consumed is available from ``bytes_read``
+    and the raw global attribute block from ``attribute_block``.
+    """
+
+    def __init__(self, stream):
+        """
+        :param stream: Readable binary file-like object positioned at the
+        start of the file
+        """
+        self.stream = stream
+        self.bytes_read = 0
+        self.version = None
+        self.attribute_block = b''
+
+    def _read(self, size):
+        data = self.stream.read(size)
+
+        if len(data) != size:
+            raise HeaderError(f'Unexpected end of file. Wanted {size} bytes, got {len(data)}')
+
+        self.bytes_read += size
+        return data
+
+    def _read_int(self):
+        return struct.unpack('>i', self._read(4))[0]
+
+    def _read_non_neg(self):
+        # CDF-5 uses 64 bit integers for counts and lengths
+        if self.version == 5:
+            return struct.unpack('>q', self._read(8))[0]
+        return self._read_int()
+
+    def _read_name(self):
+        length = self._read_non_neg()
+        name = self._read(length)
+        self._read(self._padding(length))
+        return name.decode('utf-8')
+
+    @staticmethod
+    def _padding(length):
+        return -length % 4
+
+    def _read_list_header(self, expected_tag):
+        """
+        Lists are either ABSENT (two zero values) or a tag followed by
+        the number of elements
+        """
+        tag = self._read_int()
+        nelems = self._read_non_neg()
+
+        if tag == 0 and nelems == 0:
+            return 0
+
+        if tag != expected_tag:
+            raise HeaderError(f'Unexpected tag {tag}. Expected {expected_tag}')
+
+        return nelems
+
+    def _read_magic(self):
+        magic = self._read(4)
+
+        if magic[:3] != CDF_MAGIC or magic[3] not in (1, 2, 5):
+            raise HeaderError('Not a classic netCDF file')
+
+        self.version = magic[3]
+
+    def _skip_dimensions(self):
+        for _ in range(self._read_list_header(NC_DIMENSION)):
+            self._read_name()
+            self._read_non_neg()
+
+    def _read_attribute(self, decode=True):
+        name = self._read_name()
+        nc_type = self._read_int()
+        nelems = self._read_non_neg()
+
+        dtype = NC_TYPES.get(nc_type)
+        if dtype is None:
+            raise HeaderError(f'Unknown attribute type {nc_type} for {name}')
+
+        size = np.dtype(dtype).itemsize * nelems
+        raw = self._read(size)
+        self._read(self._padding(size))
+
+        if decode:
+            return name, self.decode_value(nc_type, dtype, raw)
+        return name, raw
+
+    @staticmethod
+    def decode_value(nc_type, dtype, raw):
+        """
+        Decode the raw attribute value. Mirrors the types returned by
+        netCDF4; a string for character data, a numpy scalar for single
+        values and a numpy array otherwise.
+        """
+        if nc_type == NC_CHAR:
+            return raw.decode('utf-8', errors='replace').rstrip('\x00')
+
+        values = np.frombuffer(raw, dtype=dtype)
+
+        if len(values) == 1:
+            return values[0]
+        return values
+
+    def read_global_attributes(self, decode=True):
+        """
+        Read the header up to the end of the global attribute list
+
+        :param decode: Decode the attribute values. If False, the raw
+        bytes are returned which is enough to fingerprint the header
+        :return: Global attributes (dict)
+        """
+        self._read_magic()
+
+        # numrecs
+        self._read_non_neg()
+
+        self._skip_dimensions()
+
+        attributes = {}
+
+        # Keep a copy of the raw attribute block
+        stream = self.stream
+        self.stream = _RecordingStream(stream)
+
+        try:
+            for _ in range(self._read_list_header(NC_ATTRIBUTE)):
+                name, value = self._read_attribute(decode)
+                attributes[name] = value
+        finally:
+            self.attribute_block = self.stream.getvalue()
+            self.stream = stream
+
+        return attributes
+
+
+class _RecordingStream(object):
+    """
+    Wrap a stream and keep a copy of everything read through it
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._buffer = bytearray()
+
+    def read(self, size):
+        data = self._stream.read(size)
+        self._buffer.extend(data)
+        return data
+
+    def getvalue(self):
+        return bytes(self._buffer)
@@ -0,0 +1,130 @@
+# encoding: utf-8
+"""
+Handlers for gzip and bzip2 compressed netCDF files. The file is
+decompressed as a stream and reading stops as soon as the global attributes
+have been read.
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+from .base import AttributeHandler
+from .cdf_header import ClassicHeaderReader, CDF_MAGIC, HDF5_MAGIC, HeaderError
+from .hdf import HDF5Handler
+from cci_tagger.conf.settings import MAX_IN_MEMORY_FILE_SIZE
+import bz2
+import gzip
+import io
+import logging
+import verboselogs
+
+verboselogs.install()
+logger = logging.getLogger(__name__)
+
+# Decompressors which can be wrapped round a path or a file-like object
+DECOMPRESSORS = {
+    '.gz': gzip.GzipFile,
+    '.bz2': bz2.BZ2File,
+}
+
+
+class CountingStream(object):
+    """
+    Wrap a stream to count the number of bytes read from it. Bytes which
+    have been peeked at are put back in front of the stream.
+    """
+
+    def __init__(self, stream, prefix=b''):
+        self._stream = stream
+        self._prefix = prefix
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        prefix = b''
+
+        if self._prefix:
+            if size < 0:
+                prefix, self._prefix = self._prefix, b''
+            else:
+                prefix, self._prefix = self._prefix[:size], self._prefix[size:]
+                size -= len(prefix)
+
+        data = prefix
+        if size:
+            data += self._stream.read(size)
+
+        self.bytes_read += len(data)
+        return data
+
+    def peek(self, size):
+        """
+        Read ahead without consuming the bytes
+        """
+        if len(self._prefix) < size:
+            self._prefix += self._stream.read(size - len(self._prefix))
+
+        return self._prefix[:size]
+
+
+def read_netcdf_stream(stream):
+    """
+    Read the global attributes from a stream containing a netCDF file.
+
+    Classic format files are read up to the end of the global attributes.
+    netCDF4 files are based on HDF5 which needs random access to the file so
+    these are read into memory, up to MAX_IN_MEMORY_FILE_SIZE.
+
+    :param stream: Readable binary file-like object
+    :return: attributes (dict), bytes read (int)
+    """
+    counting_stream = CountingStream(stream)
+    magic = counting_stream.peek(len(HDF5_MAGIC))
+
+    if magic.startswith(CDF_MAGIC):
+        attributes = ClassicHeaderReader(counting_stream).read_global_attributes()
+
+    elif magic.startswith(HDF5_MAGIC):
+        data = counting_stream.read(MAX_IN_MEMORY_FILE_SIZE + 1)
+
+        if len(data) > MAX_IN_MEMORY_FILE_SIZE:
+            raise HeaderError(f'HDF5 based file larger than {MAX_IN_MEMORY_FILE_SIZE} bytes')
+
+        attributes = HDF5Handler.read_root_attributes(io.BytesIO(data))
+
+    else:
+        raise HeaderError('Not a netCDF file')
+
+    return attributes, counting_stream.bytes_read
+
+
+def open_decompressed(source, suffix):
+    """
+    Wrap the source in a decompressor based on the file extension.
+
+    :param source: Path or binary file-like object
+    :param suffix: The compression extension e.g. '.gz'
+    :return: Decompressing file-like object
+    """
+    decompressor = DECOMPRESSORS[suffix]
+
+    # GzipFile takes file objects as a separate argument
+    if decompressor is gzip.GzipFile and hasattr(source, 'read'):
+        return gzip.GzipFile(fileobj=source, mode='rb')
+
+    return decompressor(source, 'rb')
+
+
+class CompressedNetcdfHandler(AttributeHandler):
+
+    def __init__(self, filepath, **kwargs):
+
+        super().__init__(filepath, **kwargs)
+
+        try:
+            with open_decompressed(filepath, filepath.suffix) as stream:
+                self.attributes, self.bytes_read = read_netcdf_stream(stream)
+
+        except Exception as e:
+            logger.error(f'Read error. Could not read file: {filepath} with error: {e}')
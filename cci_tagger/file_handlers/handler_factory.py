@@ -8,19 +8,125 @@ __copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
 __license__ = 'BSD - see LICENSE file in top-level package directory'
 __contact__ = 'richard.d.smith@stfc.ac.uk'
 
-from pydoc import locate
+from cci_tagger.object_store import ObjectStorePath
+from importlib import import_module
 
 
 class HandlerFactory(object):
 
     HANDLER_MAP = {
-        '.nc': 'cci_tagger.file_handlers.netcdf.NetcdfHandler'
+        '.nc': 'cci_tagger.file_handlers.netcdf.NetcdfHandler',
+        '.h5': 'cci_tagger.file_handlers.hdf.HDF5Handler',
+        '.he5': 'cci_tagger.file_handlers.hdf.HDF5Handler',
+        '.nc.gz': 'cci_tagger.file_handlers.compressed.CompressedNetcdfHandler',
+        '.nc.bz2': 'cci_tagger.file_handlers.compressed.CompressedNetcdfHandler'
     }
 
+    # Archives are expanded and each member is tagged as a separate file
+    ARCHIVE_EXTENSIONS = ('.tar', '.zip', '.tgz', '.tar.gz', '.tar.bz2', '.tbz2')
+    ARCHIVE_MEMBER_HANDLER = 'cci_tagger.file_handlers.archive.ArchiveMemberHandler'
+    ARCHIVE_READER = 'cci_tagger.file_handlers.archive.ArchiveReader'
+
+    # Files in object storage are read with ranged requests
+    OBJECT_STORE_HANDLER = 'cci_tagger.file_handlers.object_store.ObjectStoreHandler'
+
+    # Handler classes which have been imported
+    _classes = {}
+
+    @classmethod
+    def _load(cls, name):
+        """
+        Import a handler class from its dotted path. The module for each
+        format, and libraries such as netCDF4 and h5py, are only imported
+        when a file of that format is found.
+
+        :param name: Dotted path to the class
+        :return: Handler class
+        """
+        try:
+            return cls._classes[name]
+        except KeyError:
+            module, _, attribute = name.rpartition('.')
+            handler = cls._classes[name] = getattr(import_module(module), attribute)
+            return handler
+
     @classmethod
     def get_handler(cls, extension):
 
         handler = cls.HANDLER_MAP.get(extension)
 
         if handler:
-            return locate(handler)
\ No newline at end of file
+            return cls._load(handler)
+
+    @classmethod
+    def get_handler_for_path(cls, path):
+        """
+        Get the handler for a file path. Checks whether the path is a member
+        of an archive and then tries the last two extensions, to pick up
+        compressed files, before the last extension. Supported files in
+        object storage all use the object store handler.
+
+        :param path: pathlib.Path | ObjectStorePath
+        :return: Handler class | None
+        """
+        archive, _ = cls.split_archive_path(path)
+        if archive:
+            return cls._load(cls.ARCHIVE_MEMBER_HANDLER)
+
+        handler = None
+        if len(path.suffixes) > 1:
+            handler = cls.HANDLER_MAP.get(''.join(path.suffixes[-2:]))
+
+        if not handler:
+            handler = cls.HANDLER_MAP.get(path.suffix)
+
+        if handler and isinstance(path, ObjectStorePath):
+            handler = cls.OBJECT_STORE_HANDLER
+
+        if handler:
+            return cls._load(handler)
+
+    @classmethod
+    def has_archive_extension(cls, path):
+        """
+        Check the last extension, or the last two for compressed tar files
+        """
+        return path.suffix in cls.ARCHIVE_EXTENSIONS or ''.join(path.suffixes[-2:]) in cls.ARCHIVE_EXTENSIONS
+
+    @classmethod
+    def is_archive(cls, path):
+        # Archives are not expanded in object storage
+        if isinstance(path, ObjectStorePath):
+            return False
+
+        return cls.has_archive_extension(path)
+
+    @classmethod
+    def get_archive_members(cls, path):
+        """
+        Scan the archive and return the logical paths for its members
+
+        :param path: Path to the archive (pathlib.Path)
+        :return: list of pathlib.Path
+        """
+        members = cls._load(cls.ARCHIVE_READER).scan(path)
+        return [path / member for member in members]
+
+    @classmethod
+    def split_archive_path(cls, path):
+        """
+        Split a logical path into the archive and the member name. Only a
+        parent which is a file is an archive, so directories with names
+        ending in .tar or .zip are not split.
+
+        :param path: pathlib.Path
+        :return: archive (pathlib.Path) | None, member name (str) | None
+        """
+        if isinstance(path, ObjectStorePath):
+            return None, None
+
+        for parent in path.parents:
+            if cls.has_archive_extension(parent) and parent.is_file():
+                return parent, path.relative_to(parent).as_posix()
+
+        return None, None
@@ -0,0 +1,72 @@
+# encoding: utf-8
+"""
+Handler for plain HDF5 files (including HDF-EOS5). Only the attributes
+attached to the root group are read, the datasets within the file are never
+touched.
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+from .base import AttributeHandler
+import numpy as np
+import logging
+import verboselogs
+
+verboselogs.install()
+logger = logging.getLogger(__name__)
+
+
+class HDF5Handler(AttributeHandler):
+
+    def __init__(self, filepath, **kwargs):
+
+        super().__init__(filepath, **kwargs)
+
+        try:
+            self.attributes = self.read_root_attributes(filepath)
+        except Exception as e:
+            logger.error(f'Read error. Could not open file: {filepath} with error: {e}')
+
+    @classmethod
+    def read_root_attributes(cls, source):
+        """
+        Open the file read-only and read the root group attributes.
+        The file is closed before returning so that long runs do not
+        hold on to file handles.
+
+        :param source: Path to the file or a seekable file-like object
+        :return: Decoded root attributes (dict)
+        """
+        # h5py is slow to import and HDF5 files are rare in the archive
+        import h5py
+
+        if hasattr(source, 'as_posix'):
+            source = source.as_posix()
+
+        with h5py.File(source, 'r') as h5_data:
+            return {name: cls.decode_attribute(value) for name, value in h5_data.attrs.items()}
+
+    @staticmethod
+    def decode_attribute(value):
+        """
+        HDF5 attributes come back as bytes or numpy types. Convert them
+        to strings, or lists of strings for array attributes, so that they
+        can be processed in the same way as netCDF global attributes.
+
+        :param value: Raw attribute value
+        :return: string | list
+        """
+        if isinstance(value, np.ndarray):
+            values = [HDF5Handler.decode_attribute(item) for item in value.ravel()]
+
+            if len(values) == 1:
+                return values[0]
+            return values
+
+        if isinstance(value, bytes):
+            return value.decode('utf-8', errors='replace').rstrip('\x00')
+
+        return str(value)
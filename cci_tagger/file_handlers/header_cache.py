@@ -0,0 +1,194 @@
+# encoding: utf-8
+"""
+Cache of facet labels extracted from netCDF files, keyed by a fingerprint
+of the raw global attribute block. Files which share byte-identical global
+attributes only need to be decoded once. The cache can be kept in an SQLite
+file so that it is shared between runs.
+
+HDF5 based netCDF files keep their attributes in the object header of the
+root group, which can only be found by walking the HDF5 structures. They
+are fingerprinted from cheap raw reads instead, so the cache saves
+repeated decoding of the same file between runs rather than between files.
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+from .cdf_header import ClassicHeaderReader, CDF_MAGIC, HDF5_MAGIC
+from cci_tagger.utils.snippets import copy_bag
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import numpy as np
+import logging
+import verboselogs
+
+verboselogs.install()
+logger = logging.getLogger(__name__)
+
+# Bytes read from the start of an HDF5 file for the fingerprint. Covers the
+# superblock and, for files written by netCDF4, the root group object header
+HDF5_HEADER_SIZE = 4096
+
+
+def _to_json_value(value):
+    """
+    Convert numpy attribute values into values which can be stored as JSON
+    """
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+
+    if isinstance(value, np.generic):
+        return value.item()
+
+    return value
+
+
+def normalise_labels(labels):
+    """
+    Convert the labels to the types they have after a round trip through
+    the cache, so that labels from a hit and a miss are the same
+    """
+    return {key: _to_json_value(value) for key, value in labels.items()}
+
+
+class HeaderCache(object):
+
+    SCHEMA = 'CREATE TABLE IF NOT EXISTS headers (fingerprint TEXT PRIMARY KEY, labels TEXT NOT NULL)'
+
+    # Number of inserts into the SQLite file between commits
+    COMMIT_INTERVAL = 1000
+
+    def __init__(self, path=None):
+        """
+        :param path: Path to the SQLite file used to share the cache between
+        runs. If not given, the cache is only held in memory.
+        """
+        self._memory = {}
+        self._lock = threading.Lock()
+        self._db = None
+
+        # Inserts since the last commit
+        self._pending = 0
+
+        self.hits = 0
+        self.misses = 0
+
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(self.SCHEMA)
+            self._db.commit()
+
+    @staticmethod
+    def fingerprint(filepath, attribute_map=None):
+        """
+        Generate the fingerprint for the file.
+
+        Classic netCDF files are fingerprinted from the raw bytes of the global
+        attribute block, which is read without decoding. HDF5 based files are
+        fingerprinted from their size, modification time and inode, along with
+        the first HDF5_HEADER_SIZE bytes of the file. Nothing is decoded, so a
+        miss only costs the open with netCDF4.
+
+        The attribute map changes which attributes are used so is included.
+
+        :param filepath: pathlib.Path
+        :param attribute_map: Attribute name mappings for the dataset (dict)
+        :return: fingerprint (str) | None if the file cannot be fingerprinted
+        """
+        digest = hashlib.sha1(json.dumps(attribute_map or {}, sort_keys=True).encode('utf-8'))
+
+        try:
+            with open(filepath, 'rb') as reader:
+                magic = reader.read(len(HDF5_MAGIC))
+                reader.seek(0)
+
+                if magic.startswith(CDF_MAGIC):
+                    header = ClassicHeaderReader(reader)
+                    header.read_global_attributes(decode=False)
+                    digest.update(header.attribute_block)
+
+                elif magic.startswith(HDF5_MAGIC):
+                    stat = os.fstat(reader.fileno())
+                    digest.update(f'{stat.st_dev}:{stat.st_ino}:{stat.st_size}:{stat.st_mtime_ns}'.encode('utf-8'))
+                    digest.update(reader.read(HDF5_HEADER_SIZE))
+
+                else:
+                    return
+
+        except Exception as e:
+            logger.warning(f'Could not fingerprint {filepath}: {e}')
+            return
+
+        return digest.hexdigest()
+
+    def get(self, fingerprint):
+        """
+        Get the labels for the fingerprint
+
+        :param fingerprint: str
+        :return: labels (dict) | None
+        """
+        with self._lock:
+            labels = self._memory.get(fingerprint)
+
+            if labels is None and self._db is not None:
+                row = self._db.execute('SELECT labels FROM headers WHERE fingerprint = ?', (fingerprint,)).fetchone()
+                if row:
+                    labels = json.loads(row[0])
+                    self._memory[fingerprint] = labels
+
+            if labels is None:
+                self.misses += 1
+                return
+
+            self.hits += 1
+
+        return copy_bag(labels)
+
+    def set(self, fingerprint, labels):
+        """
+        Store the labels extracted from the file. Inserts are committed
+        every COMMIT_INTERVAL inserts and by flush and close.
+
+        :param fingerprint: str
+        :param labels: dict
+        :return: The labels as they will be returned by get (dict)
+        """
+        labels = normalise_labels(labels)
+
+        with self._lock:
+            self._memory[fingerprint] = labels
+
+            if self._db is not None:
+                self._db.execute('INSERT OR REPLACE INTO headers VALUES (?, ?)', (fingerprint, json.dumps(labels)))
+                self._pending += 1
+
+                if self._pending >= self.COMMIT_INTERVAL:
+                    self._commit()
+
+        return copy_bag(labels)
+
+    def _commit(self):
+        self._db.commit()
+        self._pending = 0
+
+    def flush(self):
+        """
+        Commit the labels which have not been written to the SQLite file
+        """
+        with self._lock:
+            if self._db is not None and self._pending:
+                self._commit()
+
+    def close(self):
+        self.flush()
+
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -11,23 +11,40 @@ __contact__ = 'richard.d.smith@stfc.ac.uk'
 from .base import FileHandler
 import netCDF4
 from cci_tagger.conf.constants import PRODUCT_VERSION, ALLOWED_GLOBAL_ATTRS
+import threading
 import logging
 import verboselogs
 
 verboselogs.install()
 logger = logging.getLogger(__name__)
 
+# The netCDF C library is not thread safe so calls into it are serialised
+NETCDF_LOCK = threading.RLock()
+
 
 class NetcdfHandler(FileHandler):
 
-    def __init__(self, filepath):
+    def __init__(self, filepath, **kwargs):
 
-        self.tags = {}
+        super().__init__(filepath, **kwargs)
         self.nc_data = None
-        self.filepath = filepath.as_posix()
+        self.fingerprint = None
+
+        # Files with the same global attributes give the same labels
+        if self.header_cache is not None:
+            self.fingerprint = self.header_cache.fingerprint(filepath, self.attribute_map)
+
+            if self.fingerprint:
+                cached = self.header_cache.get(self.fingerprint)
+
+                if cached is not None:
+                    logger.verbose(f'Header cache hit for {self.filepath}')
+                    self.tags = cached
+                    return
 
         try:
-            self.nc_data = netCDF4.Dataset(filepath)
+            with NETCDF_LOCK:
+                self.nc_data = netCDF4.Dataset(filepath)
         except Exception as e:
             logger.error(f'Read error. Could not open file: {filepath} with error: {e}')
 
@@ -47,39 +64,53 @@ class NetcdfHandler(FileHandler):
         :return: attribute (string) | None
         """
 
-        try:
-            attr = self.nc_data.getncattr(PRODUCT_VERSION)
-        except AttributeError:
-            return
+        for name in self.get_attribute_names(PRODUCT_VERSION):
+            try:
+                attr = self.nc_data.getncattr(name)
+            except AttributeError:
+                continue
 
-        return str(attr)
+            return str(attr)
 
     def extract_facet_labels(self, proc_level):
 
         if self.nc_data:
-            logger.verbose(f'GLOBAL ATTRS for {self.filepath}')
+            with NETCDF_LOCK:
+                self._read_facet_labels()
 
-            for global_attr in ALLOWED_GLOBAL_ATTRS:
-                if global_attr in self.nc_data.ncattrs():
-                    attr = self.nc_data.getncattr(global_attr)
-
-                    self.tags[global_attr] = attr
-
-                    # Verbose logging
-                    logger.verbose(f'{global_attr}={attr}')
-                else:
-                    logger.warning(f'Required attr {global_attr} not found in {self.filepath}')
+            # Labels from a miss have the same types as those from a hit
+            if self.fingerprint:
+                self.tags = self.header_cache.set(self.fingerprint, self.tags)
 
-            # Add product version
-            product_version = self.get_product_version()
+        return self.tags
 
-            if product_version:
-                self.tags[PRODUCT_VERSION] = product_version
+    def _read_facet_labels(self):
+        """
+        Read the labels from the open file and close it
+        """
+        logger.verbose(f'GLOBAL ATTRS for {self.filepath}')
 
-        return self.tags
+        ncattrs = self.nc_data.ncattrs()
 
+        for global_attr in ALLOWED_GLOBAL_ATTRS:
+            for name in self.get_attribute_names(global_attr):
+                if name in ncattrs:
+                    attr = self.nc_data.getncattr(name)
 
+                    self.tags[global_attr] = attr
 
+                    # Verbose logging
+                    logger.verbose(f'{global_attr}={attr}')
+                    break
+            else:
+                logger.warning(f'Required attr {global_attr} not found in {self.filepath}')
 
+        # Add product version
+        product_version = self.get_product_version()
 
+        if product_version:
+            self.tags[PRODUCT_VERSION] = product_version
 
+        # Release the file handle as soon as the attributes have been read
+        self.nc_data.close()
+        self.nc_data = None
@@ -0,0 +1,70 @@
+# encoding: utf-8
+"""
+Handler for netCDF and HDF5 files held in object storage. Only the byte
+ranges needed to read the global attributes are requested.
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+from .base import AttributeHandler
+from .cdf_header import ClassicHeaderReader, CDF_MAGIC, HDF5_MAGIC, HeaderError
+from .compressed import read_netcdf_stream, open_decompressed, DECOMPRESSORS
+from .hdf import HDF5Handler
+from cci_tagger.object_store import ObjectStore
+import logging
+import verboselogs
+
+verboselogs.install()
+logger = logging.getLogger(__name__)
+
+
+class ObjectStoreHandler(AttributeHandler):
+
+    def __init__(self, filepath, **kwargs):
+
+        super().__init__(filepath, **kwargs)
+
+        # Number of requests made to read the attributes
+        self.requests = 0
+
+        reader = ObjectStore.open(filepath)
+
+        try:
+            if filepath.suffix in DECOMPRESSORS:
+                with open_decompressed(reader, filepath.suffix) as stream:
+                    self.attributes, _ = read_netcdf_stream(stream)
+            else:
+                self.attributes = self.read_attributes(reader)
+
+        except Exception as e:
+            logger.error(f'Read error. Could not read object: {filepath} with error: {e}')
+
+        finally:
+            self.requests = reader.requests
+            self.bytes_read = reader.bytes_fetched
+
+        logger.verbose(f'{self.requests} requests for {filepath}')
+
+    @staticmethod
+    def read_attributes(reader):
+        """
+        Read the global attributes from a seekable reader. HDF5 based
+        files are read with h5py which only touches the blocks containing
+        the root group.
+
+        :param reader: RangedReader
+        :return: attributes (dict)
+        """
+        magic = reader.read(len(HDF5_MAGIC))
+        reader.seek(0)
+
+        if magic.startswith(CDF_MAGIC):
+            return ClassicHeaderReader(reader).read_global_attributes()
+
+        if magic.startswith(HDF5_MAGIC):
+            return HDF5Handler.read_root_attributes(reader)
+
+        raise HeaderError('Not a netCDF or HDF5 file')
@@ -0,0 +1,245 @@
+# encoding: utf-8
+"""
+Access to datasets held in S3 compatible object storage.
+
+Objects are listed with paginated requests and metadata is read with ranged
+GET requests, so only the header of each file is transferred. A single client,
+and so a single connection pool, is shared by all requests.
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+import io
+import pathlib
+import re
+import threading
+
+from cci_tagger.conf.settings import OBJECT_STORE_ENDPOINT, \
+    OBJECT_STORE_BLOCK_SIZE, OBJECT_STORE_MAX_CONNECTIONS
+
+
+class ObjectStorePath(pathlib.PurePosixPath):
+    """
+    Path to an object in the form s3://bucket/key. Behaves like a POSIX path
+    of the form /bucket/key so that names, suffixes and parents work in the
+    same way as for files on disk.
+    """
+
+    SCHEME = 's3://'
+
+    @classmethod
+    def is_uri(cls, uri):
+        return isinstance(uri, str) and uri.startswith(cls.SCHEME)
+
+    @classmethod
+    def from_uri(cls, uri):
+        return cls('/' + uri[len(cls.SCHEME):])
+
+    @property
+    def bucket(self):
+        return self.parts[1]
+
+    @property
+    def key(self):
+        return '/'.join(self.parts[2:])
+
+    def __str__(self):
+        return f'{self.SCHEME}{super().__str__().lstrip("/")}'
+
+
+class RangedReader(io.RawIOBase):
+    """
+    Seekable, read-only file-like object backed by ranged GET requests.
+
+    Data is fetched in blocks of OBJECT_STORE_BLOCK_SIZE and cached. Runs of
+    adjacent missing blocks are coalesced into a single request. The size of
+    the object is taken from the first response so no HEAD request is needed.
+    S3 answers a range request for an empty object with 416 InvalidRange, which
+    gives a size of 0.
+    """
+
+    CONTENT_RANGE = re.compile(r'bytes \d+-\d+/(\d+)')
+
+    def __init__(self, client, bucket, key, block_size=OBJECT_STORE_BLOCK_SIZE):
+        self._client = client
+        self._bucket = bucket
+        self._key = key
+        self._block_size = block_size
+        self._blocks = {}
+        self._position = 0
+        self._size = None
+
+        # Statistics
+        self.requests = 0
+        self.bytes_fetched = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    @property
+    def size(self):
+        if self._size is None:
+            self._fetch(0, 0)
+        return self._size
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._position = offset
+        elif whence == io.SEEK_CUR:
+            self._position += offset
+        elif whence == io.SEEK_END:
+            self._position = self.size + offset
+        else:
+            raise ValueError(f'Invalid whence {whence}')
+
+        return self._position
+
+    def _fetch(self, first_block, last_block):
+        """
+        Fetch a run of blocks with a single request
+        """
+        start = first_block * self._block_size
+        end = (last_block + 1) * self._block_size - 1
+
+        try:
+            response = self._client.get_object(Bucket=self._bucket, Key=self._key, Range=f'bytes={start}-{end}')
+        except Exception as e:
+            if self._size is None and start == 0 and self._is_invalid_range(e):
+                self.requests += 1
+                self._size = 0
+                return
+
+            raise
+
+        data = response['Body'].read()
+
+        self.requests += 1
+        self.bytes_fetched += len(data)
+
+        if self._size is None:
+            match = self.CONTENT_RANGE.match(response.get('ContentRange', ''))
+            self._size = int(match.group(1)) if match else len(data)
+
+        for block in range(first_block, last_block + 1):
+            offset = (block - first_block) * self._block_size
+            self._blocks[block] = data[offset:offset + self._block_size]
+
+    @staticmethod
+    def _is_invalid_range(error):
+        """
+        Check for the botocore ClientError given for an unsatisfiable range
+        """
+        response = getattr(error, 'response', None) or {}
+
+        return response.get('Error', {}).get('Code') == 'InvalidRange' or \
+            response.get('ResponseMetadata', {}).get('HTTPStatusCode') == 416
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.size - self._position
+
+        end = min(self._position + size, self.size)
+        if end <= self._position:
+            return b''
+
+        first_block = self._position // self._block_size
+        last_block = (end - 1) // self._block_size
+
+        # Coalesce adjacent missing blocks into single requests
+        missing = [block for block in range(first_block, last_block + 1) if block not in self._blocks]
+        while missing:
+            run_end = 0
+            while run_end + 1 < len(missing) and missing[run_end + 1] == missing[run_end] + 1:
+                run_end += 1
+
+            self._fetch(missing[0], missing[run_end])
+            missing = missing[run_end + 1:]
+
+        data = b''.join(self._blocks[block] for block in range(first_block, last_block + 1))
+        offset = self._position - first_block * self._block_size
+        data = data[offset:offset + end - self._position]
+
+        self._position += len(data)
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+class ObjectStore(object):
+    """
+    Shared access to the object store
+    """
+
+    _client = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_client(cls):
+        """
+        Get the client, creating a new one if necessary. The client is
+        thread safe and shares its connection pool across all files.
+        """
+        with cls._lock:
+            if cls._client is None:
+                import boto3
+                from botocore.config import Config
+
+                cls._client = boto3.client(
+                    's3',
+                    endpoint_url=OBJECT_STORE_ENDPOINT,
+                    config=Config(max_pool_connections=OBJECT_STORE_MAX_CONNECTIONS)
+                )
+
+        return cls._client
+
+    @classmethod
+    def set_client(cls, client):
+        """
+        Replace the shared client e.g. to point at a different endpoint
+        """
+        with cls._lock:
+            cls._client = client
+
+    @classmethod
+    def iter_objects(cls, path):
+        """
+        List the objects under the path using paginated requests
+
+        :param path: ObjectStorePath
+        :return: generator of ObjectStorePath
+        """
+        prefix = path.key
+        if prefix:
+            prefix = f'{prefix}/'
+
+        paginator = cls.get_client().get_paginator('list_objects_v2')
+
+        for page in paginator.paginate(Bucket=path.bucket, Prefix=prefix):
+            for item in page.get('Contents', []):
+                # Skip directory markers
+                if item['Key'].endswith('/'):
+                    continue
+
+                yield ObjectStorePath(f'/{path.bucket}/{item["Key"]}')
+
+    @classmethod
+    def open(cls, path):
+        """
+        Open the object for reading
+
+        :param path: ObjectStorePath
+        :return: RangedReader
+        """
+        return RangedReader(cls.get_client(), path.bucket, path.key)
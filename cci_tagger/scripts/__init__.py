@@ -8,5 +8,17 @@ __copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
 __license__ = 'BSD - see LICENSE file in top-level package directory'
 __contact__ = 'richard.d.smith@stfc.ac.uk'
 
-from .check_json import TestJSONFile
-from .command_line_client import CCITaggerCommandLineClient
\ No newline at end of file
+
+
+def __getattr__(name):
+    # The scripts are imported when first used, so that running
+    # cci_json_check does not import the tagger
+    if name == 'TestJSONFile':
+        from .check_json import TestJSONFile
+        return TestJSONFile
+
+    if name == 'CCITaggerCommandLineClient':
+        from .command_line_client import CCITaggerCommandLineClient
+        return CCITaggerCommandLineClient
+
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -11,7 +11,7 @@ __contact__ = 'richard.d.smith@stfc.ac.uk'
 
 import argparse
 import json
-from cci_tagger.conf.constants import ALL_FACETS
+from cci_tagger.conf.constants import ALL_FACETS, ALLOWED_GLOBAL_ATTRS, PRODUCT_VERSION
 from functools import wraps
 from io import StringIO
 
@@ -124,6 +124,7 @@ class TestJSONFile:
     ACCEPTABLE_KEYS = {'datasets', 'filters', 'mappings', 'defaults', 'realisations', 'overrides', 'aggregations'}
     FILTER_KEYS = {'pattern','realisation'}
     FACET_KEYS = set(ALL_FACETS)
+    ATTRIBUTE_FACET_KEYS = set(ALLOWED_GLOBAL_ATTRS + [PRODUCT_VERSION])
 
     def __init__(self, file, verbosity=0):
         self.file = file
@@ -279,6 +280,7 @@ class TestJSONFile:
         Checks mappings key and evaluates:
         - Checks mapping section is dict
         - Checks all the keys listed are valid
+        - Checks attribute mappings point to facets which are read from files
         """
         mappings = self.data.get('mappings')
         if mappings is None:
@@ -288,11 +290,18 @@ class TestJSONFile:
         if not self._check_type('Mappings', mappings, dict, results):
             return results
 
-        valid_mapping_keys = self.FACET_KEYS.union({'merged'})
+        valid_mapping_keys = self.FACET_KEYS.union({'merged', 'attributes'})
 
         # Check all keys are valid
         self._check_valid_keys(mappings, valid_mapping_keys, results)
 
+        # Check attribute mappings
+        attributes = mappings.get('attributes')
+        if attributes is not None and self._check_type('Attribute mappings', attributes, dict, results):
+            for attr, facet in attributes.items():
+                if facet not in self.ATTRIBUTE_FACET_KEYS:
+                    results.add_error(f'Attribute "{attr}" is mapped to "{facet}". Should be one of {sorted(self.ATTRIBUTE_FACET_KEYS)}')
+
         return results
 
     @test_results
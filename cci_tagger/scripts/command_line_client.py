@@ -31,8 +31,11 @@ SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 from argparse import ArgumentParser
 from argparse import RawDescriptionHelpFormatter
+from argparse import ArgumentTypeError
+from argparse import SUPPRESS
+from contextlib import nullcontext
 from datetime import datetime
-from cci_tagger.conf.settings import ERROR_FILE, LOG_FORMAT
+from cci_tagger.conf.settings import ERROR_FILE, ESGF_DRS_FILE, LOG_FORMAT, MOLES_TAGS_FILE, PIPELINE_QUEUE_SIZE
 import json
 import sys
 import time
@@ -40,17 +43,39 @@ import logging
 import verboselogs
 
 from cci_tagger.tagger import ProcessDatasets
+from cci_tagger.dataset.dataset import Dataset
+from cci_tagger.object_store import ObjectStorePath
+from cci_tagger.utils.snippets import tagged_dataset_as_dict
+from cci_tagger.utils.perf import PerfRecorder
+from cci_tagger.utils.trace import Tracer
+from cci_tagger.utils.profiler import DatasetProfiler
+from cci_tagger.utils.memory import DatasetMemoryReporter, MB
+from cci_tagger.utils.metrics import Metrics, MetricsExporter
+from cci_tagger.shard import ShardWriter, ShardError, estimate_sizes, fingerprint, merge_shards, partition, \
+    read_sizes
+import os
+import pathlib
 
 verboselogs.install()
 logger = logging.getLogger()
 
-# Set up ERROR file log handler
-fh = logging.FileHandler(ERROR_FILE)
-fh.setLevel(logging.ERROR)
 LOG_FORMATTER = logging.Formatter(LOG_FORMAT)
-fh.setFormatter(LOG_FORMATTER)
 
-logger.addHandler(fh)
+
+def add_error_file_handler(error_file=ERROR_FILE):
+    """
+    Log errors to the error file. Called when the script runs rather than
+    when this module is imported, so importing it does not create the file.
+
+    @param error_file (str): the name of the file errors are appended to
+
+    """
+    fh = logging.FileHandler(error_file)
+    fh.setLevel(logging.ERROR)
+    fh.setFormatter(LOG_FORMATTER)
+
+    logger.addHandler(fh)
+
 
 def get_logging_level(verbosity):
 
@@ -100,10 +125,64 @@ def read_json_file(file_name):
     return data
 
 
+def parse_pipeline_workers(value):
+    """
+    Parse the value of the --pipeline-workers option.
+
+    @param value (str): the number of threads reading file metadata, e.g. 8,
+            or the threads for each stage, e.g. parse=2,read=8
+
+    @return the number of threads (int) or threads for each stage (dict)
+
+    """
+    if value.isdigit():
+        return int(value)
+
+    workers = {}
+
+    try:
+        for part in value.split(','):
+            stage, count = part.split('=')
+            workers[stage.strip()] = int(count)
+    except ValueError:
+        raise ArgumentTypeError(f'Invalid pipeline workers: {value}')
+
+    return workers
+
+
+def parse_shard(value):
+    """
+    Parse the value of the --shard option.
+
+    @param value (str): the shard number and the number of shards, e.g. 3/10.
+            Shards are numbered from 1, as are array job tasks
+
+    @return the shard number (int) and number of shards (int)
+
+    """
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise ArgumentTypeError(f'Invalid shard: {value}. Expected I/N e.g. 3/10')
+
+    if not 1 <= index <= count:
+        raise ArgumentTypeError(f'Invalid shard: {value}. I must be between 1 and N')
+
+    return index, count
+
+
 class CCITaggerCommandLineClient(object):
 
+    # Options which only apply when datasets are processed, so are not
+    # allowed with --stream
+    BATCH_OPTIONS = (
+        '--file_count', '--columnar', '--pipeline-workers', '--pipeline-queue-size', '--perf-report', '--trace',
+        '--trace-sample', '--profile', '--profile-top', '--memory-report', '--memory-budget', '--metrics-file',
+        '--metrics-interval', '--progress', '--shard', '--shard-sizes', '--shard-dir'
+    )
+
     @staticmethod
-    def parse_command_line():
+    def get_parser():
         parser = ArgumentParser(
             description='Tag observations. You can tag an individual dataset, '
             'or tag all the datasets'
@@ -119,10 +198,13 @@ class CCITaggerCommandLineClient(object):
             '-v'
             '\n  moles_esgf_tag -f datapath --file_count 2 -v'
             '\n  moles_esgf_tag -j example.json -v'
-            '\n  moles_esgf_tag -s',
+            '\n  find /neodc/esacci/cloud -name "*.nc" | moles_esgf_tag --stream'
+            '\n  moles_esgf_tag -s'
+            '\n  moles_esgf_tag -f datapath --shard $LSB_JOBINDEX/10'
+            '\n  moles_esgf_tag merge',
             formatter_class=RawDescriptionHelpFormatter)
 
-        group = parser.add_mutually_exclusive_group(required=True)
+        group = parser.add_mutually_exclusive_group()
         group.add_argument(
             '-d', '--dataset',
             help=('the full path to the dataset that is to be tagged. This '
@@ -141,23 +223,187 @@ class CCITaggerCommandLineClient(object):
                   'which are used by the tagging code. Useful to test datsets and specific mapping files')
         )
 
+        parser.add_argument(
+            '--stream', action='store_true',
+            help=('read file or dataset paths from stdin, one per line, and '
+                  'write a JSON record for each file to stdout as soon as it '
+                  'is tagged. Directories are walked and blank lines and '
+                  'lines starting with # are skipped. -j can be used to '
+                  'provide the mappings.')
+        )
+        parser.add_argument(
+            '--workers',
+            help='number of threads used to read files in stream mode',
+            type=int, default=0
+        )
         parser.add_argument(
             '--file_count',
             help='how many .nc files to look at per dataset',
             type=int, default=0
         )
+        parser.add_argument(
+            '--header-cache',
+            help=('SQLite file used to cache the labels extracted from netCDF '
+                  'headers. Files with identical global attributes are only '
+                  'decoded once and the cache is shared between runs.')
+        )
+        parser.add_argument(
+            '--attribute-index',
+            help=('NDJSON or SQLite index of the global attributes for each '
+                  'file, as written by the archive crawler. Files found in '
+                  'the index are not opened.')
+        )
+        parser.add_argument(
+            '--columnar', action='store_true',
+            help=('hold the tags for each file as integer codes while '
+                  'processing a dataset. Reduces memory use for datasets '
+                  'with a large number of files.')
+        )
+        parser.add_argument(
+            '--pipeline-workers', type=parse_pipeline_workers,
+            help=('process each dataset as a pipeline of stages running in '
+                  'their own threads, so that listing, reading and resolving '
+                  'files overlap. Either the number of threads reading file '
+                  'metadata, e.g. 8, or threads per stage, e.g. parse=2,read=8. '
+                  'Throughput and queue depth for each stage are logged with -v.')
+        )
+        parser.add_argument(
+            '--pipeline-queue-size', type=int, default=PIPELINE_QUEUE_SIZE,
+            help='number of files waiting between pipeline stages. DEFAULT: %(default)s'
+        )
+        parser.add_argument(
+            '--perf-report', nargs='?', const='perf_report.json', metavar='PATH',
+            help=('time each stage of the run, print a summary table and write '
+                  'the timings for each stage and dataset to a JSON file. '
+                  'DEFAULT PATH: %(const)s')
+        )
+        parser.add_argument(
+            '--trace', metavar='PATH',
+            help=('write a Chrome trace of the run with spans for opening, '
+                  'reading, resolving and the DRS of each file. Open it in '
+                  'https://ui.perfetto.dev')
+        )
+        parser.add_argument(
+            '--trace-sample', type=float, default=1.0, metavar='RATE',
+            help='fraction of the files to trace, between 0 and 1. DEFAULT: %(default)s'
+        )
+        parser.add_argument(
+            '--profile', metavar='DIR',
+            help=('profile the processing of each dataset with cProfile. A '
+                  'profile for each dataset and a summary of the hottest '
+                  'functions are written to DIR')
+        )
+        parser.add_argument(
+            '--profile-top', type=int, default=30, metavar='N',
+            help='number of functions in the profile summary. DEFAULT: %(default)s'
+        )
+        parser.add_argument(
+            '--memory-report', nargs='?', const='memory_report.json', metavar='PATH',
+            help=('trace allocations with tracemalloc and snapshot them before '
+                  'and after each dataset. Print the peak, net growth and top '
+                  'allocation sites for each dataset and write them to a JSON '
+                  'file. Slows the run down. DEFAULT PATH: %(const)s')
+        )
+        parser.add_argument(
+            '--memory-budget', type=float, metavar='MB',
+            help=('with --memory-report, warn when the memory allocated while '
+                  'processing a dataset goes over MB megabytes')
+        )
+        parser.add_argument(
+            '--metrics-file', metavar='PATH',
+            help=('write live metrics to PATH in the Prometheus textfile '
+                  'format, e.g. for the node exporter textfile collector')
+        )
+        parser.add_argument(
+            '--metrics-interval', type=float, default=15, metavar='SECONDS',
+            help='seconds between writing the metrics file. DEFAULT: %(default)s'
+        )
+        parser.add_argument(
+            '--progress', action='store_true',
+            help='show the number of files tagged, files per second and an ETA on stderr'
+        )
+        parser.add_argument(
+            '--shard', type=parse_shard, metavar='I/N',
+            help=('process shard I of N, e.g. for one task of an array job. The '
+                  'datasets are split into N shards of about the same size and '
+                  'the output is written to shard files, which are combined with '
+                  'the merge command')
+        )
+        parser.add_argument(
+            '--shard-sizes', metavar='PATH',
+            help=('estimated dataset sizes used to balance the shards. Either a '
+                  '--perf-report from an earlier run or lines of size and dataset '
+                  'path, e.g. from du -s. DEFAULT: every dataset is the same size')
+        )
+        parser.add_argument(
+            '--shard-dir', metavar='DIR', default='.',
+            help='directory for the shard files. DEFAULT: the current directory'
+        )
         parser.add_argument(
             '-v', '--verbose', action='count',
             help='increase output verbosity',
             default=0
         )
 
-        args = parser.parse_args()
+        subparsers = parser.add_subparsers(dest='command', metavar='merge')
+        merge = subparsers.add_parser(
+            'merge',
+            help=('merge the files written by each --shard into the %s and %s a '
+                  'single run would produce' % (MOLES_TAGS_FILE, ESGF_DRS_FILE))
+        )
+        # SUPPRESS so that the option given before merge is not replaced by
+        # the default
+        merge.add_argument(
+            '--shard-dir', metavar='DIR', default=SUPPRESS,
+            help='directory holding the shard files. DEFAULT: the current directory'
+        )
+        merge.add_argument(
+            '--output-dir', metavar='DIR', default='.',
+            help='directory for the merged files. DEFAULT: the current directory'
+        )
+
+        return parser
+
+    @classmethod
+    def parse_args(cls, argv=None):
+        """
+        Parse and check the command line arguments
+
+        @param argv (list): the arguments. Default: sys.argv
+
+        @return the arguments (Namespace)
+        """
+        parser = cls.get_parser()
+        args = parser.parse_args(argv)
+
+        if not args.command and not args.stream and not any((args.dataset, args.file, args.json_file)):
+            parser.error('one of the arguments -d/--dataset -f/--file -j/--json_file --stream is required')
+        if args.stream and (args.dataset or args.file):
+            parser.error('argument --stream: not allowed with argument -d/--dataset or -f/--file')
+        if args.stream:
+            for option in cls.BATCH_OPTIONS:
+                dest = option.lstrip('-').replace('-', '_')
+
+                if getattr(args, dest) != parser.get_default(dest):
+                    parser.error(f'argument {option}: not allowed with argument --stream')
+        if not 0 <= args.trace_sample <= 1:
+            parser.error('argument --trace-sample: must be between 0 and 1')
+        if args.memory_budget is not None and not args.memory_report:
+            parser.error('argument --memory-budget: requires --memory-report')
+
+        return args
+
+    @classmethod
+    def parse_command_line(cls):
+        args = cls.parse_args()
         datasets = None
 
         # Set logging level
         logger.setLevel(get_logging_level(args.verbose))
 
+        # Set up ERROR file log handler
+        add_error_file_handler()
+
         # Set up console logger
         ch = logging.StreamHandler()
         ch.setLevel(logger.level)
@@ -168,6 +414,10 @@ class CCITaggerCommandLineClient(object):
 
         start_time = time.strftime("%H:%M:%S")
 
+        # Paths are read from stdin and stdout is used for the results
+        if args.stream or args.command == 'merge':
+            return datasets, args
+
         # Read datasets from the command line
         if args.dataset is not None:
             datasets = {args.dataset}
@@ -201,6 +451,14 @@ class CCITaggerCommandLineClient(object):
         # Get the command line arguments
         datasets, args = cls.parse_command_line()
 
+        if args.command == 'merge':
+            cls.merge(args)
+            exit(0)
+
+        if args.stream:
+            cls.stream(args)
+            exit(0)
+
         # Quit of there are no datasets
         if not datasets:
             print('You have not provided any datasets')
@@ -211,8 +469,66 @@ class CCITaggerCommandLineClient(object):
         else:
             json_file = None
 
-        pds = ProcessDatasets(json_files=json_file)
-        pds.process_datasets(datasets, args.file_count)
+        shard = None
+        if args.shard:
+            shard = cls.get_shard(datasets, args)
+            datasets = shard.datasets
+
+        perf = PerfRecorder() if args.perf_report else None
+        tracer = Tracer(args.trace_sample) if args.trace else None
+        profiler = DatasetProfiler(args.profile, top=args.profile_top) if args.profile else None
+
+        memory = None
+        if args.memory_report:
+            budget = args.memory_budget * MB if args.memory_budget is not None else None
+            memory = DatasetMemoryReporter(budget=budget).start()
+
+        metrics = exporter = None
+        if args.metrics_file or args.progress:
+            metrics = Metrics()
+            exporter = MetricsExporter(
+                metrics,
+                textfile=args.metrics_file,
+                interval=args.metrics_interval,
+                progress=args.progress
+            ).start()
+
+        # The vocab and JSON mappings are loaded when ProcessDatasets is
+        # created, so they are reported as start-up
+        with memory.measure('start-up') if memory is not None else nullcontext():
+            pds = ProcessDatasets(json_files=json_file, header_cache=args.header_cache,
+                                  attribute_index=args.attribute_index, columnar=args.columnar,
+                                  pipeline_workers=args.pipeline_workers,
+                                  pipeline_queue_size=args.pipeline_queue_size, perf=perf,
+                                  tracer=tracer, profiler=profiler, metrics=metrics, memory=memory,
+                                  shard=shard)
+
+        try:
+            pds.process_datasets(datasets, args.file_count)
+        finally:
+            pds.shutdown()
+
+            if exporter is not None:
+                exporter.stop()
+
+        if perf is not None:
+            print(perf.format_table())
+            perf.write_json(args.perf_report)
+            print(f'Performance report written to {args.perf_report}')
+
+        if tracer is not None:
+            tracer.write(args.trace)
+            print(f'Trace with {tracer.span_count} spans written to {args.trace}')
+
+        if profiler is not None:
+            print(profiler.summary())
+            print(f'Profiles written to {args.profile}. Summary: {profiler.write_summary()}')
+
+        if memory is not None:
+            memory.stop()
+            print(memory.summary())
+            memory.write_json(args.memory_report)
+            print(f'Memory report written to {args.memory_report}')
 
         if logger.level <= logging.INFO:
             print(f'\n{time.strftime("%H:%M:%S")} FINISHED\n\n')
@@ -224,6 +540,107 @@ class CCITaggerCommandLineClient(object):
 
         exit(0)
 
+    @staticmethod
+    def get_shard(datasets, args):
+        """
+        Work out the datasets in this shard. Every shard works out the same
+        partition, so the sizes must be the same for each shard.
+
+        @param datasets (iterable): all the datasets
+        @param args (Namespace): the command line arguments
+
+        @return a ShardWriter for this shard
+
+        """
+        index, count = args.shard
+        datasets = set(datasets)
+
+        sizes = read_sizes(args.shard_sizes) if args.shard_sizes else None
+        sizes = estimate_sizes(datasets, sizes)
+
+        shard_datasets = partition(datasets, count, sizes)[index - 1]
+
+        logger.info(f'Shard {index}/{count}: {len(shard_datasets)} of {len(datasets)} datasets, estimated size '
+                    f'{sum(sizes[dspath] for _, dspath in shard_datasets):g} of {sum(sizes.values()):g}')
+
+        os.makedirs(args.shard_dir, exist_ok=True)
+
+        return ShardWriter(index, count, shard_datasets, len(datasets), args.shard_dir,
+                           partition_id=fingerprint(datasets, sizes))
+
+    @staticmethod
+    def merge(args):
+        """
+        Merge the shard files into the output files of a single run
+        """
+        try:
+            count = merge_shards(args.shard_dir, args.output_dir)
+        except ShardError as e:
+            logger.error(str(e))
+            sys.exit(1)
+
+        print(f'Merged {count} shards into {os.path.join(args.output_dir, MOLES_TAGS_FILE)} and '
+              f'{os.path.join(args.output_dir, ESGF_DRS_FILE)}')
+
+    @staticmethod
+    def iter_stream_paths(lines):
+        """
+        Turn lines from stdin into the paths of the files to tag. Blank
+        lines and lines starting with # are skipped.
+
+        :param lines: Iterable of str
+        :return: generator of pathlib.Path | ObjectStorePath
+        """
+        for line in lines:
+            line = line.strip()
+
+            if not line or line.startswith('#'):
+                continue
+
+            if ObjectStorePath.is_uri(line):
+                path = ObjectStorePath.from_uri(line)
+            else:
+                path = pathlib.Path(line)
+
+            yield from Dataset.iter_files(path)
+
+    @classmethod
+    def stream(cls, args, stdin=None, stdout=None):
+        """
+        Tag the paths read from stdin, writing one JSON record per file to
+        stdout. Paths are read as they are needed, so memory use does not
+        grow with the number of files.
+
+        :param args: Parsed command line arguments
+        :param stdin: File to read the paths from. Defaults to sys.stdin
+        :param stdout: File to write the records to. Defaults to sys.stdout
+        """
+        stdin = stdin or sys.stdin
+        stdout = stdout or sys.stdout
+
+        pds = ProcessDatasets(
+            suppress_file_output=True,
+            json_files=args.json_file,
+            header_cache=args.header_cache,
+            attribute_index=args.attribute_index
+        )
+
+        results = pds.get_files_tags(cls.iter_stream_paths(stdin), workers=args.workers)
+
+        try:
+            for path, tagged in results:
+                stdout.write(json.dumps(tagged_dataset_as_dict(path, tagged)) + '\n')
+                stdout.flush()
+
+        except BrokenPipeError:
+            # The reader has gone away e.g. piped into head. Point stdout at
+            # devnull so that flushing it on exit does not fail again
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull, stdout.fileno())
+
+        finally:
+            pds.shutdown()
+
 
 if __name__ == "__main__":
     CCITaggerCommandLineClient.main()
@@ -9,6 +9,8 @@ __license__ = 'BSD - see LICENSE file in top-level package directory'
 __contact__ = 'richard.d.smith@stfc.ac.uk'
 
 from cci_tagger.facets import Facets
+from cci_tagger.triple_store import TripleStore
+from cci_tagger.vocab_transport import RecordingTransport, ReplayTransport
 import argparse
 import json
 
@@ -16,13 +18,32 @@ import json
 def get_args():
     parser = argparse.ArgumentParser('Dump facet object for use by lotus')
     parser.add_argument('output', help='Output file')
+
+    vocab = parser.add_mutually_exclusive_group()
+    vocab.add_argument('--record-vocab', metavar='PATH',
+                       help='Record the vocab server queries and responses as a fixture. '
+                            'Compressed if PATH ends in .gz')
+    vocab.add_argument('--replay-vocab', metavar='PATH',
+                       help='Answer the vocab server queries from a recorded fixture, without the network')
     return parser.parse_args()
 
 
 def main():
     args = get_args()
+
+    recorder = None
+    if args.record_vocab:
+        recorder = RecordingTransport(args.record_vocab)
+        TripleStore.set_transport(recorder)
+
+    elif args.replay_vocab:
+        TripleStore.set_transport(ReplayTransport(args.replay_vocab))
+
     facets = Facets()
 
+    if recorder is not None:
+        recorder.save()
+
     with open(args.output, 'w') as writer:
         json.dump(facets.to_json(), writer)
 
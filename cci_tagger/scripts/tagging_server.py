@@ -0,0 +1,66 @@
+# encoding: utf-8
+"""
+Run the tagging service. The vocabulary and JSON mappings are loaded once
+when the service starts.
+
+    cci_tagger_server -j mappings.json --port 8080
+    cci_tagger_server -j mappings.json --socket /tmp/cci_tagger.sock
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+from argparse import ArgumentParser
+from cci_tagger.conf.settings import LOG_FORMAT
+from cci_tagger.server import TaggingServer, UnixTaggingServer
+from cci_tagger.tagger import ProcessDatasets
+import logging
+import verboselogs
+
+verboselogs.install()
+logger = logging.getLogger()
+
+
+def main():
+    parser = ArgumentParser(description='Serve tagging requests with the vocabulary and mappings kept in memory')
+    parser.add_argument('-j', '--json_file', action='append', help='JSON mapping file. Can be given more than once')
+    parser.add_argument('--facet-json', help='Load the vocabulary from the output of export_facet_json')
+    parser.add_argument('--header-cache', help='SQLite file used to cache the labels extracted from netCDF headers')
+    parser.add_argument('--attribute-index', help='NDJSON or SQLite index of the global attributes for each file')
+    parser.add_argument('--host', help='Host to listen on. DEFAULT: %(default)s', default='localhost')
+    parser.add_argument('--port', help='Port to listen on. DEFAULT: %(default)s', type=int, default=8080)
+    parser.add_argument('--socket', help='Listen on this Unix socket instead of a TCP port')
+    parser.add_argument('-v', '--verbose', action='count', help='increase output verbosity', default=0)
+
+    args = parser.parse_args()
+
+    logging.basicConfig(format=LOG_FORMAT, level=logging.INFO if args.verbose else logging.WARNING)
+
+    tagger = ProcessDatasets(
+        suppress_file_output=True,
+        json_files=args.json_file,
+        facet_json=args.facet_json,
+        header_cache=args.header_cache,
+        attribute_index=args.attribute_index
+    )
+
+    if args.socket:
+        server = UnixTaggingServer(args.socket, tagger)
+        logger.info(f'Listening on {args.socket}')
+    else:
+        server = TaggingServer((args.host, args.port), tagger)
+        logger.info(f'Listening on http://{args.host}:{server.server_port}')
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        tagger.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+# encoding: utf-8
+"""
+HTTP service which keeps the vocabulary and JSON mappings loaded between
+requests. The service can listen on a TCP port or a local Unix socket and
+handles each request in its own thread.
+
+Endpoints
+    GET  /health   Status and cache statistics
+    POST /tags     Tag one file ``{"path": ...}`` or many files
+                   ``{"paths": [...], "workers": 4}``. workers is limited
+                   to SERVER_MAX_WORKERS
+    POST /reload   Reload the JSON mappings ``{"json_files": [...]}``
+                   and optionally the vocabulary ``{"vocab": true}``
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+from cci_tagger.conf.settings import SERVER_MAX_WORKERS
+from cci_tagger.utils.snippets import tagged_dataset_as_dict
+import json
+import os
+import socket
+import logging
+import verboselogs
+
+verboselogs.install()
+logger = logging.getLogger(__name__)
+
+
+class RequestError(ValueError):
+    """
+    The request is not valid. Sent to the client with status 400
+    """
+
+
+class TaggingRequestHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    @property
+    def tagger(self):
+        return self.server.tagger
+
+    def setup(self):
+        # Send small responses straight away. Not supported by Unix sockets
+        self.disable_nagle_algorithm = self.request.family != socket.AF_UNIX
+        super().setup()
+
+    def log_message(self, format, *args):
+        # The client address is empty for Unix sockets
+        logger.debug(f'{self.command} {self.path} ' + format % args)
+
+    def send_json(self, data, status=200):
+        body = json.dumps(data).encode('utf-8')
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length', 0))
+
+        if not length:
+            return {}
+
+        return json.loads(self.rfile.read(length))
+
+    def do_GET(self):
+        if self.path == '/health':
+            cache_info = {name: info._asdict() for name, info in self.tagger.cache_info().items()}
+            return self.send_json({'status': 'ok', 'cache': cache_info})
+
+        self.send_json({'error': f'Not found: {self.path}'}, status=404)
+
+    def do_POST(self):
+        routes = {
+            '/tags': self.post_tags,
+            '/reload': self.post_reload
+        }
+
+        route = routes.get(self.path)
+        if route is None:
+            return self.send_json({'error': f'Not found: {self.path}'}, status=404)
+
+        try:
+            data = self.read_json()
+        except ValueError as e:
+            return self.send_json({'error': f'Invalid JSON: {e}'}, status=400)
+
+        try:
+            self.send_json(route(data))
+        except RequestError as e:
+            self.send_json({'error': str(e)}, status=400)
+        except Exception as e:
+            logger.exception(f'Error handling {self.path}')
+            self.send_json({'error': str(e)}, status=500)
+
+    def post_tags(self, data):
+        if 'path' in data:
+            path = data['path']
+            return tagged_dataset_as_dict(path, self.tagger.get_file_tags(path))
+
+        workers = data.get('workers', 0)
+
+        # bool is a subclass of int
+        if not isinstance(workers, int) or isinstance(workers, bool) or workers < 0:
+            raise RequestError(f'workers must be a non-negative integer: {workers!r}')
+
+        results = self.tagger.get_files_tags(data.get('paths', []), workers=min(workers, SERVER_MAX_WORKERS))
+
+        return {'results': [tagged_dataset_as_dict(path, tagged) for path, tagged in results]}
+
+    def post_reload(self, data):
+        if data.get('vocab'):
+            self.tagger.reload_vocab(data.get('facet_json'))
+
+        self.tagger.reload_mappings(data.get('json_files'))
+
+        return {'status': 'reloaded'}
+
+
+class TaggingServer(ThreadingHTTPServer):
+    """
+    Tagging service listening on a TCP port
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, tagger):
+        """
+        :param address: (host, port)
+        :param tagger: ProcessDatasets
+        """
+        self.tagger = tagger
+        super().__init__(address, TaggingRequestHandler)
+
+
+class UnixTaggingServer(ThreadingMixIn, UnixStreamServer):
+    """
+    Tagging service listening on a local Unix socket
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, tagger):
+        """
+        :param socket_path: Path to the socket. Replaced if it exists
+        :param tagger: ProcessDatasets
+        """
+        self.tagger = tagger
+
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+        super().__init__(socket_path, TaggingRequestHandler)
+
+    def server_close(self):
+        super().server_close()
+
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
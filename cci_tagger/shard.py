@@ -0,0 +1,358 @@
+# encoding: utf-8
+"""
+Split a tagging run into shards, for example the tasks of an array job, and
+merge the output of the shards.
+
+Each shard is given a share of the datasets, balanced by an estimate of the
+size of each dataset. The partition only depends on the list of datasets and
+the estimates, so every task works out the same partition without talking
+to the others. A shard writes its own output files:
+
+    moles_tags.shard-0001-of-0004.csv    position,dataset,uri
+    esgf_drs.shard-0001-of-0004.ndjson   [drs, position, files] sorted by DRS
+    shard-0001-of-0004.json              the datasets in the shard. Written last
+
+where position is the place of the dataset in the sorted list of all the
+datasets. The merge is a streaming k-way merge of the shard files, which
+writes the moles_tags.csv and esgf_drs.json a single run would produce.
+
+hashlib and statistics are imported where they are used, to keep the start-up
+time of moles_esgf_tag down.
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+from cci_tagger.conf.settings import ESGF_DRS_FILE, MOLES_TAGS_FILE
+import glob
+import heapq
+import itertools
+import json
+import os
+import re
+import logging
+import verboselogs
+
+verboselogs.install()
+logger = logging.getLogger(__name__)
+
+SHARD_NAME = 'shard-{index:04d}-of-{count:04d}'
+SHARD_PATTERN = re.compile(r'^shard-(\d{4})-of-(\d{4})\.json$')
+
+JSON_SEPARATORS = (',', ': ')
+
+
+class ShardError(ValueError):
+    """
+    The shard outputs are missing, incomplete or do not agree
+    """
+
+
+def shard_name(index, count):
+    return SHARD_NAME.format(index=index, count=count)
+
+
+def shard_paths(index, count, directory='.'):
+    """
+    Output files for a shard
+
+    :param index: Shard number, starting at 1
+    :param count: Number of shards
+    :param directory: Directory for the files
+    :return: {'moles_tags', 'esgf_drs', 'manifest'}
+    """
+    name = shard_name(index, count)
+    moles_stem = os.path.splitext(MOLES_TAGS_FILE)[0]
+    drs_stem = os.path.splitext(ESGF_DRS_FILE)[0]
+
+    return {
+        'moles_tags': os.path.join(directory, f'{moles_stem}.{name}.csv'),
+        'esgf_drs': os.path.join(directory, f'{drs_stem}.{name}.ndjson'),
+        'manifest': os.path.join(directory, f'{name}.json')
+    }
+
+
+def read_sizes(path):
+    """
+    Read dataset sizes from a file. Either a perf report from an earlier
+    run, in which case the time spent on each dataset is used, or lines of
+    size and dataset path, such as the output of du -s.
+
+    :param path: Path to the file
+    :return: {dataset: size}
+    """
+    sizes = {}
+
+    with open(path) as reader:
+        if path.endswith('.json'):
+            report = json.load(reader)
+
+            for dataset, stages in report.get('datasets', {}).items():
+                if 'dataset' in stages:
+                    sizes[dataset] = stages['dataset']['total']
+
+            return sizes
+
+        for line in reader:
+            parts = line.split(None, 1)
+
+            if len(parts) != 2:
+                continue
+
+            try:
+                sizes[parts[1].strip()] = float(parts[0])
+            except ValueError:
+                continue
+
+    return sizes
+
+
+def estimate_sizes(datasets, sizes=None):
+    """
+    Estimate the size of each dataset. Datasets which are not in sizes are
+    given the median of the known sizes. Without sizes, every dataset is
+    given the same size, so that no task has to walk the datasets before it
+    can start.
+
+    :param datasets: Dataset paths
+    :param sizes: {dataset: size} | None
+    :return: {dataset: size}
+    """
+    if sizes is None:
+        return {dspath: 1 for dspath in datasets}
+
+    import statistics
+
+    known = [sizes[dspath] for dspath in datasets if dspath in sizes]
+    default = statistics.median(known) if known else 1
+
+    return {dspath: sizes.get(dspath, default) for dspath in datasets}
+
+
+def partition(datasets, count, sizes=None):
+    """
+    Split the datasets into shards with about the same total size. The
+    largest datasets are placed first, each in the shard with the smallest
+    total so far.
+
+    :param datasets: Dataset paths
+    :param count: Number of shards
+    :param sizes: {dataset: size}. Default: all the same size
+    :return: [[(position, dataset)] for each shard], positions in the sorted list of datasets
+    """
+    datasets = sorted(set(datasets))
+    sizes = sizes or {}
+
+    shards = [[] for _ in range(count)]
+    loads = [(0, index) for index in range(count)]
+
+    order = sorted(range(len(datasets)), key=lambda position: (-sizes.get(datasets[position], 1), position))
+
+    for position in order:
+        load, index = heapq.heappop(loads)
+        shards[index].append((position, datasets[position]))
+        heapq.heappush(loads, (load + sizes.get(datasets[position], 1), index))
+
+    return [sorted(shard) for shard in shards]
+
+
+def fingerprint(datasets, sizes=None):
+    """
+    Identify a partition by the datasets and sizes it was made from, so
+    that shards from different partitions are not merged
+
+    :param datasets: Dataset paths
+    :param sizes: {dataset: size}
+    :return: str
+    """
+    import hashlib
+
+    sizes = sizes or {}
+    items = [(dspath, sizes.get(dspath, 1)) for dspath in sorted(set(datasets))]
+
+    return hashlib.sha1(json.dumps(items).encode('utf-8')).hexdigest()
+
+
+class ShardWriter(object):
+    """
+    Writes the output of one shard. Used by ProcessDatasets in place of
+    moles_tags.csv and esgf_drs.json.
+    """
+
+    def __init__(self, index, count, datasets, total, directory='.', partition_id=None):
+        """
+        :param index: Shard number, starting at 1
+        :param count: Number of shards
+        :param datasets: [(position, dataset)] in the shard
+        :param total: Number of datasets in all the shards
+        :param directory: Directory for the output files
+        :param partition_id: fingerprint of the partition
+        """
+        self.index = index
+        self.count = count
+        self.total = total
+        self.partition_id = partition_id
+        self.paths = shard_paths(index, count, directory)
+
+        self.positions = {dspath: position for position, dspath in datasets}
+
+        # Position of the dataset being processed and of the dataset each
+        # DRS was last seen in
+        self._position = None
+        self._drs_positions = {}
+        self._moles_tags = None
+
+    @property
+    def datasets(self):
+        return list(self.positions)
+
+    def open(self):
+        # A manifest from an earlier attempt would mark the shard as complete
+        if os.path.exists(self.paths['manifest']):
+            os.remove(self.paths['manifest'])
+
+        self._moles_tags = open(self.paths['moles_tags'], 'w')
+
+    def start_dataset(self, dspath):
+        self._position = self.positions[dspath]
+
+    def write_moles_tag(self, dataset_id, uri):
+        self._moles_tags.write(f'{self._position},{dataset_id},{uri}\n')
+
+    def add_file_map(self, file_map):
+        for drs in file_map:
+            self._drs_positions[drs] = self._position
+
+    def write_drs(self, file_map):
+        """
+        :param file_map: {DRS: files} for all the datasets in the shard
+        """
+        with open(self.paths['esgf_drs'], 'w') as writer:
+            for drs in sorted(file_map):
+                writer.write(json.dumps([drs, self._drs_positions.get(drs, -1), file_map[drs]]) + '\n')
+
+    def close(self):
+        """
+        Close the files and write the manifest, which marks the shard as
+        complete
+        """
+        self._moles_tags.close()
+
+        manifest = {
+            'index': self.index,
+            'count': self.count,
+            'total': self.total,
+            'partition': self.partition_id,
+            'positions': sorted(self.positions.values())
+        }
+
+        tmp = f'{self.paths["manifest"]}.tmp'
+        with open(tmp, 'w') as writer:
+            json.dump(manifest, writer)
+
+        os.replace(tmp, self.paths['manifest'])
+
+
+def find_shards(directory='.'):
+    """
+    Check that all the shards in the directory are complete and cover
+    every dataset once
+
+    :param directory: Directory holding the shard outputs
+    :return: [shard paths] in shard order
+    """
+    manifests = {}
+
+    for path in glob.glob(os.path.join(glob.escape(directory), 'shard-*-of-*.json')):
+        match = SHARD_PATTERN.match(os.path.basename(path))
+
+        if match:
+            with open(path) as reader:
+                manifests[(int(match.group(1)), int(match.group(2)))] = json.load(reader)
+
+    if not manifests:
+        raise ShardError(f'No complete shards found in {directory}')
+
+    counts = {count for _, count in manifests}
+    if len(counts) > 1:
+        raise ShardError(f'Shards from runs with different numbers of shards: {sorted(counts)}')
+
+    count = counts.pop()
+
+    missing = [index for index in range(1, count + 1) if (index, count) not in manifests]
+    if missing:
+        raise ShardError(f'Shards not complete: {", ".join(shard_name(index, count) for index in missing)}')
+
+    if len({manifest['partition'] for manifest in manifests.values()}) > 1:
+        raise ShardError('The shards were run with different datasets or sizes')
+
+    totals = {manifest['total'] for manifest in manifests.values()}
+    positions = sorted(itertools.chain.from_iterable(manifest['positions'] for manifest in manifests.values()))
+
+    if len(totals) > 1 or positions != list(range(totals.pop())):
+        raise ShardError('The shards do not cover each dataset once')
+
+    return [shard_paths(index, count, directory) for index in range(1, count + 1)]
+
+
+def _iter_moles_tags(path):
+    with open(path) as reader:
+        for line in reader:
+            position, row = line.split(',', 1)
+            yield int(position), row
+
+
+def _iter_drs(path):
+    with open(path) as reader:
+        for line in reader:
+            drs, position, files = json.loads(line)
+            yield drs, position, files
+
+
+def _drs_entry(drs, files):
+    """
+    One DRS of esgf_drs.json, formatted as it is by json.dumps with indent=4
+    """
+    value = json.dumps(files, sort_keys=True, indent=4, separators=JSON_SEPARATORS)
+    return f'    {json.dumps(drs)}: ' + value.replace('\n', '\n    ')
+
+
+def merge_shards(directory='.', output_directory='.'):
+    """
+    Merge the shard outputs into moles_tags.csv and esgf_drs.json. Only one
+    line or DRS from each shard is held in memory at a time.
+
+    :param directory: Directory holding the shard outputs
+    :param output_directory: Directory for the merged files
+    :return: Number of shards merged
+    """
+    shards = find_shards(directory)
+
+    # The lines for each dataset are together in one shard, in the order
+    # they were written
+    with open(os.path.join(output_directory, MOLES_TAGS_FILE), 'w') as writer:
+        lines = heapq.merge(*[_iter_moles_tags(shard['moles_tags']) for shard in shards], key=lambda item: item[0])
+
+        for _, row in lines:
+            writer.write(row)
+
+    # A DRS from more than one dataset takes the files from the last
+    # dataset, as in a single run
+    with open(os.path.join(output_directory, ESGF_DRS_FILE), 'w') as writer:
+        entries = heapq.merge(*[_iter_drs(shard['esgf_drs']) for shard in shards], key=lambda item: item[:2])
+
+        first = True
+        for drs, group in itertools.groupby(entries, key=lambda item: item[0]):
+            *_, (_, _, files) = group
+
+            writer.write('{\n' if first else ',\n')
+            writer.write(_drs_entry(drs, files))
+            first = False
+
+        writer.write('{}' if first else '\n}')
+
+    logger.info(f'Merged {len(shards)} shards')
+
+    return len(shards)
@@ -33,10 +33,20 @@ import json
 
 from cci_tagger.conf.constants import ALLOWED_GLOBAL_ATTRS, SINGLE_VALUE_FACETS
 from cci_tagger.facets import Facets
-from cci_tagger.conf.settings import ESGF_DRS_FILE, MOLES_TAGS_FILE
-from cci_tagger_json import DatasetJSONMappings
+from cci_tagger.conf.settings import ESGF_DRS_FILE, MOLES_TAGS_FILE, DATASET_CACHE_SIZE, ASYNC_CONCURRENCY, \
+    PIPELINE_QUEUE_SIZE
 from cci_tagger.dataset.dataset import Dataset
+from cci_tagger.utils.perf import NullRecorder
+from cci_tagger.utils.trace import NullTracer
+from cci_tagger.utils.metrics import NullMetrics
+from cci_tagger.triple_store import TripleStore
 from cci_tagger.utils import TaggedDataset
+from cci_tagger.utils.snippets import CacheInfo
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque, OrderedDict
+import os
+import pathlib
+import threading
 import logging
 import verboselogs
 import json
@@ -103,7 +113,12 @@ class ProcessDatasets(object):
     __moles_facets = SINGLE_VALUE_FACETS + ALLOWED_GLOBAL_ATTRS
 
     def __init__(self, suppress_file_output=False,
-                 json_files=None, facet_json=None, **kwargs):
+                 json_files=None, facet_json=None, header_cache=None,
+                 attribute_index=None, columnar=False,
+                 dataset_cache_size=DATASET_CACHE_SIZE,
+                 async_concurrency=ASYNC_CONCURRENCY, pipeline_workers=None,
+                 pipeline_queue_size=PIPELINE_QUEUE_SIZE, perf=None, tracer=None,
+                 profiler=None, metrics=None, memory=None, shard=None, **kwargs):
         """
         Initialise the ProcessDatasets class.
 
@@ -111,24 +126,157 @@ class ProcessDatasets(object):
         @param use_mapping (boolean): if True use the local mapping to correct
                 use values to match those in the vocab server
         @param verbose (int): increase output verbosity
+        @param header_cache (str): path to an SQLite file used to cache the
+                labels extracted from netCDF headers between runs
+        @param attribute_index (str): path to an NDJSON or SQLite index of
+                global attributes. Files in the index are not opened
+        @param columnar (boolean): hold the tags for each file as integer
+                codes while processing a dataset. Reduces memory use for
+                datasets with a large number of files
+        @param dataset_cache_size (int): number of Dataset objects kept for
+                tagging individual files
+        @param async_concurrency (int): number of files tagged at once by
+                aget_file_tags and aget_files_tags
+        @param pipeline_workers (int | dict): process each dataset as a
+                pipeline of stages. The number of threads reading file
+                metadata or the number of threads for each stage
+        @param pipeline_queue_size (int): number of files waiting between
+                pipeline stages
+        @param perf (PerfRecorder): records the time taken by each stage of
+                the run, from loading the vocab to writing the output
+        @param tracer (Tracer): records a span for each dataset and spans
+                for opening, reading, resolving and the DRS of each file
+        @param profiler (DatasetProfiler): profiles the processing of each
+                dataset in process_datasets
+        @param metrics (Metrics): live counts of the files discovered and
+                tagged, cache hits, vocab queries and terms not found
+        @param memory (DatasetMemoryReporter): snapshots the allocations
+                before and after each dataset in process_datasets
+        @param shard (ShardWriter): write the output for one shard of the
+                datasets to the shard files, to be merged with merge_shards
 
         """
         self.logger = logging.getLogger(__name__)
         self.__suppress_fo = suppress_file_output
 
-        if facet_json:
-            with open(facet_json, 'r') as reader:
-                self.__facets = Facets.from_json(json.load(reader))
-                print(self.__facets)
-        else:
-            self.__facets = Facets()
+        self.perf = perf or NullRecorder()
+        self.tracer = tracer or NullTracer()
+        self.profiler = profiler
+        self.memory = memory
+
+        self.metrics = metrics or NullMetrics()
+        if metrics is not None:
+            metrics.add_collector(self._collect_vocab_metrics)
+
+        self.__facet_json = facet_json
+        self.__facets = self._load_facets(facet_json, self.perf)
 
         self.__file_drs = None
         self.__file_csv = None
+        self.__shard = shard
         self._open_files()
         self.__not_found_messages = set()
         self.__error_messages = set()
-        self.__dataset_json_values = DatasetJSONMappings(json_files)
+        self.__json_files = json_files
+        self.__dataset_json_values = self._load_mappings(json_files)
+        self.__header_cache = None
+        self.__attribute_index = None
+
+        # The modules for these options are only imported when they are used
+        if header_cache:
+            from cci_tagger.file_handlers.header_cache import HeaderCache
+            self.__header_cache = HeaderCache(header_cache)
+
+        if attribute_index:
+            from cci_tagger.file_handlers.attribute_index import AttributeIndex
+            self.__attribute_index = AttributeIndex(attribute_index)
+        self.__columnar = columnar
+        self.__pipeline_workers = pipeline_workers
+        self.__pipeline_queue_size = pipeline_queue_size
+
+        # URI bitsets for each facet of each dataset processed
+        self.__dataset_bitsets = {}
+
+        # Dataset id for each directory and the most recently used Dataset
+        # objects. Used when tagging individual files
+        self.__cache_lock = threading.RLock()
+        self.__dataset_cache_size = dataset_cache_size
+        self.__dataset_ids = {}
+        self.__datasets = OrderedDict()
+        self.__cache_stats = {
+            'dataset_ids': {'hits': 0, 'misses': 0},
+            'datasets': {'hits': 0, 'misses': 0}
+        }
+
+        # Statistics for the caches of the datasets processed, and the
+        # dataset being processed. Read by the metrics collector so the
+        # counts move while a dataset is processed
+        self.__dataset_cache_stats = {}
+        self.__processing = None
+        if metrics is not None:
+            metrics.add_collector(self._collect_cache_metrics)
+
+        # Executor and concurrency limit for the asyncio API. Created when
+        # first used
+        self.__async_concurrency = async_concurrency
+        self.__executor = None
+        self.__semaphore = None
+
+    @staticmethod
+    def _load_mappings(json_files=None):
+        """
+        Load the JSON mappings. cci_tagger_json is imported here rather than
+        when this module is imported
+
+        :param json_files: JSON files to use instead of the packaged mappings
+        :return: DatasetJSONMappings
+        """
+        from cci_tagger_json import DatasetJSONMappings
+
+        return DatasetJSONMappings(json_files)
+
+    @staticmethod
+    def _load_facets(facet_json=None, perf=None):
+        """
+        Load the vocabulary from a facet JSON dump or the vocab server
+
+        :param facet_json: Path to the output of export_facet_json
+        :param perf: PerfRecorder
+        :return: Facets
+        """
+        perf = perf or NullRecorder()
+
+        with perf.timer('vocab_load'):
+            if facet_json:
+                with open(facet_json, 'r') as reader:
+                    facets = Facets.from_json(json.load(reader), perf=perf)
+            else:
+                facets = Facets(perf=perf)
+
+        return facets
+
+    @staticmethod
+    def _collect_vocab_metrics():
+        return {
+            'vocab_queries_total': TripleStore.query_count,
+            'vocab_documents_total': TripleStore.document_count
+        }
+
+    def _collect_cache_metrics(self):
+        with self.__cache_lock:
+            stats = {cache: dict(counts) for cache, counts in self.__dataset_cache_stats.items()}
+            processing = self.__processing
+
+        if processing is not None:
+            for cache, info in processing.cache_info().items():
+                counts = stats.setdefault(cache, {'hits': 0, 'misses': 0})
+                counts['hits'] += info.hits
+                counts['misses'] += info.misses
+
+        return {
+            'cache_hits_total': [({'cache': cache}, counts['hits']) for cache, counts in stats.items()],
+            'cache_misses_total': [({'cache': cache}, counts['misses']) for cache, counts in stats.items()]
+        }
 
     def _check_property_value(self, value, labels, facet, defaults_source):
         if value not in labels:
@@ -147,7 +295,119 @@ class ProcessDatasets(object):
         """
 
         dataset_id = self.__dataset_json_values.get_dataset(dspath)
-        return Dataset(dataset_id, self.__dataset_json_values, self.__facets)
+        return self._new_dataset(dataset_id)
+
+    def _new_dataset(self, dataset_id):
+        return Dataset(dataset_id, self.__dataset_json_values, self.__facets, header_cache=self.__header_cache,
+                       attribute_index=self.__attribute_index, columnar=self.__columnar,
+                       pipeline_workers=self.__pipeline_workers,
+                       pipeline_queue_size=self.__pipeline_queue_size, perf=self.perf,
+                       tracer=self.tracer, metrics=self.metrics)
+
+    def _get_dataset_id(self, fpath):
+        """
+        Get the dataset id for a file. All the files in a directory belong
+        to the same dataset so the id is only resolved once for each
+        directory.
+
+        :param fpath: Path to the file
+        :return: dataset id
+        """
+        if isinstance(fpath, pathlib.PurePath):
+            fpath = fpath.as_posix()
+
+        directory = os.path.dirname(fpath)
+
+        with self.__cache_lock:
+            stats = self.__cache_stats['dataset_ids']
+
+            if directory in self.__dataset_ids:
+                stats['hits'] += 1
+                return self.__dataset_ids[directory]
+
+            stats['misses'] += 1
+            dataset_id = self.__dataset_ids[directory] = self.__dataset_json_values.get_dataset(fpath)
+
+        return dataset_id
+
+    def get_file_dataset(self, fpath):
+        """
+        Get the Dataset for a file. The most recently used Dataset objects
+        are kept, so a stream of files does not rebuild the dataset for
+        every file. Use get_dataset to process a whole dataset.
+
+        :param fpath: Path to the file
+        :return: Dataset
+        """
+        dataset_id = self._get_dataset_id(fpath)
+
+        with self.__cache_lock:
+            stats = self.__cache_stats['datasets']
+            dataset = self.__datasets.get(dataset_id)
+
+            if dataset is not None:
+                stats['hits'] += 1
+                self.__datasets.move_to_end(dataset_id)
+                return dataset
+
+            stats['misses'] += 1
+            dataset = self.__datasets[dataset_id] = self._new_dataset(dataset_id)
+
+            while len(self.__datasets) > self.__dataset_cache_size:
+                self.__datasets.popitem(last=False)
+
+        return dataset
+
+    def cache_info(self):
+        """
+        Statistics for the dataset id and Dataset caches
+
+        :return: {cache name: CacheInfo}
+        """
+        with self.__cache_lock:
+            return {
+                'dataset_ids': CacheInfo(size=len(self.__dataset_ids), **self.__cache_stats['dataset_ids']),
+                'datasets': CacheInfo(size=len(self.__datasets), **self.__cache_stats['datasets'])
+            }
+
+    def clear_caches(self):
+        """
+        Clear the dataset id and Dataset caches. The statistics are kept.
+        """
+        with self.__cache_lock:
+            self.__dataset_ids.clear()
+            self.__datasets.clear()
+
+    def reload_mappings(self, json_files=None):
+        """
+        Reload the JSON mapping files and clear the caches built from them
+
+        :param json_files: JSON files to load. Defaults to the files given
+        when the class was created
+        """
+        if json_files is not None:
+            self.__json_files = json_files
+
+        with self.__cache_lock:
+            self.__dataset_json_values = self._load_mappings(self.__json_files)
+            self.clear_caches()
+
+    def reload_vocab(self, facet_json=None):
+        """
+        Reload the vocabulary and clear the Dataset objects built with the
+        old one
+
+        :param facet_json: Facet JSON dump to load. Defaults to the file
+        given when the class was created, or the vocab server
+        """
+        if facet_json is not None:
+            self.__facet_json = facet_json
+
+        facets = self._load_facets(self.__facet_json, self.perf)
+
+        with self.__cache_lock:
+            self.__facets = facets
+            self.clear_caches()
 
     def process_datasets(self, datasets, max_file_count=0):
         """
@@ -170,25 +430,97 @@ class ProcessDatasets(object):
         terms_not_found = set()
 
         for dspath in sorted(datasets):
+            if self.memory is not None:
+                with self.memory.measure(dspath):
+                    self._process_dataset(dspath, max_file_count, dataset_file_mapping, terms_not_found)
+            else:
+                self._process_dataset(dspath, max_file_count, dataset_file_mapping, terms_not_found)
 
-            dataset = self.get_dataset(dspath)
+        with self.perf.timer('write_json'):
+            self._write_json(dataset_file_mapping)
 
-            dataset_uris, ds_file_map = dataset.process_dataset(max_file_count)
+        if len(terms_not_found) > 0:
+            print("\nSUMMARY OF TERMS NOT IN THE VOCAB:\n")
+            for message in sorted(terms_not_found):
+                print(message)
 
+        self._close_files()
+        self._flush_header_cache()
+
+    def _process_dataset(self, dspath, max_file_count, dataset_file_mapping, terms_not_found):
+        """
+        Process one dataset and write its moles tags
+
+        @param dspath (str): the full path to the dataset
+        @param max_file_count (int): how many .nc files to look at
+        @param dataset_file_mapping (dict): DRS for each file, updated with
+                the files in the dataset
+        @param terms_not_found (set): updated with the terms from the
+                dataset which are not in the vocab
+
+        """
+        dataset = self.get_dataset(dspath)
+
+        if self.__shard is not None:
+            self.__shard.start_dataset(dspath)
+
+        with self.__cache_lock:
+            self.__processing = dataset
+
+        with self.perf.timer('dataset', dataset.id), self.tracer.span('dataset', dataset.id):
+            if self.profiler is not None:
+                with self.profiler.profile(dataset.id):
+                    dataset_uris, ds_file_map = dataset.process_dataset(max_file_count)
+            else:
+                dataset_uris, ds_file_map = dataset.process_dataset(max_file_count)
+
+        self.__dataset_bitsets[dataset.id] = dataset.dataset_bitsets
+
+        with self.perf.timer('write_moles_tags', dataset.id):
             self._write_moles_tags(dataset.id, dataset_uris)
 
-            dataset_file_mapping.update(ds_file_map)
+        self.metrics.inc('datasets_processed_total')
 
-            terms_not_found.update(dataset.not_found_messages)
+        with self.__cache_lock:
+            for cache, info in dataset.cache_info().items():
+                counts = self.__dataset_cache_stats.setdefault(cache, {'hits': 0, 'misses': 0})
+                counts['hits'] += info.hits
+                counts['misses'] += info.misses
 
-        self._write_json(dataset_file_mapping)
+            self.__processing = None
 
-        if len(terms_not_found) > 0:
-            print("\nSUMMARY OF TERMS NOT IN THE VOCAB:\n")
-            for message in sorted(terms_not_found):
-                print(message)
+        dataset_file_mapping.update(ds_file_map)
 
-        self._close_files()
+        if self.__shard is not None:
+            self.__shard.add_file_map(ds_file_map)
+
+        terms_not_found.update(dataset.not_found_messages)
+
+    def get_datasets_with_uri(self, uri, facet=None):
+        """
+        Find the processed datasets which use a vocabulary term e.g. which
+        datasets use a sensor
+
+        :param uri: URI of the term
+        :param facet: Only check this facet
+        :return: dataset ids (list)
+        """
+        uri_id = self.__facets.get_uri_id(uri)
+
+        if uri_id is None:
+            return []
+
+        mask = 1 << uri_id
+        datasets = []
+
+        for dataset_id, bitsets in self.__dataset_bitsets.items():
+            if facet is not None:
+                bitsets = {facet: bitsets.get(facet, 0)}
+
+            if any(bits & mask for bits in bitsets.values()):
+                datasets.append(dataset_id)
+
+        return datasets
 
     def get_file_tags(self, fpath):
         """
@@ -199,22 +531,190 @@ class ProcessDatasets(object):
         """
 
         # Get the dataset
-        dataset = self.get_dataset(fpath)
+        dataset = self.get_file_dataset(fpath)
 
-        # Get the URIs for the datset
-        uris = dataset.get_file_tags(filepath=fpath)
+        # Read the file before taking the lock as it does not change the dataset
+        file_tags = dataset.read_file_tags(filepath=fpath)
 
-        # Turn uris into human readable tags
-        tags = self.__facets.process_bag(uris)
+        with dataset.lock:
+            # Get the URIs for the datset
+            uris = dataset.resolve_file_tags(*file_tags)
 
-        # Get DRS labels
-        drs_facets = dataset.get_drs_labels(tags)
-
-        # Generate DRS id
-        drs = dataset.generate_ds_id(drs_facets, fpath)
+            # Turn uris into human readable tags and generate DRS id
+            tags, drs = dataset.get_drs(uris, fpath)
 
         return TaggedDataset(drs, tags, uris)
 
+    def get_files_tags(self, fpaths, workers=0):
+        """
+        Batch version of get_file_tags. Paths which resolve to the same
+        dataset share a Dataset, so the defaults, mappings and overrides
+        are only read once.
+
+        Files can be read with a pool of worker threads. The terms are
+        always resolved to URIs in the calling thread, in the order the
+        paths were given.
+
+        A file which cannot be read is logged as an error and given an
+        empty TaggedDataset, with and without workers, and the rest of the
+        files are still tagged.
+        USED BY THE FACET SCANNER FOR THE CCI PROJECT
+
+        :param fpaths: Iterable of paths to scan
+        :param workers: Number of threads used to read the files. 0 reads
+        the files in the calling thread
+        :return: generator of (path, TaggedDataset)
+        """
+        paths = ((fpath, self.get_file_dataset(fpath)) for fpath in fpaths)
+
+        if workers > 0:
+            results = self._read_files_in_pool(paths, workers)
+        else:
+            results = ((fpath, dataset, self._read_file_tags(fpath, dataset)) for fpath, dataset in paths)
+
+        for fpath, dataset, file_tags in results:
+            if file_tags is None:
+                yield fpath, TaggedDataset(None, {}, {})
+                continue
+
+            with dataset.lock:
+                uris = dataset.resolve_file_tags(*file_tags)
+                tags, drs = dataset.get_drs(uris, fpath)
+
+            yield fpath, TaggedDataset(drs, tags, uris)
+
+    def _get_executor(self):
+        with self.__cache_lock:
+            if self.__executor is None:
+                self.__executor = ThreadPoolExecutor(
+                    max_workers=self.__async_concurrency,
+                    thread_name_prefix='cci_tagger'
+                )
+
+        return self.__executor
+
+    def _get_semaphore(self):
+        import asyncio
+
+        # Semaphores belong to an event loop
+        loop = asyncio.get_running_loop()
+
+        if self.__semaphore is None or self.__semaphore[0] is not loop:
+            self.__semaphore = (loop, asyncio.Semaphore(self.__async_concurrency))
+
+        return self.__semaphore[1]
+
+    async def aget_file_tags(self, fpath):
+        """
+        Asyncio version of get_file_tags. The file is tagged in a thread so
+        the event loop is not blocked, and the number of files tagged at
+        once is limited to async_concurrency. Uses the same caches as
+        get_file_tags.
+
+        :param fpath: Path the file to scan
+        :return: TaggedDataset
+        """
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+
+        async with self._get_semaphore():
+            return await loop.run_in_executor(self._get_executor(), self.get_file_tags, fpath)
+
+    async def aget_files_tags(self, fpaths):
+        """
+        Asyncio version of get_files_tags. Files are tagged concurrently and
+        the results are yielded in the order the paths were given.
+
+        :param fpaths: Iterable or async iterable of paths to scan
+        :return: async generator of (path, TaggedDataset)
+        """
+        import asyncio
+
+        pending = deque()
+
+        async def iter_paths():
+            if hasattr(fpaths, '__aiter__'):
+                async for fpath in fpaths:
+                    yield fpath
+            else:
+                for fpath in fpaths:
+                    yield fpath
+
+        try:
+            async for fpath in iter_paths():
+                pending.append((fpath, asyncio.ensure_future(self.aget_file_tags(fpath))))
+
+                # Keep enough files in flight to fill the executor
+                if len(pending) >= self.__async_concurrency * 2:
+                    fpath, task = pending.popleft()
+                    yield fpath, await task
+
+            while pending:
+                fpath, task = pending.popleft()
+                yield fpath, await task
+
+        finally:
+            # Cancel the remaining files if the caller stops early
+            for _, task in pending:
+                task.cancel()
+
+    def shutdown(self):
+        """
+        Stop the threads used by the asyncio API, write any labels held by
+        the header cache and close the attribute index. Call when finished
+        with the tagger.
+        """
+        with self.__cache_lock:
+            if self.__executor is not None:
+                self.__executor.shutdown(wait=True)
+                self.__executor = None
+
+        self._flush_header_cache()
+
+        if self.__attribute_index is not None:
+            self.__attribute_index.close()
+
+    def _flush_header_cache(self):
+        if self.__header_cache is not None:
+            self.__header_cache.flush()
+
+    def _read_file_tags(self, fpath, dataset):
+        """
+        Read the terms for a file, logging any error
+
+        :param fpath: Path to the file
+        :param dataset: Dataset for the file
+        :return: result of read_file_tags | None if the file could not be read
+        """
+        try:
+            return dataset.read_file_tags(filepath=fpath)
+        except Exception as e:
+            self.logger.error(f'Read error. Could not tag file: {fpath} with error: {e}')
+
+    def _read_files_in_pool(self, paths, workers):
+        """
+        Read the files with a pool of threads, keeping a limited number of
+        files in flight so that the paths can be a long running generator.
+
+        :param paths: Iterable of (path, Dataset)
+        :param workers: Number of threads
+        :return: generator of (path, Dataset, result of _read_file_tags)
+        """
+        pending = deque()
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for fpath, dataset in paths:
+                pending.append((fpath, dataset, executor.submit(self._read_file_tags, fpath, dataset)))
+
+                if len(pending) >= workers * 4:
+                    fpath, dataset, future = pending.popleft()
+                    yield fpath, dataset, future.result()
+
+            while pending:
+                fpath, dataset, future = pending.popleft()
+                yield fpath, dataset, future.result()
+
     def _write_moles_tags(self, ds, uris):
         """
 
@@ -231,6 +731,9 @@ class ProcessDatasets(object):
 
         if self.__suppress_fo:
             return
+        elif self.__shard is not None:
+            for uri in uris:
+                self.__shard.write_moles_tag(ds, uri)
         else:
             for uri in uris:
                 self.__file_csv.write(f'{ds},{uri}\n')
@@ -239,6 +742,10 @@ class ProcessDatasets(object):
         if self.__suppress_fo:
             return
 
+        if self.__shard is not None:
+            self.__shard.write_drs(drs)
+            return
+
         self.__file_drs.write(
             json.dumps(drs, sort_keys=True, indent=4, separators=(',', ': ')))
 
@@ -247,6 +754,10 @@ class ProcessDatasets(object):
         if self.__suppress_fo:
             return
 
+        if self.__shard is not None:
+            self.__shard.open()
+            return
+
         self.__file_csv = open(MOLES_TAGS_FILE, 'w')
 
         self.__file_drs = open(ESGF_DRS_FILE, 'w')
@@ -255,6 +766,10 @@ class ProcessDatasets(object):
         if self.__suppress_fo:
             return
 
+        if self.__shard is not None:
+            self.__shard.close()
+            return
+
         self.__file_csv.close()
 
         self.__file_drs.close()
@@ -0,0 +1,80 @@
+# encoding: utf-8
+"""
+Synthetic archive shared by the tests of a class
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+import json
+import pathlib
+import tempfile
+
+from cci_tagger.benchmarks import synthetic
+from cci_tagger.dataset.dataset import Dataset
+from cci_tagger.facets import Facets
+from cci_tagger.tagger import ProcessDatasets
+
+
+class SyntheticArchiveTestCase(object):
+    """
+    Mixin which builds a synthetic archive once for a TestCase class
+
+        class TestTagger(SyntheticArchiveTestCase, unittest.TestCase):
+            files = 30
+            datasets = 3
+
+    manifest is the manifest from generate_archive and dataset_paths holds
+    the paths of the files in each dataset (str), in the order they are
+    found.
+    """
+
+    # Size of the archive
+    files = 10
+    datasets = 1
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.manifest = synthetic.generate_archive(cls.tmpdir.name, files=cls.files, datasets=cls.datasets)
+
+        cls.dataset_paths = {
+            dataset: [path.as_posix() for path in Dataset.iter_files(pathlib.Path(dataset))]
+            for dataset in cls.manifest['datasets']
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+        super().tearDownClass()
+
+    @classmethod
+    def all_paths(cls):
+        """
+        :return: The paths of the files in every dataset (list)
+        """
+        return [path for dataset in cls.manifest['datasets'] for path in cls.dataset_paths[dataset]]
+
+    @classmethod
+    def load_facets(cls):
+        with open(cls.manifest['vocab']) as reader:
+            return Facets.from_json(json.load(reader))
+
+    @classmethod
+    def load_mappings(cls):
+        # Imported here as cci_tagger_json is slow to import
+        from cci_tagger_json import DatasetJSONMappings
+
+        return DatasetJSONMappings(cls.manifest['json_files'])
+
+    def new_tagger(self, tagger_class=ProcessDatasets, **kwargs):
+        """
+        ProcessDatasets for the archive, which does not write output files
+        """
+        kwargs.setdefault('suppress_file_output', True)
+
+        return tagger_class(json_files=self.manifest['json_files'], facet_json=self.manifest['vocab'], **kwargs)
@@ -0,0 +1,111 @@
+# encoding: utf-8
+"""
+Tests for the columnar tag table
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+import json
+import unittest
+
+from cci_tagger.conf.constants import EXCLUDE_REALISATION
+from cci_tagger.dataset.columnar import TagTable
+from cci_tagger.dataset.dataset import Dataset
+from cci_tagger.tests.archive import SyntheticArchiveTestCase
+
+
+class TestTagTable(unittest.TestCase):
+
+    def setUp(self):
+        self.table = TagTable(facets=['platform', 'sensor'])
+
+        self.envisat = self.table.add_bag('a', {'platform': {'uri:envisat'}}, {'platform': 'ENVISAT', 'sensor': 'AATSR'})
+        self.ers = self.table.add_bag('b', {'platform': {'uri:ers-2'}}, {'platform': 'ERS-2', 'sensor': []})
+
+    def get_key(self, row):
+        if row['realisation'] is None:
+            return 'UNKNOWN'
+        return '.'.join([row['platform'], row['sensor'], row['realisation']])
+
+    def test_missing_facets(self):
+        self.assertEqual(self.table.get_bag('b'), self.ers)
+        self.assertEqual(self.table.missing_facets(self.envisat), [])
+        self.assertEqual(self.table.missing_facets(self.ers), ['sensor'])
+
+    def test_group_files(self):
+        self.table.add('/1', self.ers)
+        self.table.add('/2', self.envisat, 'r1')
+        self.table.add('/3', self.envisat, 'r2')
+        self.table.add('/4', self.ers)
+        self.table.add('/5', self.envisat, 'r1')
+
+        groups = self.table.group_files(self.get_key)
+
+        self.assertEqual(list(groups.items()), [
+            ('UNKNOWN', ['/1', '/4']),
+            ('ENVISAT.AATSR.r1', ['/2', '/5']),
+            ('ENVISAT.AATSR.r2', ['/3']),
+        ])
+
+    def test_bags(self):
+        self.table.add('/1', self.envisat, 'r1')
+        self.assertEqual(list(self.table.iter_bags()), [{'platform': {'uri:envisat'}}])
+        self.assertEqual(self.table.group_files(self.get_key), {'ENVISAT.AATSR.r1': ['/1']})
+        self.assertEqual(TagTable().group_files(self.get_key), {})
+
+
+class TestColumnarDataset(SyntheticArchiveTestCase, unittest.TestCase):
+    """
+    Columnar mode gives the same results as tagging file by file
+    """
+
+    files = 40
+    datasets = 4
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        # Filters which exclude some files from the DRS and give others a
+        # different realisation
+        dataset, json_file = cls.manifest['datasets'][0], cls.manifest['json_files'][0]
+
+        with open(json_file) as reader:
+            mapping = json.load(reader)
+
+        mapping['filters'] = {dataset: [
+            {'pattern': '.*0102[-.].*', 'realisation': EXCLUDE_REALISATION},
+            {'pattern': '.*0103[-.].*', 'realisation': 'r2'}
+        ]}
+
+        with open(json_file, 'w') as writer:
+            json.dump(mapping, writer)
+
+        cls.facets = cls.load_facets()
+        cls.mappings = cls.load_mappings()
+
+    def process(self, dataset, **kwargs):
+        return Dataset(dataset, self.mappings, self.facets, **kwargs).process_dataset()
+
+    def test_same_as_file_by_file(self):
+        for dataset in self.manifest['datasets']:
+            with self.subTest(dataset=dataset):
+                uris, file_map = self.process(dataset)
+                columnar_uris, columnar_file_map = self.process(dataset, columnar=True)
+
+                self.assertEqual(columnar_uris, uris)
+                self.assertEqual(list(columnar_file_map.items()), list(file_map.items()))
+
+    def test_filters(self):
+        _, file_map = self.process(self.manifest['datasets'][0], columnar=True)
+
+        realisations = {ds_id.rsplit('.', 1)[-1] for ds_id in file_map if not ds_id.startswith('UNKNOWN')}
+        self.assertEqual(realisations, {'r1', 'r2'})
+        self.assertTrue(any(ds_id.startswith('UNKNOWN_DRS') for ds_id in file_map))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+# encoding: utf-8
+"""
+Tests for the stream mode of the command line client
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+from argparse import Namespace
+import contextlib
+import io
+import json
+import unittest
+
+from cci_tagger.scripts.command_line_client import CCITaggerCommandLineClient
+from cci_tagger.tests.archive import SyntheticArchiveTestCase
+from cci_tagger.triple_store import TripleStore
+from cci_tagger.utils.snippets import tagged_dataset_as_dict
+from cci_tagger.vocab_transport import ReplayTransport
+
+
+class TestStream(SyntheticArchiveTestCase, unittest.TestCase):
+
+    files = 20
+    datasets = 2
+
+    def setUp(self):
+        # Stream mode loads the vocab from the vocab server
+        self.previous = TripleStore.set_transport(ReplayTransport(self.manifest['vocab_fixture']))
+
+        first, second = self.manifest['datasets']
+        paths = self.dataset_paths[second]
+
+        # A dataset directory, which is walked, and files from another dataset
+        self.stdin = io.StringIO('\n'.join([
+            '# Tag the first dataset',
+            first,
+            '',
+            '   ',
+            '# Then some files',
+            *paths[:3],
+            '  # indented comment',
+            f'  {paths[3]}  ',
+        ]) + '\n')
+
+        self.expected = self.dataset_paths[first] + paths[:4]
+
+    def tearDown(self):
+        TripleStore.set_transport(self.previous)
+
+    def stream(self, workers):
+        args = Namespace(json_file=self.manifest['json_files'], header_cache=None, attribute_index=None,
+                         workers=workers)
+        stdout = io.StringIO()
+
+        CCITaggerCommandLineClient.stream(args, stdin=self.stdin, stdout=stdout)
+
+        return stdout.getvalue()
+
+    def test_iter_stream_paths(self):
+        paths = CCITaggerCommandLineClient.iter_stream_paths(self.stdin)
+        self.assertEqual([str(path) for path in paths], self.expected)
+
+    def test_stream(self):
+        pds = self.new_tagger()
+
+        for workers in (0, 2):
+            with self.subTest(workers=workers):
+                self.stdin.seek(0)
+                output = self.stream(workers)
+
+                # Nothing but the records, one line for each file
+                self.assertTrue(output.endswith('\n'))
+                lines = output.splitlines()
+                self.assertEqual(len(lines), len(self.expected))
+
+                for line, path in zip(lines, self.expected):
+                    self.assertEqual(json.loads(line), tagged_dataset_as_dict(path, pds.get_file_tags(path)))
+
+
+class TestParseArgs(unittest.TestCase):
+
+    def test_stream_options(self):
+        args = CCITaggerCommandLineClient.parse_args(['--stream', '-j', 'mappings.json', '--workers', '4'])
+        self.assertEqual(args.workers, 4)
+
+        rejected = [
+            ['--file_count', '5'], ['--columnar'], ['--pipeline-workers', '2'], ['--perf-report'],
+            ['--trace', 'trace.json'], ['--profile', 'profiles'], ['--memory-report'],
+            ['--metrics-file', 'metrics.prom'], ['--progress'], ['--shard', '1/2'], ['--shard-dir', 'shards']
+        ]
+
+        for option in rejected:
+            with self.subTest(option=option[0]):
+                with self.assertRaises(SystemExit) as cm, contextlib.redirect_stderr(io.StringIO()) as stderr:
+                    CCITaggerCommandLineClient.parse_args(['--stream'] + option)
+
+                self.assertEqual(cm.exception.code, 2)
+                self.assertIn(f'argument {option[0]}: not allowed with argument --stream', stderr.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
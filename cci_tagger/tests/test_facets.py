@@ -0,0 +1,168 @@
+# encoding: utf-8
+"""
+Tests for the URI ids and bitsets held by Facets
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+import pathlib
+import pickle
+import unittest
+
+from cci_tagger.conf.constants import PLATFORM, PRODUCT_VERSION
+from cci_tagger.dataset.dataset import Dataset
+from cci_tagger.facets import Facets
+from cci_tagger.tests.archive import SyntheticArchiveTestCase
+
+VOCAB = {
+    '__facets': {
+        'sensor': {'aatsr': 'http://vocab/sensor/aatsr', 'atsr-2': 'http://vocab/sensor/atsr-2'},
+        'platform': {'envisat': 'http://vocab/platform/envisat'},
+    },
+    '__platform_programme_mappings': {},
+    '__programme_group_mappings': {},
+    '__proc_level_mappings': {},
+    '__reversible_facets': {
+        'sensor': {'http://vocab/sensor/atsr-2': 'atsr-2', 'http://vocab/sensor/aatsr': 'aatsr'},
+        'platform': {'http://vocab/platform/envisat': 'envisat'},
+    }
+}
+
+
+class TestFacetBitsets(unittest.TestCase):
+
+    def setUp(self):
+        self.facets = Facets.from_json(VOCAB)
+
+    def test_vocab_ids_are_deterministic(self):
+        other = Facets.from_json(VOCAB)
+        other.intern_uri('1.0')
+
+        for uri in ('http://vocab/sensor/aatsr', 'http://vocab/sensor/atsr-2', 'http://vocab/platform/envisat'):
+            self.assertEqual(self.facets.get_uri_id(uri), other.get_uri_id(uri))
+
+        self.assertIsNone(self.facets.get_uri_id('1.0'))
+
+    def test_round_trip(self):
+        uris = {'http://vocab/sensor/aatsr', 'http://other/term'}
+        bits = self.facets.encode_uris(uris)
+
+        self.assertEqual(self.facets.decode_uris(bits), uris)
+        self.assertEqual(self.facets.decode_uris(0), set())
+
+        merged = bits | self.facets.encode_uris(['http://vocab/sensor/atsr-2'])
+        self.assertEqual(len(self.facets.decode_uris(merged)), 3)
+
+    def test_pickle(self):
+        copy = pickle.loads(pickle.dumps(self.facets))
+        self.assertEqual(copy.get_uri_id('http://vocab/sensor/aatsr'), self.facets.get_uri_id('http://vocab/sensor/aatsr'))
+        copy.intern_uri('http://other/term')
+
+    def test_remap(self):
+        # Workers see the URIs outside the vocab in different orders
+        worker_a = pickle.loads(pickle.dumps(self.facets))
+        worker_b = pickle.loads(pickle.dumps(self.facets))
+        worker_a.intern_uri('1.0')
+        worker_b.intern_uri('2.0')
+
+        uris_a = {'1.0', 'http://vocab/sensor/aatsr'}
+        uris_b = {'2.0', 'http://vocab/sensor/atsr-2'}
+        bits_a = worker_a.encode_uris(uris_a)
+        bits_b = worker_b.encode_uris(uris_b)
+
+        # The same id stands for different URIs
+        self.assertEqual(worker_a.decode_uris(bits_b), {'1.0', 'http://vocab/sensor/atsr-2'})
+
+        merged = self.facets.remap_uris(bits_a, worker_a.get_uri_table(bits_a))
+        merged |= self.facets.remap_uris(bits_b, worker_b.get_uri_table(bits_b))
+
+        self.assertEqual(self.facets.decode_uris(merged), uris_a | uris_b)
+        self.assertEqual(worker_a.get_uri_table(0), {})
+
+
+class TestDatasetBitsets(SyntheticArchiveTestCase, unittest.TestCase):
+
+    files = 30
+    datasets = 3
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.mappings = cls.load_mappings()
+
+    def setUp(self):
+        self.facets = self.load_facets()
+
+    def process(self, dataset, facets=None):
+        dataset = Dataset(dataset, self.mappings, facets or self.facets)
+        dataset.process_dataset()
+        return dataset
+
+    def get_file_uris(self, dataset):
+        """
+        Union of the URIs for each file in the dataset
+        """
+        tagger = Dataset(dataset, self.mappings, self.facets)
+        uris = {}
+
+        for path in Dataset.iter_files(pathlib.Path(dataset)):
+            for facet, values in tagger.get_file_tags(filepath=path).items():
+                uris.setdefault(facet, set()).update(values)
+
+        return uris
+
+    def test_dataset_uris(self):
+        for dataset_id in self.manifest['datasets']:
+            dataset = self.process(dataset_id)
+
+            self.assertEqual(dataset.dataset_uris, self.get_file_uris(dataset_id))
+            self.assertIn(PRODUCT_VERSION, dataset.dataset_uris)
+
+            for facet, bits in dataset.dataset_bitsets.items():
+                self.assertIsInstance(bits, int)
+                self.assertEqual(self.facets.decode_uris(bits), dataset.dataset_uris[facet])
+
+    def test_merge_from_workers(self):
+        merged = Dataset(self.manifest['datasets'][0], self.mappings, self.facets)
+        expected = {}
+
+        for i, dataset_id in enumerate(self.manifest['datasets']):
+            # Each worker has its own copy of the Facets, which has seen other
+            # URIs outside the vocab first
+            worker_facets = pickle.loads(pickle.dumps(self.facets))
+            worker_facets.intern_uri(f'worker-{i}')
+
+            dataset = self.process(dataset_id, worker_facets)
+            merged.merge_dataset_bitsets(*dataset.export_dataset_bitsets())
+
+            for facet, uris in dataset.dataset_uris.items():
+                expected.setdefault(facet, set()).update(uris)
+
+        self.assertEqual(merged.dataset_uris, expected)
+
+    def test_get_datasets_with_uri(self):
+        pds = self.new_tagger()
+        pds.process_datasets(self.manifest['datasets'])
+
+        dataset_uris = {dataset_id: self.process(dataset_id).dataset_uris for dataset_id in self.manifest['datasets']}
+
+        for uris in dataset_uris.values():
+            for facet, values in uris.items():
+                for uri in values:
+                    expected = [dataset_id for dataset_id, other in dataset_uris.items()
+                                if any(uri in other_values for other_values in other.values())]
+                    self.assertEqual(sorted(pds.get_datasets_with_uri(uri)), sorted(expected))
+
+                    expected = [dataset_id for dataset_id, other in dataset_uris.items() if uri in other.get(facet, ())]
+                    self.assertEqual(sorted(pds.get_datasets_with_uri(uri, facet)), sorted(expected))
+
+        platform = next(iter(dataset_uris[self.manifest['datasets'][0]][PLATFORM]))
+        self.assertEqual(pds.get_datasets_with_uri(platform, PRODUCT_VERSION), [])
+        self.assertEqual(pds.get_datasets_with_uri('http://not/in/vocab'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
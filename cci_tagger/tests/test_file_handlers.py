@@ -0,0 +1,368 @@
+# encoding: utf-8
+"""
+
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+import bz2
+import gzip
+import json
+import pathlib
+import shutil
+import sqlite3
+import tarfile
+import tempfile
+import unittest
+import zipfile
+
+import h5py
+import netCDF4
+import numpy as np
+
+from cci_tagger.conf.constants import PLATFORM, SENSOR, INSTITUTION, PRODUCT_VERSION
+from cci_tagger.file_handlers.handler_factory import HandlerFactory
+from cci_tagger.file_handlers.hdf import HDF5Handler
+from cci_tagger.file_handlers.archive import ArchiveMemberHandler, ArchiveReader
+from cci_tagger.file_handlers.attribute_index import AttributeIndex, IndexHandler
+from cci_tagger.file_handlers.compressed import CompressedNetcdfHandler
+from cci_tagger.file_handlers.header_cache import HeaderCache
+from cci_tagger.file_handlers.netcdf import NetcdfHandler
+
+
+class TestHDF5Handler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.tmpdir.name, 'ESACCI-L2P-TEST.h5')
+
+        with h5py.File(self.path, 'w') as writer:
+            writer.attrs['platform'] = np.bytes_(b'ENVISAT')
+            writer.attrs['Instrument'] = 'MERIS'
+            writer.attrs['institution'] = np.array([b'ACRI-ST', b'LOCEAN'])
+            writer.attrs['product_version'] = 2.1
+
+            group = writer.create_group('data')
+            group.attrs['sensor'] = 'SHOULD NOT BE READ'
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_handler_registered(self):
+        self.assertIs(HandlerFactory.get_handler('.h5'), HDF5Handler)
+        self.assertIs(HandlerFactory.get_handler('.he5'), HDF5Handler)
+
+    def test_root_attributes(self):
+        tags = HDF5Handler(self.path).extract_facet_labels('L2P')
+
+        self.assertEqual(tags[PLATFORM], 'ENVISAT')
+        self.assertEqual(tags[INSTITUTION], ['ACRI-ST', 'LOCEAN'])
+        self.assertEqual(tags[PRODUCT_VERSION], '2.1')
+        self.assertNotIn(SENSOR, tags)
+
+    def test_attribute_map(self):
+        handler = HDF5Handler(self.path, attribute_map={'Instrument': SENSOR})
+        tags = handler.extract_facet_labels('L2P')
+
+        self.assertEqual(tags[SENSOR], 'MERIS')
+
+    def test_file_closed(self):
+        HDF5Handler(self.path).extract_facet_labels('L2P')
+
+        # File can be reopened for writing once the handler has finished
+        with h5py.File(self.path, 'a') as writer:
+            writer.attrs['sensor'] = 'MERIS'
+
+    def test_unreadable_file(self):
+        bad_path = pathlib.Path(self.tmpdir.name, 'missing.h5')
+        self.assertEqual(HDF5Handler(bad_path).extract_facet_labels('L2P'), {})
+
+
+class TestCompressedHandlers(unittest.TestCase):
+
+    NAME = 'ESACCI-L3C_TEST-SST-PRODUCT-20000101-fv1.0.nc'
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.tmpdir.name)
+
+        self.classic = self.root / self.NAME
+        with netCDF4.Dataset(self.classic, 'w', format='NETCDF3_CLASSIC') as writer:
+            writer.platform = 'ENVISAT'
+            writer.sensor = 'AATSR'
+            writer.product_version = '1.0'
+            writer.createDimension('x', 100000)
+            writer.createVariable('data', 'f8', ('x',))[:] = 1
+
+        self.netcdf4 = self.root / 'netcdf4' / self.NAME
+        self.netcdf4.parent.mkdir()
+        with netCDF4.Dataset(self.netcdf4, 'w') as writer:
+            writer.platform = 'SENTINEL-3A'
+
+        self.gzip = self.root / f'{self.NAME}.gz'
+        with open(self.classic, 'rb') as reader, gzip.open(self.gzip, 'wb') as writer:
+            shutil.copyfileobj(reader, writer)
+
+        self.bzip = self.root / f'{self.NAME}.bz2'
+        with open(self.classic, 'rb') as reader, bz2.open(self.bzip, 'wb') as writer:
+            shutil.copyfileobj(reader, writer)
+
+    def tearDown(self):
+        ArchiveReader.clear()
+        self.tmpdir.cleanup()
+
+    def test_handler_lookup(self):
+        with tarfile.open(self.root / 'a.tar', 'w') as writer:
+            writer.add(self.classic, arcname=self.NAME)
+
+        self.assertIs(HandlerFactory.get_handler_for_path(self.gzip), CompressedNetcdfHandler)
+        self.assertIs(HandlerFactory.get_handler_for_path(self.bzip), CompressedNetcdfHandler)
+        self.assertIs(HandlerFactory.get_handler_for_path(self.root / 'a.tar' / self.NAME), ArchiveMemberHandler)
+        self.assertEqual(HandlerFactory.get_handler_for_path(self.classic).__name__, 'NetcdfHandler')
+
+    def test_directory_with_archive_extension(self):
+        directory = self.root / 'v1.tar'
+        directory.mkdir()
+        path = directory / self.NAME
+        shutil.copy(self.classic, path)
+
+        self.assertEqual(HandlerFactory.split_archive_path(path), (None, None))
+        self.assertFalse(HandlerFactory.is_archive(pathlib.Path('data.nc')))
+        self.assertEqual(HandlerFactory.get_handler_for_path(path).__name__, 'NetcdfHandler')
+
+    def test_compressed_tar(self):
+        for name, mode in (('bundle.tar.gz', 'w:gz'), ('bundle.tgz', 'w:gz'), ('bundle.tar.bz2', 'w:bz2')):
+            archive = self.root / name
+            with tarfile.open(archive, mode) as writer:
+                writer.add(self.classic, arcname=self.NAME)
+
+            self.assertTrue(HandlerFactory.is_archive(archive))
+            self.assertEqual(HandlerFactory.split_archive_path(archive / self.NAME), (archive, self.NAME))
+
+            members = HandlerFactory.get_archive_members(archive)
+            self.assertEqual(members, [archive / self.NAME])
+            self.assertEqual(ArchiveMemberHandler(members[0]).extract_facet_labels('L3C')[PLATFORM], 'ENVISAT')
+
+    def test_interleaved_archives(self):
+        archives = []
+        for name in ('first.tar', 'second.tar'):
+            archive = self.root / name
+            with tarfile.open(archive, 'w') as writer:
+                writer.add(self.classic, arcname=self.NAME)
+            archives.append(archive)
+
+        for archive in archives:
+            ArchiveMemberHandler(archive / self.NAME)
+
+        # Both archives are held, so switching between them does not rescan
+        # the archives, which can no longer be read
+        for archive in archives:
+            archive.write_bytes(b'')
+
+        for archive in archives + archives:
+            handler = ArchiveMemberHandler(archive / self.NAME)
+            self.assertEqual(handler.extract_facet_labels('L3C')[PLATFORM], 'ENVISAT')
+
+    def test_compressed_classic_reads_header_only(self):
+        for path in (self.gzip, self.bzip):
+            handler = CompressedNetcdfHandler(path)
+            tags = handler.extract_facet_labels('L3C')
+
+            self.assertEqual(tags[PLATFORM], 'ENVISAT')
+            self.assertEqual(tags[PRODUCT_VERSION], '1.0')
+            self.assertLess(handler.bytes_read, 1024)
+
+    def test_archive_members(self):
+        tar_path = self.root / 'bundle.tar'
+        with tarfile.open(tar_path, 'w') as writer:
+            writer.add(self.classic, arcname=self.NAME)
+            writer.add(self.gzip, arcname=f'sub/{self.gzip.name}')
+            writer.add(self.netcdf4, arcname=f'nc4/{self.NAME}')
+
+        zip_path = self.root / 'bundle.zip'
+        with zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_DEFLATED) as writer:
+            writer.write(self.classic, arcname=self.NAME)
+
+        members = HandlerFactory.get_archive_members(tar_path)
+        self.assertEqual(members, [
+            tar_path / self.NAME,
+            tar_path / 'sub' / self.gzip.name,
+            tar_path / 'nc4' / self.NAME
+        ])
+
+        expected = ['ENVISAT', 'ENVISAT', 'SENTINEL-3A']
+        for member, platform in zip(members, expected):
+            handler = ArchiveMemberHandler(member)
+            self.assertEqual(handler.extract_facet_labels('L3C')[PLATFORM], platform)
+
+        self.assertLess(ArchiveMemberHandler(members[0]).bytes_read, 1024)
+
+        # Zip members are read on demand
+        handler = ArchiveMemberHandler(zip_path / self.NAME)
+        self.assertEqual(handler.extract_facet_labels('L3C')[SENSOR], 'AATSR')
+
+
+
+class TestHeaderCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def create_file(self, name, platform, length, format='NETCDF3_CLASSIC'):
+        path = self.root / name
+        with netCDF4.Dataset(path, 'w', format=format) as writer:
+            writer.platform = platform
+            writer.product_version = '1.0'
+            writer.createDimension('x', length)
+            writer.createVariable('data', 'f8', ('x',))[:] = 1
+        return path
+
+    def test_fingerprint(self):
+        a = self.create_file('a.nc', 'ENVISAT', 10)
+        b = self.create_file('b.nc', 'ENVISAT', 20)
+        c = self.create_file('c.nc', 'ERS-2', 10)
+
+        self.assertEqual(HeaderCache.fingerprint(a), HeaderCache.fingerprint(b))
+        self.assertNotEqual(HeaderCache.fingerprint(a), HeaderCache.fingerprint(c))
+        self.assertNotEqual(HeaderCache.fingerprint(a), HeaderCache.fingerprint(a, {'x': PLATFORM}))
+
+    def test_hdf5_fingerprint(self):
+        a = self.create_file('a.nc', 'ENVISAT', 10, 'NETCDF4')
+        b = self.create_file('b.nc', 'ENVISAT', 10, 'NETCDF4')
+
+        fingerprint = HeaderCache.fingerprint(a)
+        self.assertEqual(HeaderCache.fingerprint(a), fingerprint)
+        self.assertNotEqual(HeaderCache.fingerprint(b), fingerprint)
+        self.assertNotEqual(HeaderCache.fingerprint(a, {'x': PLATFORM}), fingerprint)
+
+        # Rewriting the file changes the fingerprint
+        a.unlink()
+        self.create_file('a.nc', 'ERS-2', 10, 'NETCDF4')
+        self.assertNotEqual(HeaderCache.fingerprint(a), fingerprint)
+
+    def test_hit_and_miss_types(self):
+        a = self.create_file('a.nc', 'ENVISAT', 10)
+        b = self.create_file('b.nc', 'ENVISAT', 20)
+
+        for path in (a, b):
+            with netCDF4.Dataset(path, 'a') as writer:
+                writer.sensor = np.array([1, 2], dtype='i4')
+
+        cache = HeaderCache()
+        miss = NetcdfHandler(a, header_cache=cache).extract_facet_labels('L3C')
+        hit = NetcdfHandler(b, header_cache=cache).extract_facet_labels('L3C')
+
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(miss, hit)
+        self.assertEqual({key: type(value) for key, value in miss.items()},
+                         {key: type(value) for key, value in hit.items()})
+        self.assertEqual(miss[SENSOR], [1, 2])
+
+    def test_commits_batched(self):
+        db = self.root / 'cache.db'
+        cache = HeaderCache(db)
+        cache.COMMIT_INTERVAL = 3
+
+        def stored():
+            with sqlite3.connect(db) as reader:
+                return reader.execute('SELECT COUNT(*) FROM headers').fetchone()[0]
+
+        for i in range(4):
+            cache.set(f'fingerprint-{i}', {PLATFORM: 'ENVISAT'})
+
+        self.assertEqual(stored(), 3)
+
+        cache.flush()
+        self.assertEqual(stored(), 4)
+
+        cache.set('fingerprint-4', {PLATFORM: 'ENVISAT'})
+        cache.close()
+        self.assertEqual(stored(), 5)
+
+    def test_handler_uses_cache(self):
+        a = self.create_file('a.nc', 'ENVISAT', 10)
+        b = self.create_file('b.nc', 'ENVISAT', 20)
+        db = self.root / 'cache.db'
+
+        cache = HeaderCache(db)
+        expected = NetcdfHandler(a, header_cache=cache).extract_facet_labels('L3C')
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+
+        handler = NetcdfHandler(b, header_cache=cache)
+        self.assertIsNone(handler.nc_data)
+        self.assertEqual(handler.extract_facet_labels('L3C'), expected)
+        self.assertEqual(cache.hits, 1)
+        cache.close()
+
+        # Cache is shared between runs
+        cache = HeaderCache(db)
+        self.assertEqual(NetcdfHandler(b, header_cache=cache).extract_facet_labels('L3C'), expected)
+        self.assertEqual(cache.hits, 1)
+        cache.close()
+
+
+class TestAttributeIndex(unittest.TestCase):
+
+    RECORDS = [
+        ('/data/a.nc', {'platform': 'ENVISAT', 'Instrument': 'AATSR', 'product_version': 2.1}),
+        ('/data/b.nc', {'platform': 'ERS-2'}),
+    ]
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write_ndjson(self):
+        path = self.root / 'index.ndjson'
+        with open(path, 'w') as writer:
+            for filepath, attributes in self.RECORDS:
+                writer.write(json.dumps({'path': filepath, 'attributes': attributes}) + '\n')
+            writer.write('\n')
+        return path
+
+    def write_sqlite(self):
+        path = self.root / 'index.sqlite'
+        with sqlite3.connect(path) as db:
+            db.execute('CREATE TABLE attributes (path TEXT PRIMARY KEY, attributes TEXT)')
+            db.executemany('INSERT INTO attributes VALUES (?, ?)', [(p, json.dumps(a)) for p, a in self.RECORDS])
+        db.close()
+        return path
+
+    def test_lookup(self):
+        for path in (self.write_ndjson(), self.write_sqlite()):
+            index = AttributeIndex(path)
+
+            self.assertEqual(len(index), 2)
+            self.assertEqual(index.get(pathlib.Path('/data/b.nc')), {'platform': 'ERS-2'})
+            self.assertIsNone(index.get(pathlib.Path('/data/c.nc')))
+            self.assertEqual((index.hits, index.misses), (1, 1))
+            index.close()
+
+    def test_handler(self):
+        index = AttributeIndex(self.write_ndjson())
+        filepath = pathlib.Path('/data/a.nc')
+
+        tags = IndexHandler(
+            filepath,
+            attributes=index.get(filepath),
+            attribute_map={'Instrument': SENSOR}
+        ).extract_facet_labels('L3C')
+
+        self.assertEqual(tags[PLATFORM], 'ENVISAT')
+        self.assertEqual(tags[SENSOR], 'AATSR')
+        self.assertEqual(tags[PRODUCT_VERSION], '2.1')
+        index.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
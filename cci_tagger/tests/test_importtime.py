@@ -0,0 +1,60 @@
+# encoding: utf-8
+"""
+Tests that the slow dependencies are only imported when they are needed
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from cci_tagger.benchmarks.end_to_end import PACKAGE_DIR
+from cci_tagger.benchmarks.importtime import measure, parse_importtime
+
+OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       100 |        100 |   encodings.aliases
+import time:       200 |        300 | encodings
+import time:       400 |        400 | site
+import time:        50 |         50 |   cci_tagger.conf
+import time:        70 |        120 | cci_tagger
+import time:        30 |         30 | cci_tagger.scripts
+"""
+
+
+class TestImportTime(unittest.TestCase):
+
+    def test_parse(self):
+        total, modules = parse_importtime(OUTPUT)
+
+        self.assertEqual(total, 150)
+        self.assertEqual(modules, {'cci_tagger.conf': 50, 'cci_tagger': 70, 'cci_tagger.scripts': 30})
+
+    def test_check_json(self):
+        result = measure('cci_tagger.scripts.check_json', repeat=1)
+
+        self.assertEqual(result['slow_modules'], [])
+        self.assertNotIn('cci_tagger.tagger', result['self_times'])
+
+    def test_tagger(self):
+        result = measure('cci_tagger.scripts.command_line_client', repeat=1)
+
+        self.assertEqual(result['slow_modules'], [])
+
+    def test_no_error_log_on_import(self):
+        env = dict(os.environ, PYTHONPATH=PACKAGE_DIR)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            subprocess.run([sys.executable, '-c', 'import cci_tagger.scripts.command_line_client'],
+                           cwd=tmpdir, env=env, check=True)
+
+            self.assertEqual(os.listdir(tmpdir), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+# encoding: utf-8
+"""
+Tests for the memory report
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+import json
+import os
+import tempfile
+import unittest
+
+from cci_tagger.utils.memory import DatasetMemoryReporter, MB
+
+
+class NoResetPeakReporter(DatasetMemoryReporter):
+    """
+    Reports as it does before Python 3.9, when the peak cannot be reset
+    """
+
+    reset_peak = False
+
+
+class TestDatasetMemoryReporter(unittest.TestCase):
+
+    def setUp(self):
+        self.reporter = DatasetMemoryReporter(budget=MB, top=5).start()
+
+    def tearDown(self):
+        self.reporter.stop()
+
+    def test_growth_and_budget(self):
+        file_map = {}
+
+        with self.assertLogs('cci_tagger.utils.memory', 'WARNING') as logs:
+            with self.reporter.measure('/neodc/esacci/sst/l3c'):
+                for i in range(20000):
+                    file_map[f'/neodc/esacci/sst/l3c/file_{i}.nc'] = f'esacci.SST.day.{i}'
+
+                # Freed before the end, so only counts towards the peak
+                scratch = bytearray(2 * MB)
+                del scratch
+
+        result, = self.reporter.datasets
+
+        self.assertGreater(result['peak'], 2 * MB)
+        self.assertGreater(result['growth'], MB)
+        self.assertLess(result['growth'], result['peak'])
+        self.assertTrue(result['over_budget'])
+        self.assertIn('/neodc/esacci/sst/l3c', logs.output[0])
+
+        # The lines which filled the file map are the top allocation sites
+        self.assertTrue(result['top'][0]['site'][0].startswith(__file__))
+
+    def test_without_reset_peak(self):
+        self.reporter.stop()
+        self.reporter = NoResetPeakReporter().start()
+
+        with self.reporter.measure('/neodc/esacci/sst/l3c'):
+            scratch = bytearray(4 * MB)
+            del scratch
+
+        # The first dataset sets the peak of the run
+        with self.reporter.measure('/neodc/esacci/sst/l4'):
+            held = bytearray(MB)
+
+        first, second = self.reporter.datasets
+
+        self.assertGreater(first['peak'], 4 * MB)
+
+        # The 4 MB peak is not seen again, so the memory held afterwards is
+        # used for the second dataset
+        self.assertEqual(second['peak'], second['growth'])
+        self.assertGreater(second['peak'], MB * 0.9)
+        del held
+
+    def test_report(self):
+        with self.reporter.measure('/neodc/esacci/sst/l4'):
+            pass
+
+        result, = self.reporter.datasets
+        self.assertFalse(result['over_budget'])
+        self.assertIn('/neodc/esacci/sst/l4', self.reporter.summary())
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'memory_report.json')
+            self.reporter.write_json(path)
+
+            with open(path) as reader:
+                report = json.load(reader)
+
+        self.assertEqual(report['budget'], MB)
+        self.assertEqual(len(report['datasets']), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+# encoding: utf-8
+"""
+Tests for the live metrics
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+import io
+import os
+import tempfile
+import unittest
+
+from cci_tagger.utils.metrics import Metrics, MetricsExporter
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = Metrics()
+        self.metrics.inc('files_discovered_total', 10)
+        self.metrics.inc('cache_hits_total', 3, cache='uris')
+        self.metrics.inc('cache_misses_total', 1, cache='uris')
+        self.metrics.add_collector(lambda: {'vocab_queries_total': 42})
+
+        for seconds in [0.0005, 0.02, 0.02, 2]:
+            self.metrics.observe_file(seconds)
+
+    def get_samples(self):
+        samples = {}
+        for line in self.metrics.render().splitlines():
+            if not line.startswith('#'):
+                name, value = line.rsplit(' ', 1)
+                samples[name] = float(value)
+        return samples
+
+    def test_render(self):
+        samples = self.get_samples()
+
+        self.assertEqual(samples['cci_tagger_files_discovered_total'], 10)
+        self.assertEqual(samples['cci_tagger_files_scanned_total'], 4)
+        self.assertEqual(samples['cci_tagger_vocab_queries_total'], 42)
+        self.assertEqual(samples['cci_tagger_cache_hit_ratio{cache="uris"}'], 0.75)
+
+    def test_labelled_collector(self):
+        self.metrics.add_collector(lambda: {'cache_hits_total': [({'cache': 'drs'}, 9)],
+                                            'cache_misses_total': [({'cache': 'drs'}, 1)]})
+        samples = self.get_samples()
+
+        self.assertEqual(samples['cci_tagger_cache_hits_total{cache="drs"}'], 9)
+        self.assertEqual(samples['cci_tagger_cache_hit_ratio{cache="drs"}'], 0.9)
+        self.assertEqual(samples['cci_tagger_cache_hits_total{cache="uris"}'], 3)
+
+    def test_histogram(self):
+        samples = self.get_samples()
+
+        self.assertEqual(samples['cci_tagger_file_seconds_bucket{le="0.001"}'], 1)
+        self.assertEqual(samples['cci_tagger_file_seconds_bucket{le="0.05"}'], 3)
+        self.assertEqual(samples['cci_tagger_file_seconds_bucket{le="+Inf"}'], 4)
+        self.assertEqual(samples['cci_tagger_file_seconds_count'], 4)
+        self.assertAlmostEqual(samples['cci_tagger_file_seconds_sum'], 2.0405)
+
+    def test_progress(self):
+        progress = self.metrics.progress()
+
+        self.assertTrue(progress.startswith(' 40.0% 4/10 files'))
+        self.assertIn('ETA', progress)
+
+    def test_exporter(self):
+        stream = io.StringIO()
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'cci_tagger.prom')
+
+            exporter = MetricsExporter(self.metrics, textfile=path, progress=True, stream=stream).start()
+            self.assertTrue(os.path.exists(path))
+
+            self.metrics.inc('datasets_processed_total')
+            exporter.stop()
+
+            with open(path) as reader:
+                self.assertIn('cci_tagger_datasets_processed_total 1', reader.read())
+
+            self.assertEqual(os.listdir(tmpdir), ['cci_tagger.prom'])
+
+        self.assertTrue(stream.getvalue().endswith('\n'))
+
+
+if __name__ == '__main__':
+    unittest.main()
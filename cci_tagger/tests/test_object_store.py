@@ -0,0 +1,146 @@
+# encoding: utf-8
+"""
+Tests against a local S3 compatible server provided by moto
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+import gzip
+import io
+import pathlib
+import tempfile
+import unittest
+
+import netCDF4
+
+from cci_tagger.conf.constants import PLATFORM, SENSOR
+from cci_tagger.file_handlers.handler_factory import HandlerFactory
+from cci_tagger.file_handlers.object_store import ObjectStoreHandler
+from cci_tagger.object_store import ObjectStore, ObjectStorePath
+from cci_tagger.utils import fpath_as_pathlib
+
+try:
+    import boto3
+    from moto.server import ThreadedMotoServer
+except ImportError:
+    ThreadedMotoServer = None
+
+
+@unittest.skipIf(ThreadedMotoServer is None, 'boto3 and moto[server] are required')
+class TestObjectStore(unittest.TestCase):
+
+    BUCKET = 'cci'
+    NAME = 'ESACCI-L3C_TEST-SST-PRODUCT-20000101-fv1.0.nc'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadedMotoServer(port=0, verbose=False)
+        cls.server.start()
+        host, port = cls.server.get_host_and_port()
+
+        client = boto3.client(
+            's3',
+            endpoint_url=f'http://{host}:{port}',
+            aws_access_key_id='test',
+            aws_secret_access_key='test',
+            region_name='us-east-1'
+        )
+        ObjectStore.set_client(client)
+        client.create_bucket(Bucket=cls.BUCKET)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            classic = pathlib.Path(tmpdir, 'classic.nc')
+            with netCDF4.Dataset(classic, 'w', format='NETCDF3_CLASSIC') as writer:
+                writer.platform = 'ENVISAT'
+                writer.sensor = 'AATSR'
+                writer.createDimension('x', 100000)
+                writer.createVariable('data', 'f8', ('x',))[:] = 1
+
+            netcdf4 = pathlib.Path(tmpdir, 'netcdf4.nc')
+            with netCDF4.Dataset(netcdf4, 'w') as writer:
+                writer.platform = 'SENTINEL-3A'
+                writer.createDimension('x', 100000)
+                writer.createVariable('data', 'f8', ('x',))[:] = 1
+
+            cls.classic_size = classic.stat().st_size
+
+            client.put_object(Bucket=cls.BUCKET, Key=f'dataset/classic/{cls.NAME}', Body=classic.read_bytes())
+            client.put_object(Bucket=cls.BUCKET, Key=f'dataset/netcdf4/{cls.NAME}', Body=netcdf4.read_bytes())
+            client.put_object(Bucket=cls.BUCKET, Key=f'dataset/gzip/{cls.NAME}.gz', Body=gzip.compress(classic.read_bytes()))
+            client.put_object(Bucket=cls.BUCKET, Key='dataset/dir/', Body=b'')
+            client.put_object(Bucket=cls.BUCKET, Key='other/file.nc', Body=b'')
+
+    @classmethod
+    def tearDownClass(cls):
+        ObjectStore.set_client(None)
+        cls.server.stop()
+
+    def get_path(self, key):
+        return ObjectStorePath.from_uri(f's3://{self.BUCKET}/{key}')
+
+    def test_listing(self):
+        objects = sorted(str(path) for path in ObjectStore.iter_objects(self.get_path('dataset')))
+
+        self.assertEqual(objects, [
+            f's3://cci/dataset/classic/{self.NAME}',
+            f's3://cci/dataset/gzip/{self.NAME}.gz',
+            f's3://cci/dataset/netcdf4/{self.NAME}',
+        ])
+
+    def test_handler_lookup(self):
+        self.assertIs(HandlerFactory.get_handler_for_path(self.get_path('a.nc')), ObjectStoreHandler)
+        self.assertIs(HandlerFactory.get_handler_for_path(self.get_path('a.nc.gz')), ObjectStoreHandler)
+        self.assertIsNone(HandlerFactory.get_handler_for_path(self.get_path('a.txt')))
+        self.assertFalse(HandlerFactory.is_archive(self.get_path('a.tar')))
+
+    def test_classic_single_request(self):
+        handler = ObjectStoreHandler(self.get_path(f'dataset/classic/{self.NAME}'))
+        tags = handler.extract_facet_labels('L3C')
+
+        self.assertEqual(tags[PLATFORM], 'ENVISAT')
+        self.assertEqual(tags[SENSOR], 'AATSR')
+        self.assertEqual(handler.requests, 1)
+        self.assertLess(handler.bytes_read, self.classic_size)
+
+    def test_netcdf4_ranged_reads(self):
+        handler = ObjectStoreHandler(self.get_path(f'dataset/netcdf4/{self.NAME}'))
+        tags = handler.extract_facet_labels('L3C')
+
+        self.assertEqual(tags[PLATFORM], 'SENTINEL-3A')
+        self.assertLessEqual(handler.requests, 3)
+
+    def test_compressed(self):
+        handler = ObjectStoreHandler(self.get_path(f'dataset/gzip/{self.NAME}.gz'))
+        self.assertEqual(handler.extract_facet_labels('L3C')[PLATFORM], 'ENVISAT')
+        self.assertEqual(handler.requests, 1)
+
+    def test_empty_object(self):
+        reader = ObjectStore.open(self.get_path('other/file.nc'))
+
+        self.assertEqual(reader.size, 0)
+        self.assertEqual(reader.read(8), b'')
+        self.assertEqual(reader.seek(0, io.SEEK_END), 0)
+        self.assertEqual(reader.requests, 1)
+
+        # Not a netCDF file, but not an error from the object store
+        with self.assertLogs('cci_tagger.file_handlers.object_store', 'ERROR') as logs:
+            ObjectStoreHandler(self.get_path('other/file.nc'))
+
+        self.assertIn('Not a netCDF or HDF5 file', logs.output[0])
+
+    def test_uri_conversion(self):
+
+        @fpath_as_pathlib('filepath')
+        def get_path(filepath):
+            return filepath
+
+        path = get_path(filepath=f's3://cci/dataset/classic/{self.NAME}')
+        self.assertIsInstance(path, ObjectStorePath)
+        self.assertEqual(path.as_posix(), f's3://cci/dataset/classic/{self.NAME}')
+
+
+if __name__ == '__main__':
+    unittest.main()
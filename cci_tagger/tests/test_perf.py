@@ -0,0 +1,83 @@
+# encoding: utf-8
+"""
+Tests for the stage timings
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+import json
+import os
+import tempfile
+import unittest
+
+from cci_tagger.utils.perf import PerfRecorder, NullRecorder
+
+
+class TestPerfRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self.perf = PerfRecorder()
+
+        for i in range(1, 101):
+            self.perf.record('open', i / 1000, 'ds1')
+
+        self.perf.record('open', 1, 'ds2')
+        self.perf.record('write_json', 0.5)
+
+    def test_summary(self):
+        summary = self.perf.summary()
+
+        self.assertEqual(summary['open']['count'], 101)
+        self.assertAlmostEqual(summary['open']['total'], 6.05)
+        self.assertEqual(summary['open']['max'], 1)
+        self.assertEqual(summary['write_json']['count'], 1)
+
+    def test_dataset_summary(self):
+        summary = self.perf.summary('ds1')
+
+        self.assertEqual(list(summary), ['open'])
+        self.assertAlmostEqual(summary['open']['p50'], 0.0505)
+        self.assertAlmostEqual(summary['open']['p99'], 0.09901)
+        self.assertEqual(self.perf.datasets(), ['ds1', 'ds2'])
+
+    def test_timer(self):
+        with self.perf.timer('map', 'ds3'):
+            pass
+
+        self.assertEqual(self.perf.summary('ds3')['map']['count'], 1)
+
+    def test_iter_timed(self):
+        items = list(self.perf.iter_timed('walk', range(5), 'ds1'))
+
+        self.assertEqual(items, list(range(5)))
+        self.assertEqual(self.perf.summary('ds1')['walk']['count'], 1)
+
+    def test_report(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'perf.json')
+            self.perf.write_json(path)
+
+            with open(path) as reader:
+                report = json.load(reader)
+
+        self.assertEqual(set(report), {'wall_time', 'stages', 'datasets'})
+        self.assertEqual(report['datasets']['ds2']['open']['count'], 1)
+
+        table = self.perf.format_table().splitlines()
+        self.assertTrue(table[1].startswith('open'))
+        self.assertTrue(table[2].startswith('write_json'))
+
+    def test_null_recorder(self):
+        perf = NullRecorder()
+
+        with perf.timer('open'):
+            pass
+
+        self.assertEqual(list(perf.iter_timed('walk', [1, 2])), [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
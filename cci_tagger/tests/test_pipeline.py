@@ -0,0 +1,113 @@
+# encoding: utf-8
+"""
+Tests for the staged pipeline
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+import random
+import threading
+import time
+import unittest
+
+from cci_tagger.dataset.pipeline import Pipeline
+
+
+def jitter(value):
+    # Make workers finish out of order
+    time.sleep(random.random() / 1000)
+    return value
+
+
+class TestPipeline(unittest.TestCase):
+
+    def test_order_is_kept(self):
+        pipeline = Pipeline(range(200), queue_size=4)
+        pipeline.add_stage('double', lambda x: jitter(x * 2), workers=8)
+        pipeline.add_stage('collect', lambda x: x + 1, ordered=True)
+
+        self.assertEqual(list(pipeline.run()), [x * 2 + 1 for x in range(200)])
+
+    def test_ordered_stage_sees_source_order(self):
+        seen = []
+
+        pipeline = Pipeline(range(100), queue_size=2)
+        pipeline.add_stage('read', jitter, workers=4)
+        pipeline.add_stage('resolve', seen.append, ordered=True)
+
+        list(pipeline.run())
+
+        self.assertEqual(seen, list(range(100)))
+
+    def test_dropped_items(self):
+        pipeline = Pipeline(range(50))
+        pipeline.add_stage('odd', lambda x: x if x % 2 else None, workers=3)
+        pipeline.add_stage('ordered', lambda x: x, ordered=True)
+
+        self.assertEqual(list(pipeline.run()), list(range(1, 50, 2)))
+
+    def test_error_is_raised(self):
+        def fail(value):
+            if value == 10:
+                raise ValueError('bad value')
+            return value
+
+        pipeline = Pipeline(range(100))
+        pipeline.add_stage('fail', fail, workers=2)
+
+        with self.assertLogs('cci_tagger.dataset.pipeline', level='ERROR'):
+            with self.assertRaises(ValueError):
+                list(pipeline.run())
+
+    def test_stop_early(self):
+        pipeline = Pipeline(iter(range(100000)), queue_size=2)
+        pipeline.add_stage('read', jitter, workers=2)
+
+        results = pipeline.run()
+        self.assertEqual([next(results) for _ in range(3)], [0, 1, 2])
+        results.close()
+
+        self.assertFalse([thread for thread in threading.enumerate() if thread.name.startswith('pipeline-')])
+
+    def test_stats(self):
+        pipeline = Pipeline(range(20), queue_size=5)
+        pipeline.add_stage('read', jitter, workers=3)
+        list(pipeline.run())
+
+        stats = pipeline.stats()
+
+        self.assertEqual(list(stats), ['discover', 'read'])
+        self.assertEqual(stats['read'].items, 20)
+        self.assertEqual(stats['read'].workers, 3)
+        self.assertLessEqual(stats['read'].max_queue_depth, 5 + 3)
+        self.assertGreater(stats['read'].items_per_second, 0)
+
+    def test_reorder_window(self):
+        def slow_first(value):
+            # The other items finish while the first is still being read
+            if value == 0:
+                time.sleep(0.3)
+            return value
+
+        for ordered in (False, True):
+            with self.subTest(ordered=ordered):
+                pipeline = Pipeline(range(2000), queue_size=8)
+                pipeline.add_stage('read', slow_first, workers=4)
+
+                if ordered:
+                    pipeline.add_stage('resolve', lambda x: x, ordered=True)
+
+                self.assertEqual(list(pipeline.run()), list(range(2000)))
+                self.assertGreater(pipeline.max_reorder_depth, 1)
+                self.assertLessEqual(pipeline.max_reorder_depth, 8 + sum(stage.workers for stage in pipeline.stages))
+
+    def test_ordered_stage_single_worker(self):
+        with self.assertRaises(ValueError):
+            Pipeline([]).add_stage('resolve', jitter, workers=2, ordered=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
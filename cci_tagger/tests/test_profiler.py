@@ -0,0 +1,55 @@
+# encoding: utf-8
+"""
+Tests for the dataset profiler
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+import os
+import tempfile
+import unittest
+
+from cci_tagger.utils.profiler import DatasetProfiler
+
+
+def busy_function():
+    return sum(i * i for i in range(10000))
+
+
+class TestDatasetProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.profiler = DatasetProfiler(os.path.join(self.tmpdir.name, 'profiles'), top=10)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_profiles(self):
+        self.assertEqual(self.profiler.summary(), 'No datasets profiled')
+
+        for dataset_id in ['/neodc/esacci/sst/l3c', '/neodc/esacci/sst/l4']:
+            with self.profiler.profile(dataset_id):
+                busy_function()
+
+        self.assertEqual(
+            [os.path.basename(path) for path in self.profiler.profiles.values()],
+            ['0000_neodc_esacci_sst_l3c.prof', '0001_neodc_esacci_sst_l4.prof']
+        )
+
+        summary = self.profiler.summary()
+        self.assertIn('busy_function', summary)
+
+        # Calls from both datasets are merged
+        calls = [stat[0] for key, stat in self.profiler.stats().stats.items() if key[2] == 'busy_function']
+        self.assertEqual(calls, [2])
+
+        path = self.profiler.write_summary()
+        self.assertTrue(os.path.exists(path))
+
+
+if __name__ == '__main__':
+    unittest.main()
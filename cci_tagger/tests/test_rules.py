@@ -0,0 +1,59 @@
+# encoding: utf-8
+"""
+Tests for the compiled dataset rules
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+import unittest
+
+from cci_tagger.conf.constants import PLATFORM, SENSOR, INSTITUTION, FREQUENCY
+from cci_tagger.dataset.rules import DatasetRules
+
+
+class TestDatasetRules(unittest.TestCase):
+
+    def setUp(self):
+        self.merged_calls = []
+
+        def merged(attr):
+            self.merged_calls.append(attr)
+            return {'ICARE ; HYGEOS': 'ICARE , HYGEOS'}.get(attr, attr)
+
+        self.rules = DatasetRules(
+            'test',
+            defaults={SENSOR: 'MERIS'},
+            mappings={PLATFORM: {'ERS2': 'ERS-2', 'ers2': 'ignored', 'ENV': 'ENVISAT'}},
+            overrides={FREQUENCY: 'day'},
+            merged_attribute=merged
+        )
+
+    def test_mapping(self):
+        self.assertEqual(self.rules.get_mapping(PLATFORM, ' Env '), 'envisat')
+        self.assertEqual(self.rules.get_mapping(PLATFORM, 'ers2'), 'ers-2')
+        self.assertEqual(self.rules.get_mapping(SENSOR, 'AATSR'), 'aatsr')
+
+    def test_process_file_attributes(self):
+        attributes = self.rules.process_file_attributes({
+            PLATFORM: 'ERS-<1,2>',
+            INSTITUTION: 'ICARE ; HYGEOS'
+        })
+
+        self.assertEqual(attributes[PLATFORM], ['ERS-1', 'ERS-2'])
+        self.assertEqual(attributes[SENSOR], ['MERIS'])
+        self.assertEqual(attributes[INSTITUTION], ['ICARE ', ' HYGEOS'])
+
+        # Merged values are only looked up once
+        self.rules.process_file_attributes({INSTITUTION: 'ICARE ; HYGEOS'})
+        self.assertEqual(self.merged_calls.count('ICARE ; HYGEOS'), 1)
+
+    def test_overrides(self):
+        tags = self.rules.apply_overrides(self.rules.apply_mapping({FREQUENCY: 'month', PLATFORM: ['ENV']}))
+        self.assertEqual(tags, {FREQUENCY: 'day', PLATFORM: ['envisat']})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+# encoding: utf-8
+"""
+Tests for the benchmark regression checks
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+import contextlib
+import io
+import json
+import os
+import random
+import tempfile
+import unittest
+
+from cci_tagger.benchmarks import synthetic
+from cci_tagger.benchmarks.runner import compare, main, mann_whitney_greater, Scenarios
+
+
+def report(median, calibration=1.0, seed=0):
+    rnd = random.Random(seed)
+    samples = [median * rnd.uniform(0.95, 1.05) for _ in range(10)]
+
+    return {
+        'calibration': calibration,
+        'scenarios': {'drs_generation': {'samples': samples, 'median': sorted(samples)[5]}}
+    }
+
+
+class TestRegressionCheck(unittest.TestCase):
+
+    def test_mann_whitney(self):
+        low = [1, 2, 3, 4, 5, 6, 7, 8]
+        high = [11, 12, 13, 14, 15, 16, 17, 18]
+
+        self.assertLess(mann_whitney_greater(high, low), 0.001)
+        self.assertGreater(mann_whitney_greater(low, high), 0.999)
+        self.assertEqual(mann_whitney_greater([1, 1, 1], [1, 1, 1]), 1.0)
+
+    def test_regression(self):
+        comparison, = compare(report(1.5, seed=1), report(1.0))
+
+        self.assertEqual(comparison['status'], 'regression')
+        self.assertAlmostEqual(comparison['change'], 0.5, delta=0.1)
+
+    def test_within_threshold(self):
+        comparison, = compare(report(1.1, seed=1), report(1.0))
+
+        self.assertEqual(comparison['status'], 'ok')
+
+    def test_calibration(self):
+        # Twice as slow on a machine which is twice as slow
+        comparison, = compare(report(2.0, calibration=2.0, seed=1), report(1.0))
+
+        self.assertEqual(comparison['status'], 'ok')
+
+    def test_improvement_and_new_scenario(self):
+        current = report(0.5, seed=1)
+        current['scenarios']['dataset'] = current['scenarios']['drs_generation']
+
+        statuses = {c['scenario']: c['status'] for c in compare(current, report(1.0))}
+
+        self.assertEqual(statuses, {'drs_generation': 'improvement', 'dataset': 'new'})
+
+
+class TestScenarios(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_scenarios(self):
+        root = os.path.join(self.tmpdir.name, 'archive')
+        synthetic.generate_archive(root, files=10, datasets=2)
+        scenarios = Scenarios(root)
+
+        for name in Scenarios.NAMES:
+            with self.subTest(scenario=name):
+                result = scenarios.run(name, samples=1, warmup=0)
+
+                self.assertGreater(result['operations'], 0)
+                self.assertGreater(result['median'], 0)
+
+    def test_missing_baseline(self):
+        baseline = os.path.join(self.tmpdir.name, 'baseline.json')
+        argv = ['--scenarios', 'vocab_load', 'filename_parsing', '--files', '10', '--samples', '3',
+                '--workdir', self.tmpdir.name, '--baseline', baseline]
+
+        # Fails rather than passing with nothing to compare with
+        with contextlib.redirect_stderr(io.StringIO()):
+            with self.assertRaises(SystemExit) as context:
+                main(argv)
+
+        self.assertNotEqual(context.exception.code, 0)
+        self.assertFalse(os.path.exists(baseline))
+
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(io.StringIO()):
+            main(argv + ['--write-baseline'])
+
+        with open(baseline) as reader:
+            self.assertEqual(set(json.load(reader)['scenarios']), {'vocab_load', 'filename_parsing'})
+
+        # The next run compares with it
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(io.StringIO()):
+            main(argv)
+
+        self.assertNotIn('Baseline written', stdout.getvalue())
+        self.assertIn('filename_parsing', stdout.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
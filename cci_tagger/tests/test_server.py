@@ -0,0 +1,124 @@
+# encoding: utf-8
+"""
+Tests for the tagging service and client
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+import http.client
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from cci_tagger.client import TaggerClient, TaggerError
+from cci_tagger.conf.settings import SERVER_MAX_WORKERS
+from cci_tagger.server import TaggingServer, UnixTaggingServer
+from cci_tagger.utils import TaggedDataset
+from cci_tagger.utils.snippets import CacheInfo
+
+
+class Tagger(object):
+    """
+    Tags files from the filename, in place of ProcessDatasets
+    """
+
+    def __init__(self):
+        self.reloaded = []
+        self.workers = []
+
+    def get_file_tags(self, fpath):
+        if fpath.endswith('.txt'):
+            raise ValueError('Unsupported file')
+
+        name = os.path.basename(fpath)
+        return TaggedDataset(f'esacci.{name}', {'ecv': [name]}, {'ecv': {f'http://vocab/{name}'}})
+
+    def get_files_tags(self, fpaths, workers=0):
+        self.workers.append(workers)
+
+        for fpath in fpaths:
+            yield fpath, self.get_file_tags(fpath)
+
+    def cache_info(self):
+        return {'datasets': CacheInfo(1, 2, 3)}
+
+    def reload_vocab(self, facet_json=None):
+        self.reloaded.append('vocab')
+
+    def reload_mappings(self, json_files=None):
+        self.reloaded.append(json_files)
+
+
+class TestTaggingServer(unittest.TestCase):
+
+    def start(self, server):
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+    def check_client(self, client, tagger):
+        self.assertEqual(client.health()['cache']['datasets'], {'hits': 1, 'misses': 2, 'size': 3})
+
+        tags = client.get_file_tags('/data/a.nc')
+        self.assertEqual(tags['drs'], 'esacci.a.nc')
+        self.assertEqual(tags['uris'], {'ecv': ['http://vocab/a.nc']})
+
+        results = client.get_files_tags(['/data/a.nc', '/data/b.nc'])
+        self.assertEqual([result['path'] for result in results], ['/data/a.nc', '/data/b.nc'])
+
+        with self.assertRaises(TaggerError):
+            client.get_file_tags('/data/a.txt')
+
+        # The connection is still usable after an error
+        client.reload(json_files=['new.json'], vocab=True)
+        self.assertEqual(tagger.reloaded, ['vocab', ['new.json']])
+
+    def test_tcp(self):
+        tagger = Tagger()
+        server = TaggingServer(('localhost', 0), tagger)
+        self.start(server)
+
+        self.check_client(TaggerClient(f'http://localhost:{server.server_port}'), tagger)
+
+    def test_unix_socket(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        socket_path = os.path.join(tmpdir.name, 'tagger.sock')
+
+        tagger = Tagger()
+        self.start(UnixTaggingServer(socket_path, tagger))
+
+        self.check_client(TaggerClient(socket_path=socket_path), tagger)
+
+    def test_workers(self):
+        tagger = Tagger()
+        server = TaggingServer(('localhost', 0), tagger)
+        self.start(server)
+
+        connection = http.client.HTTPConnection('localhost', server.server_port)
+        self.addCleanup(connection.close)
+
+        def post(workers):
+            connection.request('POST', '/tags', json.dumps({'paths': ['/data/a.nc'], 'workers': workers}))
+            response = connection.getresponse()
+            return response.status, json.loads(response.read())
+
+        for workers in (-1, 1.5, '4', None, True):
+            with self.subTest(workers=workers):
+                status, result = post(workers)
+
+                self.assertEqual(status, 400)
+                self.assertIn('workers', result['error'])
+
+        self.assertEqual(post(4)[0], 200)
+        self.assertEqual(post(SERVER_MAX_WORKERS * 10)[0], 200)
+        self.assertEqual(tagger.workers, [4, SERVER_MAX_WORKERS])
+
+
+if __name__ == '__main__':
+    unittest.main()
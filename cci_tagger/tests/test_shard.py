@@ -0,0 +1,198 @@
+# encoding: utf-8
+"""
+Tests for sharded runs and merging the shard outputs
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+import json
+import os
+import tempfile
+import unittest
+
+from cci_tagger.conf.settings import ESGF_DRS_FILE, MOLES_TAGS_FILE
+from cci_tagger.scripts.command_line_client import CCITaggerCommandLineClient
+from cci_tagger.shard import ShardError, ShardWriter, estimate_sizes, fingerprint, merge_shards, partition, \
+    read_sizes
+from cci_tagger.tests.archive import SyntheticArchiveTestCase
+
+DATASETS = [f'/neodc/esacci/sst/data/{i:02d}' for i in range(10)]
+
+
+def run_shard(index, count, directory, datasets=DATASETS):
+    """
+    Write the output for a shard as ProcessDatasets would
+    """
+    shards = partition(datasets, count)
+    writer = ShardWriter(index, count, shards[index - 1], len(datasets), directory,
+                         partition_id=fingerprint(datasets))
+    writer.open()
+
+    file_map = {}
+    for dspath in writer.datasets:
+        writer.start_dataset(dspath)
+
+        for uri in ('http://vocab/sst', 'http://vocab/l3c'):
+            writer.write_moles_tag(dspath, uri)
+
+        # Datasets 03 and 07 share a DRS
+        drs = 'esacci.SST.shared' if dspath[-2:] in ('03', '07') else f'esacci.SST.{dspath[-2:]}'
+        ds_file_map = {drs: [f'{dspath}/file.nc']}
+
+        file_map.update(ds_file_map)
+        writer.add_file_map(ds_file_map)
+
+    writer.write_drs(file_map)
+    writer.close()
+
+
+class TestShard(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.directory = self.tmpdir.name
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_partition(self):
+        sizes = {dspath: i + 1 for i, dspath in enumerate(DATASETS)}
+        shards = partition(reversed(DATASETS), 3, sizes)
+
+        # Every dataset in one shard, with its position in the sorted list
+        positions = sorted(item for shard in shards for item in shard)
+        self.assertEqual(positions, list(enumerate(DATASETS)))
+
+        totals = [sum(sizes[dspath] for _, dspath in shard) for shard in shards]
+        self.assertLessEqual(max(totals) - min(totals), 1)
+
+        self.assertEqual(partition(DATASETS, 3, sizes), shards)
+
+    def test_sizes(self):
+        path = os.path.join(self.directory, 'sizes.txt')
+        with open(path, 'w') as writer:
+            writer.write(f'100\t{DATASETS[0]}\n300\t{DATASETS[1]}\nnot a size\n')
+
+        sizes = estimate_sizes(DATASETS[:3], read_sizes(path))
+
+        self.assertEqual(sizes, {DATASETS[0]: 100, DATASETS[1]: 300, DATASETS[2]: 200})
+
+    def test_default_sizes(self):
+        # The datasets are not walked, so they do not need to exist
+        sizes = estimate_sizes(DATASETS)
+
+        self.assertEqual(sizes, {dspath: 1 for dspath in DATASETS})
+        self.assertEqual(fingerprint(DATASETS, sizes), fingerprint(reversed(DATASETS), estimate_sizes(DATASETS)))
+
+    def test_merge(self):
+        for index in (1, 2, 3):
+            run_shard(index, 3, self.directory)
+
+        self.assertEqual(merge_shards(self.directory, self.directory), 3)
+
+        # The output of a single run
+        run_shard(1, 1, self.directory)
+        with open(os.path.join(self.directory, 'moles_tags.shard-0001-of-0001.csv')) as reader:
+            expected_tags = ''.join(line.split(',', 1)[1] for line in reader)
+
+        expected_drs = {f'esacci.SST.{dspath[-2:]}': [f'{dspath}/file.nc'] for dspath in DATASETS}
+        expected_drs['esacci.SST.shared'] = [f'{DATASETS[7]}/file.nc']
+        for dspath in (DATASETS[3], DATASETS[7]):
+            del expected_drs[f'esacci.SST.{dspath[-2:]}']
+
+        with open(os.path.join(self.directory, MOLES_TAGS_FILE)) as reader:
+            self.assertEqual(reader.read(), expected_tags)
+
+        with open(os.path.join(self.directory, ESGF_DRS_FILE)) as reader:
+            self.assertEqual(
+                reader.read(),
+                json.dumps(expected_drs, sort_keys=True, indent=4, separators=(',', ': '))
+            )
+
+    def test_incomplete(self):
+        for index in (1, 3):
+            run_shard(index, 3, self.directory)
+
+        with self.assertRaisesRegex(ShardError, 'shard-0002-of-0003'):
+            merge_shards(self.directory, self.directory)
+
+        # Shards from a different partition
+        run_shard(2, 3, self.directory, DATASETS[1:] + ['/neodc/esacci/sst/data/99'])
+
+        with self.assertRaisesRegex(ShardError, 'different datasets'):
+            merge_shards(self.directory, self.directory)
+
+
+class TestShardedRun(SyntheticArchiveTestCase, unittest.TestCase):
+    """
+    Sharded runs merge into the same output as a single run
+    """
+
+    files = 30
+    datasets = 5
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.directory = self.tmpdir.name
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def parse_args(self, *argv):
+        json_args = [arg for json_file in self.manifest['json_files'] for arg in ('-j', json_file)]
+        return CCITaggerCommandLineClient.parse_args(json_args + list(argv))
+
+    def read_output(self, directory):
+        output = []
+
+        for name in (MOLES_TAGS_FILE, ESGF_DRS_FILE):
+            with open(os.path.join(directory, name), 'rb') as reader:
+                output.append(reader.read())
+
+        return output
+
+    def test_same_as_single_run(self):
+        shard_dir = os.path.join(self.directory, 'shards')
+
+        for index in (1, 2, 3):
+            args = self.parse_args('--shard', f'{index}/3', '--shard-dir', shard_dir)
+            shard = CCITaggerCommandLineClient.get_shard(self.manifest['datasets'], args)
+
+            pds = self.new_tagger(suppress_file_output=False, shard=shard)
+            pds.process_datasets(shard.datasets)
+
+        merged_dir = os.path.join(self.directory, 'merged')
+        os.makedirs(merged_dir)
+
+        args = self.parse_args('--shard-dir', shard_dir, 'merge', '--output-dir', merged_dir)
+        CCITaggerCommandLineClient.merge(args)
+
+        # A single run writes to the current directory
+        single_dir = os.path.join(self.directory, 'single')
+        os.makedirs(single_dir)
+
+        cwd = os.getcwd()
+        os.chdir(single_dir)
+        try:
+            self.new_tagger(suppress_file_output=False).process_datasets(self.manifest['datasets'])
+        finally:
+            os.chdir(cwd)
+
+        self.assertEqual(self.read_output(merged_dir), self.read_output(single_dir))
+
+    def test_merge_shard_dir(self):
+        # The directory given before merge is kept
+        args = self.parse_args('--shard-dir', '/data/shards', 'merge')
+        self.assertEqual(args.shard_dir, '/data/shards')
+
+        args = self.parse_args('merge', '--shard-dir', '/data/shards')
+        self.assertEqual(args.shard_dir, '/data/shards')
+
+        self.assertEqual(self.parse_args('merge').shard_dir, '.')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+# encoding: utf-8
+"""
+Tests for the synthetic archive generator
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+import json
+import os
+import unittest
+
+import netCDF4
+
+from cci_tagger.benchmarks import synthetic
+from cci_tagger.conf import constants
+from cci_tagger.dataset.dataset import Dataset
+from cci_tagger.tests.archive import SyntheticArchiveTestCase
+
+
+class TestSyntheticArchive(SyntheticArchiveTestCase, unittest.TestCase):
+
+    files = 23
+    datasets = 6
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.facets = cls.load_facets()
+
+    def test_archive(self):
+        self.assertEqual(len(self.all_paths()), 23)
+        self.assertEqual(len(self.manifest['datasets']), 6)
+        self.assertEqual(synthetic.load_manifest(self.tmpdir.name), self.manifest)
+
+        for dataset, json_file in zip(self.manifest['datasets'], self.manifest['json_files']):
+            with open(json_file) as reader:
+                self.assertEqual(json.load(reader)['datasets'], [dataset])
+
+    def test_file_names_in_vocab(self):
+        for path in self.all_paths():
+            segments = os.path.basename(path).split('-')
+
+            if segments[1] == 'ESACCI':
+                terms = Dataset._get_data_from_filename1(segments)
+            else:
+                terms = Dataset._get_data_from_filename2(segments)
+
+            for facet in (constants.ECV, constants.DATA_TYPE, constants.PROCESSING_LEVEL):
+                self.assertIn(terms[facet].lower(), self.facets.get_alt_labels(facet))
+
+            self.assertIn(terms[constants.PRODUCT_STRING].lower(), self.facets.get_labels(constants.PRODUCT_STRING))
+
+    def test_global_attributes(self):
+        path = self.all_paths()[0]
+
+        with netCDF4.Dataset(path) as reader:
+            attributes = reader.__dict__
+
+        for attr in constants.ALLOWED_GLOBAL_ATTRS + [constants.PRODUCT_VERSION]:
+            self.assertIn(attr, attributes)
+
+    def test_vocab(self):
+        platform = self.facets.get_labels(constants.PLATFORM)['envisat']
+        proc_level = self.facets.get_alt_labels(constants.PROCESSING_LEVEL)['l3c']
+
+        self.assertEqual(self.facets.get_platforms_programme(platform.uri), 'Envisat')
+        self.assertIsNotNone(self.facets.get_broader_proc_level(proc_level.uri))
+        self.assertEqual(self.facets.get_label_from_uri(constants.PROCESSING_LEVEL, proc_level.uri), 'L3C')
+
+
+if __name__ == '__main__':
+    unittest.main()
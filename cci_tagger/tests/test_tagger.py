@@ -0,0 +1,326 @@
+# encoding: utf-8
+"""
+Tests for tagging individual files with ProcessDatasets
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+import asyncio
+import pathlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+import zipfile
+
+from cci_tagger.tagger import ProcessDatasets
+from cci_tagger.tests.archive import SyntheticArchiveTestCase
+from cci_tagger.utils.metrics import Metrics
+from cci_tagger.utils.snippets import CacheInfo, TaggedDataset
+
+
+class TestFilesTags(SyntheticArchiveTestCase, unittest.TestCase):
+
+    files = 40
+    datasets = 4
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        # Interleave the datasets
+        paths = cls.all_paths()
+        cls.paths = paths[::2] + paths[1::2]
+
+        # The file name does not have enough segments to parse
+        cls.bad_path = pathlib.Path(cls.manifest['datasets'][0], '20000101-ESACCI-L3C-SST-X-fv1.nc').as_posix()
+        shutil.copy(cls.paths[0], cls.bad_path)
+
+    def setUp(self):
+        self.pds = self.new_tagger()
+
+    def tearDown(self):
+        self.pds.shutdown()
+
+    def test_order(self):
+        expected = [self.pds.get_file_tags(path) for path in self.paths]
+
+        for workers in (0, 4):
+            with self.subTest(workers=workers):
+                results = list(self.pds.get_files_tags(self.paths, workers=workers))
+
+                self.assertEqual([path for path, _ in results], self.paths)
+                self.assertEqual([tagged for _, tagged in results], expected)
+
+    def test_read_error(self):
+        paths = self.paths[:5] + [self.bad_path] + self.paths[5:10]
+
+        with self.assertRaises(IndexError):
+            self.pds.get_file_tags(self.bad_path)
+
+        for workers in (0, 4):
+            with self.subTest(workers=workers):
+                results = list(self.pds.get_files_tags(paths, workers=workers))
+
+                self.assertEqual([path for path, _ in results], paths)
+                self.assertEqual(results[5][1], TaggedDataset(None, {}, {}))
+
+                for path, tagged in results[:5] + results[6:]:
+                    self.assertEqual(tagged, self.pds.get_file_tags(path))
+                    self.assertIsNotNone(tagged.drs)
+
+
+class TestDatasetCache(SyntheticArchiveTestCase, unittest.TestCase):
+
+    files = 12
+    datasets = 3
+
+    def setUp(self):
+        self.pds = self.new_tagger(dataset_cache_size=2)
+
+        # The first file from each dataset
+        self.paths = [self.dataset_paths[dataset][0] for dataset in self.manifest['datasets']]
+
+    def test_eviction(self):
+        first, second, third = self.paths
+
+        dataset = self.pds.get_file_dataset(first)
+        self.pds.get_file_dataset(second)
+
+        # Using the first dataset again makes the second the oldest, so it
+        # is evicted by the third
+        self.assertIs(self.pds.get_file_dataset(first), dataset)
+        self.pds.get_file_dataset(third)
+
+        # Then the first is the oldest
+        self.pds.get_file_dataset(second)
+        self.assertIsNot(self.pds.get_file_dataset(first), dataset)
+
+        self.assertEqual(self.pds.cache_info(), {
+            'dataset_ids': CacheInfo(hits=3, misses=3, size=3),
+            'datasets': CacheInfo(hits=1, misses=5, size=2),
+        })
+
+    def test_clear_caches(self):
+        for path in self.paths:
+            self.pds.get_file_tags(path)
+
+        dataset = self.pds.get_file_dataset(self.paths[-1])
+        self.pds.clear_caches()
+
+        # The statistics are kept
+        self.assertEqual(self.pds.cache_info(), {
+            'dataset_ids': CacheInfo(hits=1, misses=3, size=0),
+            'datasets': CacheInfo(hits=1, misses=3, size=0),
+        })
+        self.assertIsNot(self.pds.get_file_dataset(self.paths[-1]), dataset)
+
+    def test_reload_mappings(self):
+        dataset = self.pds.get_file_dataset(self.paths[0])
+        tagged = self.pds.get_file_tags(self.paths[0])
+
+        self.pds.reload_mappings()
+
+        info = self.pds.cache_info()
+        self.assertEqual(info['dataset_ids'].size, 0)
+        self.assertEqual(info['datasets'].size, 0)
+
+        self.assertIsNot(self.pds.get_file_dataset(self.paths[0]), dataset)
+        self.assertEqual(self.pds.get_file_tags(self.paths[0]), tagged)
+
+
+@unittest.skipUnless(os.path.exists('/proc/self/maps'), 'needs /proc to list open files')
+class TestShutdown(SyntheticArchiveTestCase, unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    @staticmethod
+    def open_paths():
+        """
+        Files held open by the process, including memory maps
+        """
+        paths = set()
+
+        for fd in os.listdir('/proc/self/fd'):
+            try:
+                paths.add(os.readlink(f'/proc/self/fd/{fd}'))
+            except OSError:
+                pass
+
+        with open('/proc/self/maps') as reader:
+            paths.update(line.split(None, 5)[-1].strip() for line in reader)
+
+        return paths
+
+    def test_attribute_index_closed(self):
+        path = self.dataset_paths[self.manifest['datasets'][0]][0]
+
+        ndjson = os.path.join(self.tmpdir.name, 'index.ndjson')
+        with open(ndjson, 'w') as writer:
+            writer.write(json.dumps({'path': path, 'attributes': {'platform': 'ENVISAT'}}) + '\n')
+
+        sqlite = os.path.join(self.tmpdir.name, 'index.sqlite')
+        with sqlite3.connect(sqlite) as db:
+            db.execute('CREATE TABLE attributes (path TEXT PRIMARY KEY, attributes TEXT)')
+        db.close()
+
+        for index in (ndjson, sqlite):
+            with self.subTest(index=os.path.basename(index)):
+                pds = self.new_tagger(attribute_index=index)
+                pds.get_file_tags(path)
+                self.assertIn(index, self.open_paths())
+
+                pds.shutdown()
+                self.assertNotIn(index, self.open_paths())
+
+
+class RenderingMetrics(Metrics):
+    """
+    Renders the metrics after each file of the first dataset
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.rendered = []
+
+    def observe_file(self, seconds):
+        super().observe_file(seconds)
+
+        if not self.get('datasets_processed_total'):
+            self.rendered.append(self.render())
+
+
+class TestCacheMetrics(SyntheticArchiveTestCase, unittest.TestCase):
+
+    files = 30
+    datasets = 3
+
+    def test_collected(self):
+        metrics = RenderingMetrics()
+        self.new_tagger(metrics=metrics).process_datasets(self.manifest['datasets'])
+
+        # Hits are counted while the first dataset is processed
+        self.assertIn('cci_tagger_cache_hits_total{cache="uris"}', metrics.rendered[-1])
+        self.assertNotIn('cci_tagger_cache_hits_total{cache="uris"} 0\n', metrics.rendered[-1])
+
+        expected = {}
+        pds = self.new_tagger()
+
+        for dataset_id in self.manifest['datasets']:
+            dataset = pds.get_dataset(dataset_id)
+            dataset.process_dataset()
+
+            for cache, info in dataset.cache_info().items():
+                counts = expected.setdefault(cache, [0, 0])
+                counts[0] += info.hits
+                counts[1] += info.misses
+
+        rendered = metrics.render()
+
+        for cache, (hits, misses) in expected.items():
+            self.assertIn(f'cci_tagger_cache_hits_total{{cache="{cache}"}} {hits}\n', rendered)
+            self.assertIn(f'cci_tagger_cache_misses_total{{cache="{cache}"}} {misses}\n', rendered)
+
+
+class TestFilesDiscovered(SyntheticArchiveTestCase, unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        # Half of the files are in an archive
+        dataset = cls.manifest['datasets'][0]
+        with zipfile.ZipFile(os.path.join(dataset, 'bundle.zip'), 'w') as writer:
+            for path in cls.dataset_paths[dataset][:5]:
+                writer.write(path, arcname=os.path.relpath(path, dataset))
+                os.remove(path)
+
+    def test_archive_members(self):
+        options = [{}, {'columnar': True}, {'pipeline_workers': {'read': 2}}]
+
+        for kwargs in options:
+            with self.subTest(**kwargs):
+                metrics = Metrics()
+                self.new_tagger(metrics=metrics, **kwargs).process_datasets(self.manifest['datasets'])
+
+                # Each member is counted, not the archive
+                self.assertEqual(metrics.get('files_discovered_total'), self.files)
+                self.assertEqual(metrics.get('files_scanned_total'), self.files)
+
+
+class CountingProcessDatasets(ProcessDatasets):
+    """
+    Records the largest number of files tagged at once
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.running = 0
+        self.max_running = 0
+        self.count_lock = threading.Lock()
+
+    def get_file_tags(self, fpath):
+        with self.count_lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+
+        try:
+            # Give the other threads a chance to start
+            time.sleep(0.005)
+            return super().get_file_tags(fpath)
+        finally:
+            with self.count_lock:
+                self.running -= 1
+
+
+class TestAsync(SyntheticArchiveTestCase, unittest.TestCase):
+
+    files = 30
+    datasets = 3
+
+    def setUp(self):
+        self.paths = self.all_paths()
+        self.pds = self.new_tagger(CountingProcessDatasets, async_concurrency=3)
+        self.expected = [self.pds.get_file_tags(path) for path in self.paths]
+        self.pds.max_running = 0
+
+    def tearDown(self):
+        self.pds.shutdown()
+
+    def test_aget_file_tags(self):
+        async def tag():
+            return await asyncio.gather(*(self.pds.aget_file_tags(path) for path in self.paths))
+
+        self.assertEqual(asyncio.run(tag()), self.expected)
+        self.assertLessEqual(self.pds.max_running, 3)
+        self.assertGreater(self.pds.max_running, 1)
+
+    def test_aget_files_tags(self):
+        async def iter_paths():
+            for path in self.paths:
+                yield path
+
+        async def tag(fpaths):
+            return [result async for result in self.pds.aget_files_tags(fpaths)]
+
+        for fpaths in (self.paths, iter_paths()):
+            results = asyncio.run(tag(fpaths))
+
+            self.assertEqual([path for path, _ in results], self.paths)
+            self.assertEqual([tagged for _, tagged in results], self.expected)
+
+        self.assertLessEqual(self.pds.max_running, 3)
+        self.assertGreater(self.pds.max_running, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
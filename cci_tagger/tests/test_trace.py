@@ -0,0 +1,179 @@
+# encoding: utf-8
+"""
+Tests for the Chrome trace of file tagging
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+import json
+import os
+import pathlib
+import tempfile
+import threading
+import time
+import unittest
+
+from cci_tagger.dataset.dataset import Dataset
+from cci_tagger.tests.archive import SyntheticArchiveTestCase
+from cci_tagger.utils.trace import Tracer, NullTracer
+
+
+class TestTracer(unittest.TestCase):
+
+    def test_spans(self):
+        tracer = Tracer()
+
+        with tracer.span('file', 'ds', pathlib.Path('/data/a.nc')):
+            with tracer.span('open', 'ds', '/data/a.nc'):
+                pass
+
+        with tracer.span('dataset', 'ds'):
+            pass
+
+        events = [event for event in tracer.trace_events() if event['ph'] == 'X']
+
+        self.assertEqual([event['name'] for event in events], ['open', 'file', 'dataset'])
+        self.assertEqual(events[1]['args'], {'dataset': 'ds', 'path': '/data/a.nc'})
+        self.assertEqual(events[2]['cat'], 'run')
+
+        # The child span is inside the parent
+        open_span, file_span = events[0], events[1]
+        self.assertGreaterEqual(open_span['ts'], file_span['ts'])
+        self.assertLessEqual(open_span['ts'] + open_span['dur'], file_span['ts'] + file_span['dur'])
+
+    def test_sampling(self):
+        tracer = Tracer(sample_rate=0.1)
+        paths = [f'/data/{i}.nc' for i in range(1000)]
+
+        for path in paths:
+            with tracer.span('open', 'ds', path):
+                pass
+
+        sampled = {event['args']['path'] for event in tracer.trace_events() if event['ph'] == 'X'}
+
+        # The same files are sampled each time
+        self.assertEqual(sampled, {path for path in paths if tracer.is_sampled(path)})
+        self.assertTrue(50 < len(sampled) < 150)
+
+        with self.assertRaises(ValueError):
+            Tracer(sample_rate=2)
+
+    def test_thread_names(self):
+        tracer = Tracer()
+
+        def work():
+            with tracer.span('read', 'ds', '/data/a.nc'):
+                pass
+
+        thread = threading.Thread(target=work, name='pipeline-read')
+        thread.start()
+        thread.join()
+
+        names = [event['args']['name'] for event in tracer.trace_events() if event['ph'] == 'M']
+        self.assertEqual(names, ['pipeline-read'])
+
+    def test_write(self):
+        tracer = Tracer()
+
+        with tracer.span('open', 'ds', '/data/a.nc'):
+            pass
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'trace.json')
+            tracer.write(path)
+
+            with open(path) as reader:
+                trace = json.load(reader)
+
+        self.assertEqual(len(trace['traceEvents']), 2)
+        self.assertEqual(tracer.span_count, 1)
+
+    def test_record(self):
+        tracer = Tracer()
+        start = time.perf_counter()
+
+        def work():
+            tracer.record('file', start, 'ds', pathlib.Path('/data/a.nc'))
+
+        thread = threading.Thread(target=work)
+        thread.start()
+        thread.join()
+
+        begin, end = tracer.trace_events()
+
+        self.assertEqual((begin['ph'], end['ph']), ('b', 'e'))
+        self.assertEqual(begin['id'], end['id'])
+        self.assertEqual(begin['args'], {'dataset': 'ds', 'path': '/data/a.nc'})
+        self.assertLessEqual(begin['ts'], end['ts'])
+
+        tracer = Tracer(sample_rate=0.1)
+        paths = [f'/data/{i}.nc' for i in range(1000)]
+
+        for path in paths:
+            tracer.record('file', start, 'ds', path)
+
+        self.assertEqual(tracer.span_count, len([path for path in paths if tracer.is_sampled(path)]))
+
+    def test_null_tracer(self):
+        with NullTracer().span('open', 'ds', '/data/a.nc'):
+            pass
+
+        NullTracer().record('file', time.perf_counter(), 'ds', '/data/a.nc')
+
+
+class TestDatasetSpans(SyntheticArchiveTestCase, unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.dataset = cls.manifest['datasets'][0]
+        cls.facets = cls.load_facets()
+        cls.mappings = cls.load_mappings()
+
+    def trace(self, **kwargs):
+        tracer = Tracer()
+        Dataset(self.dataset, self.mappings, self.facets, tracer=tracer, **kwargs).process_dataset()
+
+        spans = {}
+        for event in tracer.trace_events():
+            if event['ph'] != 'M':
+                spans.setdefault((event['name'], event['args']['path']), []).append(event)
+
+        return spans
+
+    def assertInside(self, child, parent):
+        self.assertGreaterEqual(child['ts'], parent['ts'])
+        self.assertLessEqual(child['ts'] + child['dur'], parent['ts'] + parent['dur'])
+
+    def test_columnar(self):
+        spans = self.trace(columnar=True)
+
+        for path in self.dataset_paths[self.dataset]:
+            [file_span] = spans['file', path]
+            [drs_span] = spans['drs', path]
+
+            self.assertEqual(drs_span['tid'], file_span['tid'])
+            self.assertInside(drs_span, file_span)
+
+    def test_pipeline(self):
+        for columnar in (False, True):
+            with self.subTest(columnar=columnar):
+                spans = self.trace(columnar=columnar, pipeline_workers={'read': 2})
+
+                for path in self.dataset_paths[self.dataset]:
+                    begin, end = spans['file', path]
+                    file_span = dict(begin, dur=end['ts'] - begin['ts'])
+
+                    self.assertEqual((begin['ph'], end['ph']), ('b', 'e'))
+
+                    for name in ('open', 'resolve', 'drs'):
+                        for child in spans[name, path]:
+                            self.assertInside(child, file_span)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+# encoding: utf-8
+"""
+Tests for recording and replaying the vocab server requests
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from rdflib import Dataset, Graph, Literal, URIRef
+from rdflib.namespace import SKOS
+
+from cci_tagger.benchmarks import synthetic
+from cci_tagger.facets import Facets
+from cci_tagger.triple_store import TripleStore
+from cci_tagger.vocab_transport import GraphTransport, RecordingTransport, ReplayTransport, ReplayError
+
+SCHEME = 'http://vocab.ceda.ac.uk/scheme/cci/sensor'
+AATSR = 'http://vocab.ceda.ac.uk/collection/cci/sensor/aatsr'
+NERC = 'http://vocab.nerc.ac.uk/collection/L22/current/TOOL0001/'
+
+
+class BytesGraph(Graph):
+    """
+    Serializes to bytes, as rdflib did before 6.0
+    """
+
+    def serialize(self, *args, **kwargs):
+        data = super().serialize(*args, **kwargs)
+        return data.encode('utf-8') if isinstance(data, str) else data
+
+
+class BytesGraphTransport(GraphTransport):
+
+    def fetch_document(self, uri):
+        document = BytesGraph()
+        document += super().fetch_document(uri)
+        return document
+
+
+class TestVocabTransport(unittest.TestCase):
+
+    def setUp(self):
+        dataset = Dataset()
+        graph = dataset.graph(URIRef('http://vocab.ceda.ac.uk/graph'))
+        graph.add((URIRef(AATSR), SKOS.inScheme, URIRef(SCHEME)))
+        graph.add((URIRef(AATSR), SKOS.prefLabel, Literal('AATSR')))
+        graph.add((URIRef(NERC), SKOS.altLabel, Literal('MERIS')))
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.fixture = os.path.join(self.tmpdir.name, 'fixture.json.gz')
+
+        self.recorder = RecordingTransport(self.fixture, GraphTransport(dataset))
+        self.previous = TripleStore.set_transport(self.recorder)
+
+    def tearDown(self):
+        TripleStore.set_transport(self.previous)
+        self.tmpdir.cleanup()
+
+    def record(self):
+        concepts = TripleStore.get_concepts_in_scheme(SCHEME)
+        label = TripleStore.get_pref_label(NERC)
+        self.recorder.save()
+
+        return concepts, label
+
+    def test_replay(self):
+        concepts, label = self.record()
+        TripleStore.set_transport(ReplayTransport(self.fixture))
+
+        replayed = TripleStore.get_concepts_in_scheme(SCHEME)
+
+        self.assertEqual(replayed['aatsr'].uri, AATSR)
+        self.assertEqual(replayed['aatsr'].tag, concepts['aatsr'].tag)
+        self.assertEqual(TripleStore.get_pref_label(NERC), label)
+        self.assertEqual(label, 'MERIS')
+
+    def test_document(self):
+        for transport in (self.recorder.transport, BytesGraphTransport(self.recorder.transport.graph)):
+            with self.subTest(transport=type(transport).__name__):
+                recorder = RecordingTransport(self.fixture, transport)
+                TripleStore.set_transport(recorder)
+
+                self.assertEqual(TripleStore.get_alt_label(NERC), '')
+                self.assertEqual(TripleStore.get_pref_label(NERC), 'MERIS')
+                recorder.save()
+
+                # The document is stored as text, which can be written as JSON
+                self.assertIsInstance(recorder.documents[NERC]['data'], str)
+
+                TripleStore.set_transport(ReplayTransport(self.fixture))
+                graph = TripleStore.transport.fetch_document(NERC)
+
+                self.assertEqual(set(graph), set(transport.fetch_document(NERC)))
+
+    def test_missing_query(self):
+        self.record()
+        TripleStore.set_transport(ReplayTransport(self.fixture))
+
+        with self.assertRaises(ReplayError):
+            TripleStore.get_alt_concepts_in_scheme(SCHEME)
+
+    def test_simulated_latency(self):
+        self.record()
+
+        # Give the query a recorded time long enough to measure
+        statement = next(iter(self.recorder.queries))
+        self.recorder.queries[statement]['seconds'] = 0.1
+        self.recorder.save()
+
+        transport = ReplayTransport(self.fixture, simulate_latency=True, latency_scale=0.5)
+
+        start = time.perf_counter()
+        transport.query(statement)
+        self.assertGreaterEqual(time.perf_counter() - start, 0.05)
+
+    def test_facets(self):
+        fixture = synthetic.write_vocab_fixture(os.path.join(self.tmpdir.name, 'synthetic.json'))
+        TripleStore.set_transport(ReplayTransport(fixture))
+
+        facets = Facets()
+
+        self.assertEqual(json.loads(json.dumps(facets.to_json())), synthetic.build_vocab())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -29,12 +29,11 @@ SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 '''
 
-from rdflib import ConjunctiveGraph, Graph
-from rdflib.plugins.stores.sparqlstore import SPARQLStore
 from six import with_metaclass
 from builtins import str
+import threading
 
-from cci_tagger.conf.settings import SPARQL_HOST_NAME
+from cci_tagger.vocab_transport import LiveTransport
 
 
 class Concept:
@@ -57,6 +56,16 @@ class Concept:
             'tag': self.tag
         }
 
+    # __dict__ is replaced by the method above, so pickle needs to be told
+    # how to save and restore the attributes. Used to send Facets to
+    # worker processes
+    def __getstate__(self):
+        return self.__dict__()
+
+    def __setstate__(self, state):
+        self.uri = state['uri']
+        self.tag = state['tag']
+
 
 class TripleStoreMC(type):
     """
@@ -64,8 +73,9 @@ class TripleStoreMC(type):
 
     """
 
-    # an instance of a ConjunctiveGraph
-    __graph = None
+    # Sends the queries and fetches the NERC documents. Replaced with
+    # set_transport to record or replay the requests
+    transport = LiveTransport()
 
     # This allows us to use the prefix values in the queries rather than the
     # url
@@ -78,17 +88,59 @@ class TripleStoreMC(type):
     __alt_label_cache = {}
     __pref_label_cache = {}
 
-    @property
-    def _graph(self):
+    # Number of SPARQL queries sent to the vocab server and NERC documents
+    # fetched. Counted under the lock as the queries can come from more than
+    # one thread
+    query_count = 0
+    document_count = 0
+    _count_lock = threading.Lock()
+
+    @classmethod
+    def set_transport(cls, transport):
         """
-        Get the graph, creating a new one if necessary.
+        Set the transport used for the queries and documents. The cached
+        labels are cleared as they may have come from another source.
 
+        @param transport: LiveTransport, RecordingTransport or
+                ReplayTransport
+
+        @return the previous transport
         """
-        if self.__graph is None:
-            store = SPARQLStore(
-                endpoint='http://%s/sparql' % (SPARQL_HOST_NAME))
-            self.__graph = ConjunctiveGraph(store=store)
-        return self.__graph
+        previous = cls.transport
+        cls.transport = transport
+
+        cls.__alt_label_cache.clear()
+        cls.__pref_label_cache.clear()
+
+        return previous
+
+    @classmethod
+    def _query(cls, statement):
+        """
+        Run a SPARQL query against the vocab server
+
+        @param statement (str): the SPARQL query
+
+        @return the query results
+        """
+        with cls._count_lock:
+            cls.query_count += 1
+
+        return cls.transport.query(statement)
+
+    @classmethod
+    def _fetch_document(cls, uri):
+        """
+        Fetch the RDF document for a concept hosted by NERC
+
+        @param uri (str): the uri of the concept
+
+        @return a Graph holding the document
+        """
+        with cls._count_lock:
+            cls.document_count += 1
+
+        return cls.transport.fetch_document(uri)
 
     @classmethod
     def get_concepts_in_scheme(cls, uri):
@@ -103,11 +155,10 @@ class TripleStoreMC(type):
                 value = uri of the concept
 
         """
-        graph = TripleStore._graph
         statement = ('%s SELECT ?concept ?label WHERE { GRAPH ?g {?concept '
                      'skos:inScheme <%s> . ?concept skos:prefLabel ?label} }' %
                      (cls.__prefix, uri))
-        result_set = graph.query(statement)
+        result_set = cls._query(statement)
 
         concepts = {}
         for result in result_set:
@@ -128,12 +179,11 @@ class TripleStoreMC(type):
                 value = uri of the concept
 
         """
-        graph = TripleStore._graph
         statement = (
                 '%s SELECT ?concept WHERE { GRAPH ?g {?concept skos:inScheme <%s> '
                 'FILTER regex(str(?concept), "^http://vocab.nerc.ac.uk", "i")}}' %
                 (cls.__prefix, uri))
-        result_set = graph.query(statement)
+        result_set = cls._query(statement)
         concepts = {}
 
         for result in result_set:
@@ -156,11 +206,10 @@ class TripleStoreMC(type):
                 value = uri of the concept
 
         """
-        graph = TripleStore._graph
         statement = ('%s SELECT ?concept ?label WHERE { GRAPH ?g {?concept '
                      'skos:inScheme <%s> . ?concept skos:altLabel ?label} }' %
                      (cls.__prefix, uri))
-        result_set = graph.query(statement)
+        result_set = cls._query(statement)
 
         concepts = {}
         for result in result_set:
@@ -181,12 +230,11 @@ class TripleStoreMC(type):
                 value = uri of the concept
 
         """
-        graph = TripleStore._graph
         statement = (
                 '%s SELECT ?concept WHERE { GRAPH ?g {?concept skos:inScheme <%s> '
                 'FILTER regex(str(?concept), "^http://vocab.nerc.ac.uk", "i")}}' %
                 (cls.__prefix, uri))
-        result_set = graph.query(statement)
+        result_set = cls._query(statement)
 
         concepts = {}
         for result in result_set:
@@ -221,10 +269,9 @@ class TripleStoreMC(type):
 
     @classmethod
     def _get_ceda_pref_label(cls, uri):
-        graph = TripleStore._graph
         statement = ('%s SELECT ?label WHERE { GRAPH ?g {<%s> skos:prefLabel '
                      '?label} }' % (cls.__prefix, uri))
-        results = graph.query(statement)
+        results = cls._query(statement)
 
         # there should only be one result
         for resource in results:
@@ -236,15 +283,14 @@ class TripleStoreMC(type):
 
     @classmethod
     def _get_nerc_pref_label(cls, uri):
-        graph = Graph()
-        graph.parse(location=uri, format='application/rdf+xml')
+        graph = cls._fetch_document(uri)
         statement = ('%s SELECT ?label WHERE {<%s> skos:altLabel ?label}' %
                      (cls.__prefix, uri))
         results = graph.query(statement)
 
         # there should only be one result
         for resource in results:
-            label = resource.label.strip().replace(u'\xa0', u' ').toPython()
+            label = str(resource.label).strip().replace(u'\xa0', u' ')
             cls.__pref_label_cache[uri] = label
             return label
 
@@ -276,10 +322,9 @@ class TripleStoreMC(type):
 
     @classmethod
     def _get_ceda_alt_label(cls, uri):
-        graph = TripleStore._graph
         statement = ('%s SELECT ?label WHERE { GRAPH ?g {<%s> skos:altLabel '
                      '?label} }' % (cls.__prefix, uri))
-        results = graph.query(statement)
+        results = cls._query(statement)
 
         # there should only be one result
         for resource in results:
@@ -291,15 +336,14 @@ class TripleStoreMC(type):
 
     @classmethod
     def _get_nerc_alt_label(cls, uri):
-        graph = Graph()
-        graph.parse(location=uri, format='application/rdf+xml')
+        graph = cls._fetch_document(uri)
         statement = ('%s SELECT ?label WHERE {<%s> skos:prefLabel ?label}' %
                      (cls.__prefix, uri))
         results = graph.query(statement)
 
         # there should only be one result
         for resource in results:
-            label = resource.label.strip().replace(u'\xa0', u' ').toPython()
+            label = str(resource.label).strip().replace(u'\xa0', u' ')
             cls.__alt_label_cache[uri] = label
             return label
 
@@ -318,11 +362,10 @@ class TripleStoreMC(type):
                 [1] = uri of the concept
 
         """
-        graph = TripleStore._graph
         statement = ('%s SELECT ?concept ?label WHERE { GRAPH ?g {?concept '
                      'skos:narrower <%s> . ?concept skos:prefLabel ?label} }' %
                      (cls.__prefix, uri))
-        results = graph.query(statement)
+        results = cls._query(statement)
 
         # there should only be one result
         for resource in results:
@@ -8,12 +8,14 @@ __copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
 __license__ = 'BSD - see LICENSE file in top-level package directory'
 __contact__ = 'richard.d.smith@stfc.ac.uk'
 
+from cci_tagger.object_store import ObjectStorePath
 from functools import wraps
 import pathlib
 
 def fpath_as_pathlib(path_arg):
     """
-    Decorator function to make sure that supplied file path is a pathlib.Path object
+    Decorator function to make sure that supplied file path is a pathlib.Path object.
+    Paths in object storage (s3://) are converted to ObjectStorePath objects
     :param f:
     :return:
     """
@@ -25,7 +27,10 @@ def fpath_as_pathlib(path_arg):
             path_var = f_kwargs.get(path_arg)
 
             # Convert to path object if not already
-            if not isinstance(path_var,pathlib.Path):
+            if ObjectStorePath.is_uri(path_var):
+                f_kwargs[path_arg] = ObjectStorePath.from_uri(path_var)
+
+            elif not isinstance(path_var, pathlib.PurePath):
                 f_kwargs[path_arg] = pathlib.Path(path_var)
 
             return f(*f_args, **f_kwargs)
@@ -0,0 +1,210 @@
+# encoding: utf-8
+"""
+Memory report for a tagging run. Allocations are traced with tracemalloc
+and a snapshot is taken before and after each dataset. For each dataset the
+report has the peak of the memory allocated while it was processed, the
+memory still held afterwards and the lines of code which allocated it, along
+with the RSS of the process.
+
+Memory held afterwards includes anything kept for the rest of the run, such
+as the file map used to write esgf_drs.json, the URI bitsets and the caches.
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+from contextlib import contextmanager
+import json
+import sys
+import tracemalloc
+import logging
+import verboselogs
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+verboselogs.install()
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# Allocations made by the snapshots and the import system are left out
+EXCLUDE = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+
+def current_rss():
+    """
+    :return: Resident set size of the process in bytes | None if not known
+    """
+    try:
+        with open('/proc/self/statm') as reader:
+            pages = int(reader.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return
+
+    return pages * resource.getpagesize() if resource is not None else None
+
+
+def peak_rss():
+    """
+    :return: Largest resident set size of the process so far in bytes | None if not known
+    """
+    if resource is None:
+        return
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class DatasetMemoryReporter(object):
+    """
+    Tracing allocations slows the run down, so this is for finding where
+    memory goes rather than for production runs.
+
+    Before Python 3.9 the traced peak cannot be reset, so the peak for a
+    dataset is only known when it is higher than any earlier peak in the
+    run. Otherwise the larger of the memory traced before and after the
+    dataset is reported.
+    """
+
+    # tracemalloc.reset_peak was added in Python 3.9
+    reset_peak = hasattr(tracemalloc, 'reset_peak')
+
+    def __init__(self, budget=None, top=10, frames=1):
+        """
+        :param budget: Warn when the memory allocated while processing a dataset goes over this (bytes)
+        :param top: Number of allocation sites reported for each dataset
+        :param frames: Number of frames stored for each allocation. More frames show the callers
+        """
+        self.budget = budget
+        self.top = top
+        self.frames = frames
+
+        # Results for each dataset in the order they were processed
+        self.datasets = []
+
+    def start(self):
+        """
+        Start tracing allocations, if they are not traced already
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+
+        return self
+
+    def stop(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces(EXCLUDE)
+
+    def _top_sites(self, after, before):
+        """
+        Lines of code which allocated the memory still held after the dataset
+        """
+        key_type = 'traceback' if self.frames > 1 else 'lineno'
+        sites = []
+
+        for stat in after.compare_to(before, key_type)[:self.top]:
+            if stat.size_diff <= 0:
+                break
+
+            sites.append({
+                'site': [f'{frame.filename}:{frame.lineno}' for frame in stat.traceback],
+                'size': stat.size_diff,
+                'count': stat.count_diff
+            })
+
+        return sites
+
+    @contextmanager
+    def measure(self, dataset_id):
+        """
+        Snapshot the allocations before and after the block
+
+        :param dataset_id: Dataset id
+        """
+        self.start()
+
+        before = self._snapshot()
+        traced_before, peak_before = tracemalloc.get_traced_memory()
+
+        if self.reset_peak:
+            tracemalloc.reset_peak()
+
+        try:
+            yield
+        finally:
+            traced_after, traced_peak = tracemalloc.get_traced_memory()
+            after = self._snapshot()
+
+            if not self.reset_peak and traced_peak <= peak_before:
+                traced_peak = max(traced_before, traced_after)
+
+            result = {
+                'dataset': dataset_id,
+                'peak': traced_peak - traced_before,
+                'growth': traced_after - traced_before,
+                'rss': current_rss(),
+                'peak_rss': peak_rss(),
+                'top': self._top_sites(after, before),
+                'over_budget': False
+            }
+
+            if self.budget is not None and result['peak'] > self.budget:
+                result['over_budget'] = True
+
+                top = result['top'][0]['site'][0] if result['top'] else 'unknown'
+                logger.warning(f'{dataset_id} allocated {result["peak"] / MB:.1f} MB, over the budget '
+                               f'of {self.budget / MB:.1f} MB. Largest allocation still held: {top}')
+
+            self.datasets.append(result)
+
+    def summary(self):
+        """
+        Table of the datasets, largest peak first, with the top allocation
+        sites of each
+
+        :return: str
+        """
+        if not self.datasets:
+            return 'No datasets measured'
+
+        def mb(value):
+            return f'{value / MB:.1f}' if value is not None else '-'
+
+        lines = [f'{"peak MB":>9} {"growth MB":>10} {"RSS MB":>8} {"max RSS MB":>11}  dataset']
+
+        for result in sorted(self.datasets, key=lambda result: result['peak'], reverse=True):
+            flag = '  OVER BUDGET' if result['over_budget'] else ''
+
+            lines.append(f'{mb(result["peak"]):>9} {mb(result["growth"]):>10} {mb(result["rss"]):>8} '
+                         f'{mb(result["peak_rss"]):>11}  {result["dataset"]}{flag}')
+
+            for site in result['top']:
+                lines.append(f'{"":>9} {site["size"] / 1024:>7.1f} KB  {site["count"]} blocks at {" <- ".join(site["site"])}')
+
+        return '\n'.join(lines)
+
+    def write_json(self, path):
+        report = {
+            'budget': self.budget,
+            'peak_rss': peak_rss(),
+            'datasets': self.datasets
+        }
+
+        with open(path, 'w') as writer:
+            json.dump(report, writer, indent=4)
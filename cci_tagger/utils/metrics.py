@@ -0,0 +1,299 @@
+# encoding: utf-8
+"""
+Live counters for a tagging run. The metrics can be written periodically in
+the Prometheus textfile format, for the node exporter textfile collector,
+and shown as a progress line with an ETA.
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+import bisect
+import os
+import sys
+import threading
+import time
+import logging
+import verboselogs
+
+verboselogs.install()
+logger = logging.getLogger(__name__)
+
+PREFIX = 'cci_tagger'
+
+# Upper bounds of the buckets for the time taken to tag a file (seconds)
+FILE_SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60)
+
+HELP = {
+    'files_discovered_total': ('counter', 'Files found in the datasets'),
+    'files_scanned_total': ('counter', 'Files tagged'),
+    'files_per_second': ('gauge', 'Files tagged per second since the start of the run'),
+    'datasets_processed_total': ('counter', 'Datasets processed'),
+    'terms_not_found_total': ('counter', 'Distinct terms not found in the vocabulary'),
+    'cache_hits_total': ('counter', 'Cache hits'),
+    'cache_misses_total': ('counter', 'Cache misses'),
+    'cache_hit_ratio': ('gauge', 'Cache hits as a fraction of lookups'),
+    'vocab_queries_total': ('counter', 'SPARQL queries sent to the vocab server'),
+    'vocab_documents_total': ('counter', 'Concept documents fetched from NERC'),
+    'start_time_seconds': ('gauge', 'Unix time the run started'),
+    'last_update_time_seconds': ('gauge', 'Unix time the metrics were last written'),
+    'file_seconds': ('histogram', 'Time taken to tag a file'),
+}
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels) + '}'
+
+
+class NullMetrics(object):
+    """
+    Metrics used when metrics are switched off. Does nothing.
+    """
+
+    def inc(self, name, value=1, **labels):
+        pass
+
+    def observe_file(self, seconds):
+        pass
+
+
+class Metrics(object):
+    """
+    Counters and the file latency histogram. Can be shared between threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._buckets = [0] * (len(FILE_SECONDS_BUCKETS) + 1)
+        self._seconds_sum = 0
+        self._collectors = []
+
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+
+    def inc(self, name, value=1, **labels):
+        """
+        :param name: Counter name without the prefix e.g. files_scanned_total
+        :param value: Amount to add
+        :param labels: Prometheus labels
+        """
+        key = (name, tuple(sorted(labels.items())))
+
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def get(self, name, **labels):
+        return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def observe_file(self, seconds):
+        """
+        Record a file being tagged
+
+        :param seconds: Time taken to tag the file
+        """
+        index = bisect.bisect_left(FILE_SECONDS_BUCKETS, seconds)
+
+        with self._lock:
+            self._buckets[index] += 1
+            self._seconds_sum += seconds
+            key = ('files_scanned_total', ())
+            self._counters[key] = self._counters.get(key, 0) + 1
+
+    def add_collector(self, collector):
+        """
+        Add a function called when the metrics are rendered. Used for values
+        which are counted elsewhere.
+
+        :param collector: Callable returning {name: value}. The value can be
+        a list of (labels, value) for a metric with labels
+        """
+        self._collectors.append(collector)
+
+    def elapsed(self):
+        return time.perf_counter() - self._started
+
+    def files_per_second(self):
+        elapsed = self.elapsed()
+        return self.get('files_scanned_total') / elapsed if elapsed else 0
+
+    def _samples(self):
+        """
+        :return: {name: [(labels, value)]}
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            buckets = list(self._buckets)
+            seconds_sum = self._seconds_sum
+
+        for collector in self._collectors:
+            for name, value in collector().items():
+                if isinstance(value, list):
+                    for labels, labelled_value in value:
+                        counters[(name, tuple(sorted(labels.items())))] = labelled_value
+                else:
+                    counters[(name, ())] = value
+
+        counters[('files_per_second', ())] = self.files_per_second()
+        counters[('start_time_seconds', ())] = self.start_time
+        counters[('last_update_time_seconds', ())] = time.time()
+
+        # Hit ratio for each cache
+        caches = {labels for name, labels in counters if name == 'cache_hits_total'}
+        for labels in caches:
+            hits = counters.get(('cache_hits_total', labels), 0)
+            lookups = hits + counters.get(('cache_misses_total', labels), 0)
+            counters[('cache_hit_ratio', labels)] = hits / lookups if lookups else 0
+
+        samples = {}
+        for (name, labels), value in sorted(counters.items()):
+            samples.setdefault(name, []).append((labels, value))
+
+        # Prometheus histogram buckets are cumulative
+        cumulative = 0
+        histogram = []
+        for bound, count in zip(FILE_SECONDS_BUCKETS + ('+Inf',), buckets):
+            cumulative += count
+            histogram.append(((('le', bound),), cumulative))
+
+        samples['file_seconds'] = histogram
+        samples['file_seconds_sum'] = [((), seconds_sum)]
+        samples['file_seconds_count'] = [((), cumulative)]
+
+        return samples
+
+    def render(self):
+        """
+        :return: Metrics in the Prometheus text format (str)
+        """
+        lines = []
+        samples = self._samples()
+
+        for name, values in samples.items():
+            metric = f'{PREFIX}_{name}'
+
+            if name in HELP:
+                metric_type, description = HELP[name]
+                lines.append(f'# HELP {metric} {description}')
+                lines.append(f'# TYPE {metric} {metric_type}')
+
+            # The histogram buckets have a suffix
+            if name == 'file_seconds':
+                metric = f'{metric}_bucket'
+
+            for labels, value in values:
+                lines.append(f'{metric}{_format_labels(labels)} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path):
+        """
+        Write the metrics to a file. The file is replaced in one step so the
+        collector never reads a partly written file.
+
+        :param path: Output file, should end in .prom
+        """
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+
+        with open(tmp_path, 'w') as writer:
+            writer.write(self.render())
+
+        os.replace(tmp_path, path)
+
+    def progress(self):
+        """
+        One line summary of the progress with an ETA based on the files
+        discovered so far
+
+        :return: str
+        """
+        discovered = self.get('files_discovered_total')
+        scanned = self.get('files_scanned_total')
+        rate = self.files_per_second()
+
+        line = f'{scanned}/{discovered} files, {rate:.1f} files/s'
+
+        if discovered:
+            line = f'{min(scanned / discovered, 1):6.1%} {line}'
+
+        if rate and discovered > scanned:
+            remaining = int((discovered - scanned) / rate)
+            hours, remainder = divmod(remaining, 3600)
+            minutes, seconds = divmod(remainder, 60)
+            line = f'{line}, ETA {hours:02d}:{minutes:02d}:{seconds:02d}'
+
+        return line
+
+
+class MetricsExporter(object):
+    """
+    Writes the metrics to a textfile and updates the progress line
+    periodically from a background thread.
+    """
+
+    def __init__(self, metrics, textfile=None, interval=15, progress=False, stream=None):
+        """
+        :param metrics: Metrics
+        :param textfile: Prometheus textfile to write
+        :param interval: Seconds between writing the textfile
+        :param progress: Show a progress line
+        :param stream: Stream for the progress line. Default: stderr
+        """
+        self.metrics = metrics
+        self.textfile = textfile
+        self.interval = interval
+        self.progress = progress
+        self.stream = stream or sys.stderr
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _write_textfile(self):
+        try:
+            self.metrics.write_textfile(self.textfile)
+        except OSError as e:
+            logger.warning(f'Could not write metrics to {self.textfile}: {e}')
+
+    def _write_progress(self, end=''):
+        self.stream.write(f'\r{self.metrics.progress()}{end}')
+        self.stream.flush()
+
+    def _run(self):
+        # The progress line is refreshed every second, the textfile at the interval
+        next_write = time.monotonic() + self.interval
+
+        while not self._stop.wait(1 if self.progress else self.interval):
+            if self.progress:
+                self._write_progress()
+
+            if self.textfile and time.monotonic() >= next_write:
+                self._write_textfile()
+                next_write = time.monotonic() + self.interval
+
+    def start(self):
+        if self.textfile:
+            self._write_textfile()
+
+        self._thread = threading.Thread(target=self._run, name='metrics-exporter', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop the background thread and write the final metrics
+        """
+        self._stop.set()
+
+        if self._thread is not None:
+            self._thread.join()
+
+        if self.textfile:
+            self._write_textfile()
+
+        if self.progress:
+            self._write_progress(end='\n')
@@ -0,0 +1,215 @@
+# encoding: utf-8
+"""
+Timing of the stages of a tagging run. Each timing is recorded against a
+stage and, optionally, the dataset being processed so the report can show
+where the time went in the whole run and in each dataset.
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+from array import array
+import json
+import threading
+import time
+
+PERCENTILES = (50, 90, 99)
+
+
+class _Timer(object):
+
+    __slots__ = ('recorder', 'stage', 'dataset', 'start')
+
+    def __init__(self, recorder, stage, dataset):
+        self.recorder = recorder
+        self.stage = stage
+        self.dataset = dataset
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.recorder.record(self.stage, time.perf_counter() - self.start, self.dataset)
+
+
+class _NullTimer(object):
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+class NullRecorder(object):
+    """
+    Recorder used when timing is switched off. Does nothing.
+    """
+
+    _timer = _NullTimer()
+
+    def timer(self, stage, dataset=None):
+        return self._timer
+
+    def record(self, stage, seconds, dataset=None):
+        pass
+
+    def iter_timed(self, stage, iterable, dataset=None):
+        return iterable
+
+
+class PerfRecorder(object):
+    """
+    Records the time taken by each stage. Can be shared between threads.
+
+        perf = PerfRecorder()
+
+        with perf.timer('open', dataset_id):
+            ...
+
+        perf.write_json('perf_report.json')
+    """
+
+    def __init__(self):
+        # Durations (seconds) for each (dataset, stage)
+        self._timings = {}
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+    def timer(self, stage, dataset=None):
+        """
+        Context manager which records the time taken by the block
+
+        :param stage: Name of the stage
+        :param dataset: Dataset id
+        """
+        return _Timer(self, stage, dataset)
+
+    def record(self, stage, seconds, dataset=None):
+        """
+        :param stage: Name of the stage
+        :param seconds: Time taken
+        :param dataset: Dataset id
+        """
+        key = (dataset, stage)
+
+        with self._lock:
+            timings = self._timings.get(key)
+
+            if timings is None:
+                timings = self._timings[key] = array('d')
+
+            timings.append(seconds)
+
+    def iter_timed(self, stage, iterable, dataset=None):
+        """
+        Iterate an iterable, recording the total time spent producing the
+        items as one timing. Used for lazy listings.
+
+        :param stage: Name of the stage
+        :param iterable: Iterable to time
+        :param dataset: Dataset id
+        :return: generator
+        """
+        elapsed = 0
+        iterator = iter(iterable)
+
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    elapsed += time.perf_counter() - start
+
+                yield item
+
+        finally:
+            self.record(stage, elapsed, dataset)
+
+    @staticmethod
+    def _summarise(timings):
+        # numpy is slow to import and only needed for the summary
+        import numpy as np
+
+        values = np.frombuffer(timings, dtype=np.float64)
+
+        summary = {
+            'count': len(values),
+            'total': float(values.sum()),
+            'mean': float(values.mean()),
+        }
+
+        for pct, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+            summary[f'p{pct}'] = float(value)
+
+        summary['max'] = float(values.max())
+
+        return summary
+
+    def summary(self, dataset=None):
+        """
+        Summary of the timings for each stage
+
+        :param dataset: Only include this dataset. Default: the whole run
+        :return: {stage: {'count', 'total', 'mean', 'p50', 'p90', 'p99', 'max'}}
+        """
+        with self._lock:
+            stages = {}
+            for (ds, stage), timings in self._timings.items():
+                if dataset is None or ds == dataset:
+                    stages.setdefault(stage, array('d')).extend(timings)
+
+        return {stage: self._summarise(timings) for stage, timings in stages.items()}
+
+    def datasets(self):
+        """
+        :return: Ids of the datasets with timings, in the order first seen
+        """
+        with self._lock:
+            return list(dict.fromkeys(ds for ds, _ in self._timings if ds is not None))
+
+    def report(self):
+        """
+        Machine readable report of the run
+
+        :return: {'wall_time', 'stages', 'datasets'}
+        """
+        return {
+            'wall_time': time.perf_counter() - self._started,
+            'stages': self.summary(),
+            'datasets': {ds: self.summary(ds) for ds in self.datasets()}
+        }
+
+    def write_json(self, path):
+        with open(path, 'w') as writer:
+            json.dump(self.report(), writer, indent=4)
+
+    def format_table(self):
+        """
+        Summary table for the whole run. Times are in milliseconds.
+
+        :return: str
+        """
+        report = self.report()
+        columns = ['count', 'total', 'mean'] + [f'p{pct}' for pct in PERCENTILES] + ['max']
+        stages = sorted(report['stages'].items(), key=lambda item: item[1]['total'], reverse=True)
+
+        width = max([len('stage')] + [len(stage) for stage, _ in stages])
+
+        lines = [f'{"stage":<{width}} ' + ' '.join(f'{column:>10}' for column in columns)]
+
+        for stage, summary in stages:
+            values = [f'{summary["count"]:>10}'] + [f'{summary[column] * 1000:>10.2f}' for column in columns[1:]]
+            lines.append(f'{stage:<{width}} ' + ' '.join(values))
+
+        lines.append(f'Wall time {report["wall_time"]:.2f}s. Times in ms')
+
+        return '\n'.join(lines)
@@ -0,0 +1,110 @@
+# encoding: utf-8
+"""
+Profile the processing of each dataset with cProfile. A profile is written
+for each dataset and the profiles are merged into a summary of the hottest
+functions in the run.
+
+The profiles can be read with pstats or a viewer such as snakeviz.
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+from contextlib import contextmanager
+import cProfile
+import io
+import os
+import re
+
+
+class DatasetProfiler(object):
+    """
+    Only the thread processing the dataset is profiled. With
+    pipeline_workers set, the work done in the pipeline threads is not
+    included.
+    """
+
+    def __init__(self, output_dir, top=30, sort='cumulative'):
+        """
+        :param output_dir: Directory for the profiles. Created if it does not exist
+        :param top: Number of functions in the summary
+        :param sort: pstats sort key for the summary e.g. cumulative, tottime
+        """
+        self.output_dir = output_dir
+        self.top = top
+        self.sort = sort
+
+        # Profile file for each dataset
+        self.profiles = {}
+
+        os.makedirs(output_dir, exist_ok=True)
+
+    def _profile_path(self, dataset_id):
+        name = re.sub(r'[^A-Za-z0-9_.-]+', '_', dataset_id).strip('_')
+        return os.path.join(self.output_dir, f'{len(self.profiles):04d}_{name}.prof')
+
+    @contextmanager
+    def profile(self, dataset_id):
+        """
+        Profile the block and write the profile for the dataset
+
+        :param dataset_id: Dataset id
+        """
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+        try:
+            yield profiler
+        finally:
+            profiler.disable()
+
+            path = self._profile_path(dataset_id)
+            profiler.dump_stats(path)
+            self.profiles[dataset_id] = path
+
+    def stats(self):
+        """
+        :return: pstats.Stats for all the datasets | None
+        """
+        if not self.profiles:
+            return
+
+        # pstats is slow to import and only needed at the end of the run
+        import pstats
+
+        stats = pstats.Stats(*self.profiles.values(), stream=io.StringIO())
+        stats.strip_dirs()
+
+        return stats
+
+    def summary(self):
+        """
+        Top functions from all the datasets
+
+        :return: str
+        """
+        stats = self.stats()
+
+        if stats is None:
+            return 'No datasets profiled'
+
+        stats.stream = io.StringIO()
+        stats.sort_stats(self.sort).print_stats(self.top)
+
+        return stats.stream.getvalue()
+
+    def write_summary(self, filename='summary.txt'):
+        """
+        Write the summary to the output directory
+
+        :param filename: Name of the summary file
+        :return: Path to the summary
+        """
+        path = os.path.join(self.output_dir, filename)
+
+        with open(path, 'w') as writer:
+            writer.write(self.summary())
+
+        return path
@@ -31,5 +31,55 @@ def get_file_subset(path_gen, max_number):
 
     return filelist
 
+
+def freeze_bag(bag):
+    """
+    Turn a bag of facet values into a hashable key. Collections are
+    sorted so that the key does not depend on the order of the values.
+    :param bag: dict of facet: str | list | set
+    :return: tuple
+    """
+    frozen = []
+    for facet, value in bag.items():
+        if isinstance(value, str):
+            frozen.append((facet, value))
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            frozen.append((facet, tuple(sorted(str(item) for item in value))))
+        else:
+            frozen.append((facet, str(value)))
+
+    return tuple(sorted(frozen))
+
+
+def copy_bag(bag):
+    """
+    Copy a bag of facet values, copying the collections so that the copy
+    can be changed without affecting the original.
+    :param bag: dict of facet: str | list | set
+    :return: dict
+    """
+    return {facet: value.copy() if isinstance(value, (list, set)) else value for facet, value in bag.items()}
+
+
 TaggedDataset = namedtuple('TaggedDataset', ['drs','labels','uris'])
 
+
+def tagged_dataset_as_dict(path, tagged):
+    """
+    Convert a TaggedDataset into a dictionary which can be written as JSON
+    :param path: Path to the file
+    :param tagged: TaggedDataset
+    :return: dict
+    """
+    return {
+        'path': str(path),
+        'drs': tagged.drs,
+        'labels': tagged.labels,
+        'uris': {
+            facet: sorted(values) if isinstance(values, (set, list)) else values
+            for facet, values in tagged.uris.items()
+        }
+    }
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'size'])
+
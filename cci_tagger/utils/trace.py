@@ -0,0 +1,220 @@
+# encoding: utf-8
+"""
+Spans for tagging individual files, written in the Chrome trace event
+format. The trace can be opened in Perfetto (https://ui.perfetto.dev) or
+chrome://tracing to find the files and directories which are slow to tag.
+
+Files are sampled by a hash of their path, so every span for a sampled file
+is recorded, whichever thread it runs in, and the same files are sampled in
+every run.
+
+Spans which start in one thread and end in another, such as a file passing
+through the stages of a pipeline, are recorded with explicit timestamps and
+written as async events, on a track of their own.
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+import json
+import os
+import pathlib
+import threading
+import time
+import zlib
+
+
+class _Span(object):
+
+    __slots__ = ('tracer', 'name', 'dataset', 'path', 'start')
+
+    def __init__(self, tracer, name, dataset, path):
+        self.tracer = tracer
+        self.name = name
+        self.dataset = dataset
+        self.path = path
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter()
+        thread_id = threading.get_ident()
+
+        # Worker threads may have finished by the time the trace is written
+        if thread_id not in self.tracer._thread_names:
+            self.tracer._thread_names[thread_id] = threading.current_thread().name
+
+        # Events are converted to JSON when written. list.append is atomic
+        self.tracer._events.append((self.name, self.start, end, thread_id, self.dataset, self.path))
+
+
+class _NullSpan(object):
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class NullTracer(object):
+    """
+    Tracer used when tracing is switched off. Does nothing.
+    """
+
+    def span(self, name, dataset=None, path=None):
+        return _NULL_SPAN
+
+    def record(self, name, start, dataset=None, path=None):
+        pass
+
+
+class Tracer(object):
+    """
+    Records spans for the files tagged. Can be shared between threads.
+
+        tracer = Tracer(sample_rate=0.01)
+
+        with tracer.span('open', dataset_id, path):
+            ...
+
+        tracer.write('trace.json')
+    """
+
+    def __init__(self, sample_rate=1.0):
+        """
+        :param sample_rate: Fraction of the files to record (0-1)
+        """
+        if not 0 <= sample_rate <= 1:
+            raise ValueError(f'Sample rate must be between 0 and 1: {sample_rate}')
+
+        self.sample_rate = sample_rate
+        self._threshold = int(sample_rate * 0xFFFFFFFF)
+        self._events = []
+        self._thread_names = {}
+        self._started = time.perf_counter()
+
+    def is_sampled(self, path):
+        """
+        :param path: Path to the file (str | pathlib.Path)
+        :return: bool
+        """
+        if self.sample_rate >= 1:
+            return True
+
+        if isinstance(path, pathlib.PurePath):
+            path = path.as_posix()
+
+        return zlib.crc32(path.encode('utf-8')) <= self._threshold
+
+    def span(self, name, dataset=None, path=None):
+        """
+        Context manager which records a span for the block. Spans for a file
+        which is not sampled are not recorded.
+
+        :param name: Name of the span e.g. open
+        :param dataset: Dataset id
+        :param path: Path to the file. Spans without a path are always recorded
+        """
+        if path is not None:
+            if not self.is_sampled(path):
+                return _NULL_SPAN
+
+            if isinstance(path, pathlib.PurePath):
+                path = path.as_posix()
+
+        return _Span(self, name, dataset, path)
+
+    def record(self, name, start, dataset=None, path=None):
+        """
+        Record a span which started at start and ends now. The span can have
+        started in another thread.
+
+        :param name: Name of the span e.g. file
+        :param start: time.perf_counter() when the span started
+        :param dataset: Dataset id
+        :param path: Path to the file. Spans without a path are always recorded
+        """
+        end = time.perf_counter()
+
+        if path is not None:
+            if not self.is_sampled(path):
+                return
+
+            if isinstance(path, pathlib.PurePath):
+                path = path.as_posix()
+
+        # No thread, as the span is not tied to one
+        self._events.append((name, start, end, None, dataset, path))
+
+    @property
+    def span_count(self):
+        return len(self._events)
+
+    def trace_events(self):
+        """
+        :return: Chrome trace events (list)
+        """
+        pid = os.getpid()
+        events = []
+        threads = {}
+
+        for event_id, (name, start, end, thread_id, dataset, path) in enumerate(list(self._events)):
+            args = {}
+            if dataset is not None:
+                args['dataset'] = dataset
+            if path is not None:
+                args['path'] = path
+
+            event = {
+                'name': name,
+                'cat': 'file' if path is not None else 'run',
+                'pid': pid,
+                'args': args
+            }
+
+            if thread_id is None:
+                # A begin and end event with the same id
+                events.append(dict(event, ph='b', id=event_id, ts=(start - self._started) * 1e6))
+                events.append(dict(event, ph='e', id=event_id, ts=(end - self._started) * 1e6))
+                continue
+
+            # Small thread ids keep the trace readable
+            tid = threads.setdefault(thread_id, len(threads) + 1)
+
+            events.append(dict(
+                event,
+                ph='X',
+                ts=(start - self._started) * 1e6,
+                dur=(end - start) * 1e6,
+                tid=tid
+            ))
+
+        for thread_id, tid in threads.items():
+            events.append({
+                'name': 'thread_name',
+                'ph': 'M',
+                'pid': pid,
+                'tid': tid,
+                'args': {'name': self._thread_names.get(thread_id, f'thread-{tid}')}
+            })
+
+        return events
+
+    def write(self, path):
+        """
+        Write the trace as JSON
+
+        :param path: Output file
+        """
+        with open(path, 'w') as writer:
+            json.dump({'traceEvents': self.trace_events(), 'displayTimeUnit': 'ms'}, writer)
@@ -0,0 +1,267 @@
+# encoding: utf-8
+"""
+Transports used by TripleStore to send SPARQL queries to the vocab server and
+fetch the RDF documents for concepts hosted by NERC.
+
+The recording transport saves each query and document with its response and
+the time it took as a fixture. The replay transport answers from the fixture
+without the network, optionally sleeping for the recorded time, so the vocab
+can be loaded and benchmarked on an isolated machine.
+
+    recorder = RecordingTransport('vocab_fixture.json.gz')
+    TripleStore.set_transport(recorder)
+    Facets()
+    recorder.save()
+
+    TripleStore.set_transport(ReplayTransport('vocab_fixture.json.gz'))
+    Facets()
+
+rdflib is slow to import, so it is imported when a transport first needs it.
+"""
+__author__ = 'Richard Smith'
+__date__ = '18 Oct 2026'
+__copyright__ = 'Copyright 2018 United Kingdom Research and Innovation'
+__license__ = 'BSD - see LICENSE file in top-level package directory'
+__contact__ = 'richard.d.smith@stfc.ac.uk'
+
+from cci_tagger.conf.settings import SPARQL_HOST_NAME
+import gzip
+import io
+import json
+import os
+import threading
+import time
+
+FIXTURE_VERSION = 1
+
+# Format used to store the NERC documents in a fixture
+DOCUMENT_FORMAT = 'nt'
+
+
+class ReplayError(LookupError):
+    """
+    The query or document is not in the fixture
+    """
+
+
+def _open_fixture(path, mode, compressed):
+    if compressed:
+        return gzip.open(path, f'{mode}t', encoding='utf-8')
+
+    return open(path, mode, encoding='utf-8')
+
+
+class LiveTransport(object):
+    """
+    Sends the queries to the vocab server and fetches the documents from NERC
+    """
+
+    def __init__(self, endpoint=None):
+        """
+        :param endpoint: SPARQL endpoint. Default: the vocab server
+        """
+        self.endpoint = endpoint or f'http://{SPARQL_HOST_NAME}/sparql'
+        self._graph = None
+
+    @property
+    def graph(self):
+        """
+        Graph backed by the SPARQL endpoint. Created when first used
+        """
+        if self._graph is None:
+            from rdflib import ConjunctiveGraph
+            from rdflib.plugins.stores.sparqlstore import SPARQLStore
+
+            self._graph = ConjunctiveGraph(store=SPARQLStore(endpoint=self.endpoint))
+
+        return self._graph
+
+    def query(self, statement):
+        """
+        :param statement: SPARQL query
+        :return: rdflib.query.Result
+        """
+        return self.graph.query(statement)
+
+    def fetch_document(self, uri):
+        """
+        :param uri: URI of the concept
+        :return: rdflib.Graph holding the document
+        """
+        from rdflib import Graph
+
+        graph = Graph()
+        graph.parse(location=uri, format='application/rdf+xml')
+        return graph
+
+
+class GraphTransport(object):
+    """
+    Answers the queries from an in-memory rdflib Dataset. Used to build
+    fixtures for vocabularies which are not on the vocab server.
+    """
+
+    def __init__(self, graph):
+        """
+        :param graph: rdflib.Dataset with the concepts in a named graph
+        """
+        self.graph = graph
+
+    def query(self, statement):
+        return self.graph.query(statement)
+
+    def fetch_document(self, uri):
+        """
+        The document for a concept holds the triples about the concept
+        """
+        from rdflib import Graph, URIRef
+
+        document = Graph()
+        for subject, predicate, obj, _ in self.graph.quads((URIRef(uri), None, None, None)):
+            document.add((subject, predicate, obj))
+
+        return document
+
+
+class RecordingTransport(object):
+    """
+    Passes the queries and document fetches to another transport and records
+    the responses and the time they took. The fixture is written by save.
+    """
+
+    def __init__(self, path, transport=None):
+        """
+        :param path: Fixture to write. Compressed if the name ends in .gz
+        :param transport: Transport to record. Default: LiveTransport
+        """
+        self.path = path
+        self.transport = transport or LiveTransport()
+
+        self.queries = {}
+        self.documents = {}
+        self._lock = threading.Lock()
+
+    def query(self, statement):
+        start = time.perf_counter()
+        result = self.transport.query(statement)
+        seconds = time.perf_counter() - start
+
+        response = json.loads(result.serialize(format='json'))
+
+        with self._lock:
+            self.queries[statement] = {'query': statement, 'response': response, 'seconds': seconds}
+
+        return result
+
+    def fetch_document(self, uri):
+        start = time.perf_counter()
+        graph = self.transport.fetch_document(uri)
+        seconds = time.perf_counter() - start
+
+        # rdflib before 6.0 returns bytes
+        data = graph.serialize(format=DOCUMENT_FORMAT)
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+
+        with self._lock:
+            self.documents[uri] = {
+                'uri': uri,
+                'format': DOCUMENT_FORMAT,
+                'data': data,
+                'seconds': seconds
+            }
+
+        return graph
+
+    def save(self, path=None):
+        """
+        Write the fixture. The file is replaced in one step.
+
+        :param path: Output file. Default: the path given when created
+        :return: Path to the fixture
+        """
+        path = path or self.path
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+
+        with self._lock:
+            fixture = {
+                'version': FIXTURE_VERSION,
+                'queries': list(self.queries.values()),
+                'documents': list(self.documents.values())
+            }
+
+        with _open_fixture(tmp_path, 'w', path.endswith('.gz')) as writer:
+            json.dump(fixture, writer)
+
+        os.replace(tmp_path, path)
+
+        return path
+
+
+class ReplayTransport(object):
+    """
+    Answers the queries and document fetches from a fixture written by
+    RecordingTransport. A query which is not in the fixture raises
+    ReplayError rather than going to the network.
+    """
+
+    def __init__(self, path, simulate_latency=False, latency_scale=1.0):
+        """
+        :param path: Fixture to read
+        :param simulate_latency: Sleep for the time each request took when recorded
+        :param latency_scale: Multiplier for the recorded times
+        """
+        self.path = path
+        self.simulate_latency = simulate_latency
+        self.latency_scale = latency_scale
+
+        with _open_fixture(path, 'r', path.endswith('.gz')) as reader:
+            fixture = json.load(reader)
+
+        if fixture.get('version') != FIXTURE_VERSION:
+            raise ValueError(f'Unsupported vocab fixture version in {path}: {fixture.get("version")}')
+
+        # The responses are held as encoded JSON, ready to be parsed
+        self.queries = {
+            item['query']: (json.dumps(item['response']).encode('utf-8'), item['seconds'])
+            for item in fixture['queries']
+        }
+        self.documents = {item['uri']: item for item in fixture['documents']}
+
+    def _wait(self, seconds):
+        if self.simulate_latency:
+            time.sleep(seconds * self.latency_scale)
+
+    def query(self, statement):
+        try:
+            response, seconds = self.queries[statement]
+        except KeyError:
+            raise ReplayError(f'Query not in {self.path}: {statement}')
+
+        self._wait(seconds)
+
+        from rdflib.query import Result
+
+        return Result.parse(io.BytesIO(response), format='json')
+
+    def fetch_document(self, uri):
+        try:
+            document = self.documents[uri]
+        except KeyError:
+            raise ReplayError(f'Document not in {self.path}: {uri}')
+
+        self._wait(document['seconds'])
+
+        from rdflib import Graph
+
+        graph = Graph()
+        graph.parse(data=document['data'], format=document['format'])
+        return graph
+
+    @property
+    def recorded_seconds(self):
+        """
+        Total time taken by the requests when they were recorded
+        """
+        return sum(seconds for _, seconds in self.queries.values()) + \
+            sum(document['seconds'] for document in self.documents.values())
@@ -34,7 +34,9 @@ setup(
             'moles_esgf_tag = cci_tagger.scripts:CCITaggerCommandLineClient.main',
             'cci_json_check = cci_tagger.scripts:TestJSONFile.cmd',
             'cci_check_tags = cci_tagger.scripts.check_tags:main',
-            'export_facet_json = cci_tagger.scripts.dump_facet_object:main'
+            'export_facet_json = cci_tagger.scripts.dump_facet_object:main',
+            'cci_tagger_server = cci_tagger.scripts.tagging_server:main',
+            'cci_tagger_bench = cci_tagger.benchmarks.runner:main'
         ],
     },
 
@@ -51,8 +53,14 @@ setup(
     install_requires=[
         'SPARQLWrapper',
         'netCDF4',
+        'h5py',
         'six',
         'verboselogs',
 
     ],
+
+    extras_require={
+        # Reading datasets from S3 compatible object storage
+        's3': ['boto3'],
+    },
 )